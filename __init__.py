@@ -1,7 +1,15 @@
 from .core.adapters.browser_adapter import FirefoxHeaderAdapter
-from .core.adapters import HeaderKwargAdapter, CORSHeaderAdapter
+from .core.adapters import HeaderKwargAdapter, CORSHeaderAdapter, CompressionAdapter, ConditionalGetAdapter
+from .core.adapters import ServerTimingAdapter, AdmissionControlAdapter
 from .core.html_marshaller import HTMLMarshaller
+from .core.msgpack_marshaller import MessagePackMarshaller
 from .core.http_handler import HTTPHandler
-from .core.interfaces import ClacksCoreWebAPIInterface, basic_rest_interface
+from .core.async_http_handler import AsyncHTTPHandler
+from .core.interfaces import ClacksCoreWebAPIInterface, ClacksStaticFilesInterface, basic_rest_interface
+from .core.interfaces import ClacksMetricsInterface
 from clacks_web.core.utils.simple_rest_api import simple_rest_api_from_server, simple_rest_api
+from clacks_web.core.utils.simple_rest_api import simple_rest_api_prefork, simple_rest_api_prefork_from_server
 from clacks_web.core.decorators.rest_decorators import get, put, post, patch, delete
+from clacks_web.core.response_cache import ResponseCache, get_response_cache
+from clacks_web.core.http_client import HTTPClientProxy, HTTPConnectionPool
+from clacks_web.core.sse import EventSource, Event, event_stream
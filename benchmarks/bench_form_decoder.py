@@ -0,0 +1,86 @@
+import timeit
+import urllib.parse
+
+from clacks_web.core.form_urlencoded import FormDecoder, fields_to_dict, decode_form
+
+
+# -- 12k distinct fields, and 12k values of a single multi-select field.
+WIDE_FORM = '&'.join('field_%s=value+%s%%21' % (index, index) for index in range(12000)).encode('ascii')
+REPEATED_FORM = '&'.join('tags=tag_%s' % index for index in range(12000)).encode('ascii')
+
+
+LABELS = ('legacy', 'parse_qsl', 'decoder', 'chunked')
+
+UNIT = 'ms'
+
+QUICK = dict(number=2, repeat=2)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def legacy_decode_form(data):
+    """
+    The loop HTMLMarshaller used before the incremental decoder, with urllib.unquote swapped for its Python 3
+    equivalent, kept as a reference point. It fails on any field sent more than twice, so it only runs on WIDE_FORM.
+    """
+    result = dict()
+
+    for line in data.decode('utf-8').splitlines():
+        line = urllib.parse.unquote(line)
+
+        for part in line.split('&'):
+            key, _, value = part.partition('=')
+
+            if key in result:
+                result[key] = [result[key]]
+                result[key].append(value)
+                result[key] = list(set(result[key]))
+
+            else:
+                result[key] = value
+
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def decode_form_chunked(data, chunk_size=65536):
+    """
+    Decode the form the way a streamed request body is decoded, in socket-sized chunks.
+    """
+    decoder = FormDecoder(max_fields=0)
+    for start in range(0, len(data), chunk_size):
+        decoder.feed(data[start:start + chunk_size])
+    return fields_to_dict(decoder.close())
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def run(number=10, repeat=3):
+    results = dict()
+
+    decoders = (
+        ('legacy', legacy_decode_form),
+        ('parse_qsl', lambda data: urllib.parse.parse_qsl(data.decode('utf-8'), max_num_fields=None)),
+        ('decoder', lambda data: decode_form(data, max_fields=0)),
+        ('chunked', decode_form_chunked),
+    )
+
+    for name, form in (('wide', WIDE_FORM), ('repeated', REPEATED_FORM)):
+        for label, fn in decoders:
+            if (name, label) == ('repeated', 'legacy'):
+                continue
+            timer = timeit.Timer(lambda: fn(form))
+            best = min(timer.repeat(repeat=repeat, number=number))
+            results['%s/%s' % (name, label)] = best / number * 1e3
+
+    return results
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def main():
+    results = run()
+    for name in ('wide', 'repeated'):
+        timings = ['%s: %6.2f ms' % (label, results.get('%s/%s' % (name, label), float('nan'))) for label in LABELS]
+        print('%-8s %s' % (name, '  '.join(timings)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import timeit
+
+import clacks
+
+from clacks_web.core.http_handler import HTTPHandler
+
+
+UNIT = 'us'
+
+QUICK = dict(number=5000, repeat=3)
+
+BROWSER_HEADER = (
+    b'GET /reports/daily?date=2021-04-01&team=lighting&format=json HTTP/1.1\r\n'
+    b'Host: localhost:6000\r\n'
+    b'User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:87.0) Gecko/20100101 Firefox/87.0\r\n'
+    b'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8\r\n'
+    b'Accept-Language: en-US,en;q=0.5\r\n'
+    b'Accept-Encoding: gzip, deflate\r\n'
+    b'Referer: http://localhost:6000/reports\r\n'
+    b'Connection: keep-alive\r\n'
+    b'Cookie: session=2b8f0c1e9d; theme=dark; last_report=daily\r\n'
+    b'Upgrade-Insecure-Requests: 1\r\n'
+    b'Sec-Fetch-Dest: document\r\n'
+    b'Sec-Fetch-Mode: navigate\r\n'
+    b'Sec-Fetch-Site: same-origin\r\n'
+    b'Sec-Fetch-User: ?1\r\n'
+    b'Cache-Control: max-age=0\r\n'
+    b'\r\n'
+)
+
+API_HEADER = (
+    b'POST /users HTTP/1.1\r\n'
+    b'Host: localhost:6000\r\n'
+    b'User-Agent: python-requests/2.25.1\r\n'
+    b'Accept-Encoding: gzip, deflate\r\n'
+    b'Accept: */*\r\n'
+    b'Connection: keep-alive\r\n'
+    b'Content-Length: 27\r\n'
+    b'Content-Type: application/json\r\n'
+    b'\r\n'
+)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def legacy_decode_question_header(header, encoding='utf-8'):
+    """
+    Verbatim copy of the str-based parsing HTTPHandler used before the bytes-level parser, kept as a reference point.
+    """
+    data = str(header.decode(encoding))
+
+    flags = dict()
+    lines = list()
+
+    method = data.splitlines()[0]
+
+    for line in data.splitlines()[1:]:
+        if not line.strip():
+            continue
+        if ':' not in line:
+            continue
+        lines.append(line.strip())
+
+    for line in lines:
+        key, _, value = line.partition(': ')
+        flags[key] = value
+
+    result = flags
+
+    method, path, _ = method.split(' ')
+    result['command'] = method
+
+    if 'Access-Control-Request-Method' in result:
+        result['command'] = result['Access-Control-Request-Method']
+
+    result['path'] = path.rpartition('?')[0] if '?' in path else path
+
+    kwargs = dict()
+
+    if '?' in path:
+        kwarg_string = path.rpartition('?')[2]
+        pairs = kwarg_string.split('&')
+        for pair in pairs:
+            key, _, value = pair.partition('=')
+            kwargs[key] = value
+
+    result['kwargs'] = kwargs
+    result['Accept-Encoding'] = result.get('Accept-Encoding', 'text/json')
+
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def run(number=50000, repeat=5):
+    results = dict()
+
+    # -- the handler's own parsing, rather than a copy of it, so the numbers can't drift from what is actually run.
+    handler = HTTPHandler(clacks.JSONMarshaller())
+
+    def decode_question_header(header):
+        return handler._build_question_header(*handler._header_to_dict(header))
+
+    for name, header in (('browser', BROWSER_HEADER), ('api', API_HEADER)):
+        for label, fn in (('legacy', legacy_decode_question_header), ('handler', decode_question_header)):
+            timer = timeit.Timer(lambda: fn(header))
+            best = min(timer.repeat(repeat=repeat, number=number))
+            results['%s/%s' % (name, label)] = best / number * 1e6
+
+    return results
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def main():
+    results = run()
+    for name in ('browser', 'api'):
+        legacy = results['%s/legacy' % name]
+        new = results['%s/handler' % name]
+        if new <= legacy:
+            print('%-8s legacy: %6.2f us  handler: %6.2f us  speedup: %.2fx' % (name, legacy, new, legacy / new))
+        else:
+            print('%-8s legacy: %6.2f us  handler: %6.2f us  slowdown: %.2fx' % (name, legacy, new, new / legacy))
+
+    # -- the two don't do the same work, so this is not a like for like comparison.
+    print(
+        'note: unlike legacy, the handler only ends lines at CRLF or LF, drops malformed header names and folds '
+        'repeated headers into a case-insensitive HeaderMap, which costs more than the single decode saves.'
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+import multiprocessing
+import concurrent.futures
+
+from clacks_web.core.http_client import HTTPClientProxy, HTTPClientError
+
+
+UNIT = 'ms'
+UNITS = {'throughput': 'req/s', 'errors': 'requests'}
+HIGHER_IS_BETTER = ('throughput',)
+
+# -- end-to-end numbers are noisier than those of a single stage.
+TOLERANCE = 0.25
+
+QUICK = dict(clients=8, requests=50)
+
+# -- the requests every client sends, in turn: (method, path, JSON body).
+REQUEST_MIX = (
+    ('GET', '/bench/ping', None),
+    ('GET', '/bench/items/42?fields=id,name,scale', None),
+    ('GET', '/bench/items?count=20', None),
+    ('POST', '/bench/echo', {'name': 'asset', 'tags': ['a', 'b'], 'scale': 1.5}),
+)
+
+SCENARIOS = ('keep_alive', 'close')
+
+WARMUP_REQUESTS = 5
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _free_port(host):
+    # type: (str) -> int
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _wait_for_port(host, port, timeout=10.0):
+    # type: (str, int, float) -> None
+    deadline = time.time() + timeout
+    while True:
+        try:
+            socket.create_connection((host, port), timeout=1.0).close()
+            return
+        except OSError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _encode_mix():
+    # type: () -> list
+    result = list()
+    for method, path, body in REQUEST_MIX:
+        if body is None:
+            result.append((method, path, b'', None))
+        else:
+            result.append((method, path, json.dumps(body).encode('utf-8'), {'Content-Type': 'application/json'}))
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _client_process(host, port, threads, requests, keep_alive):
+    # type: (str, int, int, int, bool) -> dict
+    """
+    Run `threads` clients, each sending `requests` requests, and time every one of them. Runs in a process of its
+    own, so the clients don't compete with the server for the GIL.
+    """
+    headers = None if keep_alive else {'Connection': 'close'}
+    mix = _encode_mix()
+
+    latencies = list()
+    errors = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+    window = dict()
+
+    proxy = HTTPClientProxy(host, port, max_size=threads, headers=headers)
+
+    def send(index):
+        method, path, body, request_headers = mix[index % len(mix)]
+        try:
+            return proxy.request(method, path, body, request_headers).status < 400
+        except (HTTPClientError, OSError):
+            return False
+
+    def client(offset):
+        for index in range(WARMUP_REQUESTS):
+            send(offset + index)
+
+        own = list()
+        failed = 0
+
+        if barrier.wait() == 0:
+            window['start'] = time.time()
+
+        for index in range(requests):
+            start = time.perf_counter()
+            if not send(offset + index):
+                failed += 1
+            own.append(time.perf_counter() - start)
+
+        with lock:
+            latencies.extend(own)
+            errors[0] += failed
+
+    workers = [threading.Thread(target=client, args=(offset,)) for offset in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    proxy.close()
+    return dict(latencies=latencies, errors=errors[0], start=window['start'], end=time.time())
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _percentile(values, fraction):
+    # type: (list, float) -> float
+    return values[int(round(fraction * (len(values) - 1)))]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def measure(host, port, clients, requests, keep_alive=True, processes=None):
+    # type: (str, int, int, int, bool, int) -> dict
+    """
+    Load a server with `clients` concurrent clients, spread over `processes` client processes, each sending
+    `requests` requests.
+
+    :return: the throughput in requests per second, the 50th, 90th and 99th percentile latency in milliseconds, and
+        the number of requests that failed.
+    :rtype: dict
+    """
+    processes = processes or max(1, min(clients, os.cpu_count() or 1, 4))
+    threads = -(-clients // processes)
+
+    # -- client processes are spawned rather than forked, forking a process that runs a server is asking for trouble.
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(processes, mp_context=context) as pool:
+        futures = [
+            pool.submit(_client_process, host, port, threads, requests, keep_alive)
+            for _ in range(processes)
+        ]
+        outcomes = [future.result() for future in futures]
+
+    latencies = sorted(latency for outcome in outcomes for latency in outcome['latencies'])
+    elapsed = max(outcome['end'] for outcome in outcomes) - min(outcome['start'] for outcome in outcomes)
+
+    return {
+        'throughput': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'p50': _percentile(latencies, 0.5) * 1e3,
+        'p90': _percentile(latencies, 0.9) * 1e3,
+        'p99': _percentile(latencies, 0.99) * 1e3,
+        'errors': sum(outcome['errors'] for outcome in outcomes),
+    }
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def run(clients=32, requests=200, processes=None, host=None, port=None):
+    """
+    Measure every scenario against a server serving the benchmark resources, see fixtures.BenchmarkInterface. Without
+    a host and port, such a server is started on the loopback interface, in this process.
+    """
+    server = None
+
+    if host is None:
+        from .fixtures import build_server
+
+        host, port = '127.0.0.1', _free_port('127.0.0.1')
+        server = build_server(host, port)
+        server.start(blocking=False)
+        _wait_for_port(host, port)
+
+    results = dict()
+    try:
+        for scenario in SCENARIOS:
+            outcome = measure(host, port, clients, requests, scenario == 'keep_alive', processes)
+            for key, value in outcome.items():
+                results['%s/%s' % (scenario, key)] = value
+
+    finally:
+        if server is not None:
+            server.end()
+
+    return results
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end throughput and latency of a clacks_web server.')
+    parser.add_argument('--host', help='benchmark an already running server, rather than starting one')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=200, help='requests per client')
+    parser.add_argument('--processes', type=int, help='client processes to spread the clients over')
+    args = parser.parse_args()
+
+    results = run(args.clients, args.requests, args.processes, args.host, args.port)
+    for scenario in SCENARIOS:
+        print(
+            '%-11s %8.0f req/s  p50: %6.2f ms  p90: %6.2f ms  p99: %6.2f ms  errors: %d' % (
+                scenario,
+                results['%s/throughput' % scenario],
+                results['%s/p50' % scenario],
+                results['%s/p90' % scenario],
+                results['%s/p99' % scenario],
+                results['%s/errors' % scenario],
+            )
+        )
+
+
+if __name__ == '__main__':
+    main()
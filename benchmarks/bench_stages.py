@@ -0,0 +1,102 @@
+import json
+import timeit
+
+import clacks
+from clacks.core.package import Package
+
+from clacks_web.core.http_handler import HTTPHandler
+from clacks_web.core.html_marshaller import HTMLMarshaller
+from clacks_web.core.msgpack_marshaller import MessagePackMarshaller
+from clacks_web.core.msgpack_codec import packb
+from clacks_web.core.metrics import MetricsRegistry
+
+from .fixtures import ROWS, build_server
+from .bench_header_parser import BROWSER_HEADER, API_HEADER
+
+
+UNIT = 'us'
+
+# -- run() arguments for a quick pass, when only a rough number is needed.
+QUICK = dict(number=2000, repeat=3)
+
+FORM_BODY = '&'.join('field_%s=value+%s' % (index, index) for index in range(50)).encode('ascii')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _best(fn, number, repeat):
+    # type: (callable, int, int) -> float
+    timer = timeit.Timer(fn)
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def stages():
+    # type: () -> list
+    """
+    Build every stage a request goes through, in the order it goes through them, as (name, callable) pairs.
+    """
+    server = build_server('127.0.0.1', 0)
+    web_core = server.interfaces['web_core']
+    handler = HTTPHandler(clacks.JSONMarshaller())
+
+    json_marshaller = clacks.JSONMarshaller()
+    html_marshaller = HTMLMarshaller()
+    msgpack_marshaller = MessagePackMarshaller()
+
+    package = Package(payload={'response': ROWS})
+    json_body = json.dumps({'items': ROWS}).encode('utf-8')
+    msgpack_body = packb({'items': ROWS})
+
+    registry = MetricsRegistry()
+
+    def record():
+        registry.finish('GET', '/bench/items/{id:int}', 200, registry.start('GET'))
+
+    return [
+        # -- parse: the request line and headers, into the header data the adapters and interfaces get.
+        ('parse/browser', lambda: handler.decode_question_header(None, BROWSER_HEADER)),
+        ('parse/api', lambda: handler.decode_question_header(None, API_HEADER)),
+
+        # -- route: find the resource for a path.
+        ('route/static', lambda: web_core.match_resource('GET', '/bench/ping')),
+        ('route/template', lambda: web_core.match_resource('GET', '/bench/items/42')),
+
+        # -- dispatch: route, bind and convert the arguments, and call the resource.
+        ('dispatch/static', lambda: web_core._method('GET', _header_data={'path': '/bench/ping'})),
+        ('dispatch/template', lambda: web_core._method(
+            'GET', _header_data={'path': '/bench/items/42'}, fields='id,name,scale',
+        )),
+
+        # -- marshal: decode request bodies and encode responses.
+        ('decode/json', lambda: json_marshaller._decode_package(None, dict(), json_body)),
+        ('decode/msgpack', lambda: msgpack_marshaller._decode_package(None, dict(), msgpack_body)),
+        ('decode/form', lambda: html_marshaller._decode_package(None, dict(), FORM_BODY)),
+        ('encode/json', lambda: json_marshaller._encode_package(None, package)),
+        ('encode/msgpack', lambda: msgpack_marshaller._encode_package(None, package)),
+        ('encode/html', lambda: html_marshaller._encode_package(None, package)),
+
+        # -- record: the overhead of the metrics interface on every request.
+        ('record/metrics', record),
+    ]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def run(number=20000, repeat=5):
+    results = dict()
+
+    for name, fn in stages():
+        # -- encoding a hundred rows takes a lot longer than parsing a header, keep the total time per stage similar.
+        count = number // 20 if name.startswith(('encode', 'decode')) else number
+        results[name] = _best(fn, max(count, 1), repeat)
+
+    return results
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def main():
+    for name, value in run().items():
+        print('%-20s %9.2f us' % (name, value))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import clacks
+import typing
+
+from clacks_web.core.utils.simple_rest_api import simple_rest_api_from_server
+from clacks_web.core.decorators.rest_decorators import get, post
+
+
+# -- a typical list response: small records of mixed types.
+ROWS = [
+    {'id': index, 'name': 'asset_%04d' % index, 'visible': index % 3 != 0, 'scale': index / 7.0, 'tags': ['a', 'b']}
+    for index in range(100)
+]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class BenchmarkInterface(clacks.ServerInterface):
+    """
+    Resources the benchmarks request, one for every kind of route: static, templated, with converted arguments, and
+    with a request body.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @get('/bench/ping', expose_as_method=False)
+    def ping(self):
+        return 'pong'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @get('/bench/items/{id:int}', expose_as_method=False)
+    def get_item(self, id, fields: typing.List[str] = None):
+        row = ROWS[id % len(ROWS)]
+        if fields:
+            return dict((key, row[key]) for key in fields if key in row)
+        return row
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @get('/bench/items', expose_as_method=False)
+    def list_items(self, count: int = 100):
+        return ROWS[:count]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @post('/bench/echo', expose_as_method=False)
+    def echo(self, **kwargs):
+        return kwargs
+
+
+clacks.register_server_interface_type('benchmark', BenchmarkInterface)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def build_server(host, port, identifier='benchmark'):
+    # type: (str, int, str) -> clacks.ServerBase
+    """
+    Build a simple REST API serving the benchmark resources, not started yet.
+    """
+    server = clacks.ServerBase(identifier=identifier)
+
+    # -- the web core interface collects the resources of the interfaces registered before it.
+    server.register_interface_by_key('benchmark')
+    return simple_rest_api_from_server(server, host, port)
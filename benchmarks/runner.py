@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import importlib
+import collections
+
+
+# -- suite name -> module, in the order a request goes through them.
+SUITES = collections.OrderedDict((
+    ('header_parser', '.bench_header_parser'),
+    ('form_decoder', '.bench_form_decoder'),
+    ('stages', '.bench_stages'),
+    ('loopback', '.bench_loopback'),
+))
+
+DEFAULT_TOLERANCE = 0.10
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class Result(object):
+    """
+    A single measurement: its value, the unit it is in, and whether more is better (throughput) or worse (time).
+    """
+
+    __slots__ = ('value', 'unit', 'higher_is_better', 'tolerance')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, value, unit, higher_is_better=False, tolerance=DEFAULT_TOLERANCE):
+        # type: (float, str, bool, float) -> None
+        self.value = value
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+        self.tolerance = tolerance
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def as_dict(self):
+        # type: () -> dict
+        return dict(
+            value=self.value,
+            unit=self.unit,
+            higher_is_better=self.higher_is_better,
+            tolerance=self.tolerance,
+        )
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def from_dict(cls, data):
+        # type: (dict) -> Result
+        return cls(
+            data['value'],
+            data.get('unit', ''),
+            data.get('higher_is_better', False),
+            data.get('tolerance', DEFAULT_TOLERANCE),
+        )
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def run_suite(name, quick=False):
+    # type: (str, bool) -> dict
+    """
+    Run a single suite.
+
+    Every suite is a module with a `run` function returning a flat dict of measurements. Its `UNIT` is the unit of
+    these, `UNITS` overrides it per measurement, `HIGHER_IS_BETTER` names the measurements where more is better,
+    `TOLERANCE` is how much worse than the baseline a measurement may get before it is flagged, and `QUICK` are the
+    `run` arguments for a quick pass. Measurements are named by the last part of their key.
+
+    :return: "suite/key" -> Result.
+    :rtype: dict
+    """
+    module = importlib.import_module(SUITES[name], __package__)
+
+    kwargs = getattr(module, 'QUICK', dict()) if quick else dict()
+    unit = getattr(module, 'UNIT', 'us')
+    units = getattr(module, 'UNITS', dict())
+    higher_is_better = getattr(module, 'HIGHER_IS_BETTER', ())
+    tolerance = getattr(module, 'TOLERANCE', DEFAULT_TOLERANCE)
+
+    results = collections.OrderedDict()
+    for key, value in module.run(**kwargs).items():
+        measurement = key.rpartition('/')[2]
+        results['%s/%s' % (name, key)] = Result(
+            value,
+            units.get(measurement, unit),
+            measurement in higher_is_better,
+            tolerance,
+        )
+
+    return results
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def run_suites(names=None, quick=False):
+    # type: (list, bool) -> tuple
+    """
+    Run the given suites, all of them by default. Suites that can't be imported, because clacks or something else
+    they need isn't installed, are skipped.
+
+    :return: "suite/key" -> Result, and the names of the skipped suites mapped to why they were skipped.
+    :rtype: tuple(dict, dict)
+    """
+    results = collections.OrderedDict()
+    skipped = collections.OrderedDict()
+
+    for name in names or SUITES:
+        if name not in SUITES:
+            raise ValueError('Unknown benchmark suite "%s", expected one of %s!' % (name, ', '.join(SUITES)))
+
+        try:
+            results.update(run_suite(name, quick))
+        except ImportError as e:
+            skipped[name] = str(e)
+
+    return results, skipped
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def environment():
+    # type: () -> dict
+    return dict(
+        python=platform.python_version(),
+        implementation=platform.python_implementation(),
+        machine=platform.machine(),
+        system=platform.system(),
+        node=platform.node(),
+        cpus=os.cpu_count(),
+    )
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def default_baseline_path():
+    # type: () -> str
+    """
+    Timings only compare on the same machine and interpreter, so every combination gets a baseline of its own.
+    """
+    name = '%s-%s-py%s.json' % (platform.node() or 'local', platform.machine(), platform.python_version())
+    return os.path.join(BASELINE_DIR, name)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def save_baseline(path, results):
+    # type: (str, dict) -> None
+    """
+    Save results as a JSON baseline. Results of suites that were not run are kept from the baseline already saved at
+    the path, if any, so suites can be re-baselined one at a time.
+    """
+    merged = collections.OrderedDict()
+    if os.path.isfile(path):
+        merged.update(load_baseline(path))
+    merged.update(results)
+
+    data = dict(
+        created=time.strftime('%Y-%m-%dT%H:%M:%S'),
+        environment=environment(),
+        results=collections.OrderedDict((key, result.as_dict()) for key, result in merged.items()),
+    )
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    with open(path, 'w') as fh:
+        json.dump(data, fh, indent=2)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def load_baseline(path):
+    # type: (str) -> dict
+    """
+    :return: "suite/key" -> Result, as saved by save_baseline.
+    :rtype: dict
+    """
+    with open(path, 'r') as fh:
+        data = json.load(fh)
+
+    return collections.OrderedDict((key, Result.from_dict(value)) for key, value in data['results'].items())
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def compare(results, baseline, tolerance=None):
+    # type: (dict, dict, float) -> list
+    """
+    Compare results against a baseline.
+
+    :param tolerance: how much worse than the baseline a measurement may get, as a fraction, before it is flagged as a
+        regression. Defaults to the tolerance of each measurement's suite.
+    :type tolerance: float
+
+    :return: for every result, its key, the Result, the baseline value or None, the relative change (positive is
+        better), and its status: "new", "ok", "improved" or "regression".
+    :rtype: list(tuple)
+    """
+    rows = list()
+
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            rows.append((key, result, None, None, 'new'))
+            continue
+
+        limit = result.tolerance if tolerance is None else tolerance
+
+        if base.value == 0:
+            # -- error counts: any error where there were none is a regression.
+            change = 0.0 if result.value == 0 else (1.0 if result.higher_is_better else -1.0)
+        elif result.higher_is_better:
+            change = (result.value - base.value) / base.value
+        else:
+            change = (base.value - result.value) / base.value
+
+        if change < -limit:
+            status = 'regression'
+        elif change > limit:
+            status = 'improved'
+        else:
+            status = 'ok'
+
+        rows.append((key, result, base.value, change, status))
+
+    return rows
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def format_rows(rows):
+    # type: (list) -> str
+    lines = ['%-40s %14s %14s %9s  %s' % ('benchmark', 'value', 'baseline', 'change', 'status')]
+
+    for key, result, base, change, status in rows:
+        lines.append('%-40s %14s %14s %9s  %s' % (
+            key,
+            '%.2f %s' % (result.value, result.unit),
+            '' if base is None else '%.2f' % base,
+            '' if change is None else '%+.1f%%' % (change * 100),
+            status,
+        ))
+
+    return '\n'.join(lines)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def main(argv=None):
+    # type: (list) -> int
+    parser = argparse.ArgumentParser(
+        prog='python -m clacks_web.benchmarks',
+        description='Benchmark the HTTP request path and flag regressions against a saved baseline.',
+    )
+    parser.add_argument('suites', nargs='*', help='suites to run, all by default: %s' % ', '.join(SUITES))
+    parser.add_argument('--quick', action='store_true', help='fewer iterations, for a rough number')
+    parser.add_argument('--baseline', help='baseline to compare against, defaults to the one of this machine')
+    parser.add_argument('--save', nargs='?', const='', help='save the results as the (or this) baseline')
+    parser.add_argument('--tolerance', type=float, help='flag regressions beyond this fraction, e.g. 0.1')
+    args = parser.parse_args(argv)
+
+    results, skipped = run_suites(args.suites, args.quick)
+    for name, reason in skipped.items():
+        print('skipped %s: %s' % (name, reason))
+
+    baseline_path = args.baseline or default_baseline_path()
+    baseline = load_baseline(baseline_path) if os.path.isfile(baseline_path) else dict()
+
+    rows = compare(results, baseline, args.tolerance)
+    print(format_rows(rows))
+
+    if args.save is not None:
+        path = args.save or baseline_path
+        save_baseline(path, results)
+        print('saved baseline %s' % path)
+
+    regressions = [row[0] for row in rows if row[-1] == 'regression']
+    if regressions:
+        print('%d regression(s) against %s: %s' % (len(regressions), baseline_path, ', '.join(regressions)))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
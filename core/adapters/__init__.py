@@ -2,3 +2,7 @@ from .header_kwargs import HeaderKwargAdapter
 from .browser_adapter import FirefoxHeaderAdapter
 from .cors_adapter import CORSHeaderAdapter
 from .content_type_adapter import ContentTypeHeaderAdapter
+from .compression_adapter import CompressionAdapter
+from .conditional_adapter import ConditionalGetAdapter
+from .server_timing_adapter import ServerTimingAdapter
+from .admission_adapter import AdmissionControlAdapter
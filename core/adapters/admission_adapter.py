@@ -0,0 +1,100 @@
+from clacks import ServerAdapterBase, register_adapter_type
+
+from ..admission import AdmissionController
+from ..http_parser import split_request_line
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class AdmissionControlAdapter(ServerAdapterBase):
+    """
+    Sheds load before it piles up: the HTTP handlers ask this adapter whether to serve a request as soon as they have
+    read its head, and reject it with a 429 or 503 and a Retry-After header if not, without reading its body, let alone
+    decoding or digesting it. See AdmissionController for the limits, and `limit_route` to limit single routes.
+
+    Clients are told apart by their address, or by the value of their `client_header` if one is given, like an API key
+    header, or "X-Forwarded-For" behind proxies. Only set a header the clients can't choose freely, or they can get
+    themselves a fresh rate limit with every request.
+
+    For a comma-separated list like X-Forwarded-For, where every proxy appends the address it got the request from,
+    the entry `trusted_proxies` from the right is used: the address the outermost of the server's own proxies saw. The
+    entries to the left of it are whatever the client sent, and are never used.
+
+    Requests count as in flight until their response has been sent, which for streamed responses is when the stream
+    ends.
+    """
+
+    # -- tells the HTTP handlers to ask us before reading request bodies.
+    admission_control = True
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            rate=None,
+            burst=None,
+            max_in_flight=None,
+            max_queue_depth=None,
+            retry_after=AdmissionController.DEFAULT_RETRY_AFTER,
+            client_header=None,
+            max_clients=AdmissionController.DEFAULT_MAX_CLIENTS,
+            trusted_proxies=1,
+            **kwargs
+    ):
+        # type: (float, float, int, int, int, str, int, int) -> None
+        super(AdmissionControlAdapter, self).__init__(**kwargs)
+
+        if trusted_proxies < 1:
+            raise ValueError('trusted_proxies has to be at least 1, not %r!' % trusted_proxies)
+
+        self.client_header = client_header
+        self.trusted_proxies = trusted_proxies
+        self.controller = AdmissionController(
+            rate=rate,
+            burst=burst,
+            max_in_flight=max_in_flight,
+            max_queue_depth=max_queue_depth,
+            retry_after=retry_after,
+            max_clients=max_clients,
+        )
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def limit_route(self, path, rate, burst=None, method=None):
+        # type: (str, float, float, str) -> None
+        """
+        Limit the requests to a route, see AdmissionController.limit_route
+        """
+        self.controller.limit_route(path, rate, burst, method)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def admit(self, address, request_line, headers, queue_depth=0):
+        # type: (tuple, str, dict, int) -> Admission
+        """
+        Decide on a request whose head has just been read.
+
+        :param address: the address of the client's connection.
+        :type address: tuple
+
+        :param request_line: the request line.
+        :type request_line: str
+
+        :param headers: the parsed request headers.
+        :type headers: dict
+
+        :param queue_depth: the number of requests waiting for a worker of the handler.
+        :type queue_depth: int
+
+        :return: the decision, see AdmissionController.admit
+        :rtype: Admission
+        """
+        client = None
+        if self.client_header is not None:
+            entries = headers.get(self.client_header, '').split(',')
+            client = entries[max(len(entries) - self.trusted_proxies, 0)].strip()
+
+        if not client:
+            client = address[0] if address else None
+
+        method, path, _, _ = split_request_line(request_line)
+        return self.controller.admit(client, method, path, queue_depth)
+
+
+register_adapter_type('admission_control', AdmissionControlAdapter)
@@ -2,15 +2,29 @@ import socket
 from clacks.core.package import Package
 from clacks import ServerAdapterBase, register_adapter_type
 
+from ..header_writer import HeaderBlock
+
 
 # ----------------------------------------------------------------------------------------------------------------------
 class FirefoxHeaderAdapter(ServerAdapterBase):
 
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 6.0; WOW64; rv:24.0) Gecko/20100101 Firefox/24.0',
+    }
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, **kwargs):
+        super(FirefoxHeaderAdapter, self).__init__(**kwargs)
+        self.header_block = HeaderBlock(self.HEADERS)
+
     # ------------------------------------------------------------------------------------------------------------------
     def handler_pre_respond(self, server, handler, connection, transaction_id, package):
         if 'header_data' not in package.payload:
             package.payload['header_data'] = dict()
-        package.header_data['User-Agent'] = 'Mozilla/5.0 (Windows NT 6.0; WOW64; rv:24.0) Gecko/20100101 Firefox/24.0'
+
+        # -- HTTP handlers write our pre-encoded header block themselves.
+        if not getattr(handler, 'writes_header_blocks', False):
+            package.header_data.update(self.HEADERS)
 
 
 register_adapter_type('firefox', FirefoxHeaderAdapter)
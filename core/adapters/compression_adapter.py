@@ -0,0 +1,82 @@
+from clacks import ServerAdapterBase, register_adapter_type
+
+from ..compression import CompressionCache, negotiate_encoding
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class CompressionAdapter(ServerAdapterBase):
+    """
+    Compresses response bodies with gzip or deflate, whichever the client prefers according to its Accept-Encoding
+    header. Bodies smaller than `min_size` bytes are sent as-is, as compressing them costs more time than it saves.
+
+    Compressed bodies are kept in a bounded LRU, so a resource returning the same large payload over and over again is
+    only compressed once.
+
+    Every body large enough to be compressed gets a `Vary: Accept-Encoding`, whether it was compressed or not, so
+    caches in between don't hand a response meant for one client to another that accepts different codings. The ETag
+    of a compressed body is made weak, as its bytes differ from those of the uncompressed body it was given for.
+
+    Streamed responses are never compressed.
+    """
+
+    DEFAULT_MIN_SIZE = 1024
+    DEFAULT_LEVEL = 6
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            min_size=DEFAULT_MIN_SIZE,
+            level=DEFAULT_LEVEL,
+            cache_entries=CompressionCache.DEFAULT_MAX_ENTRIES,
+            cache_bytes=CompressionCache.DEFAULT_MAX_BYTES,
+            **kwargs
+    ):
+        # type: (int, int, int, int) -> None
+        super(CompressionAdapter, self).__init__(**kwargs)
+        self.min_size = min_size
+        self.level = level
+        self.cache = CompressionCache(max_entries=cache_entries, max_bytes=cache_bytes)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def server_post_digest(self, server, handler, connection, transaction_id, header_data, data, response):
+        response.content_encoding = negotiate_encoding(header_data.get('Accept-Encoding', ''))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def handler_pre_respond(self, server, handler, connection, transaction_id, package):
+        if 'header_data' not in package.payload:
+            package.payload['header_data'] = dict()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def handler_encode_body(self, server, handler, connection, transaction_id, package, body):
+        # type: (object, object, object, str, object, bytes) -> bytes
+        if len(body) < self.min_size or 'Content-Encoding' in package.header_data:
+            return body
+
+        # -- the response depends on the request's Accept-Encoding, even when it is sent as-is.
+        self._add_vary(package)
+
+        encoding = getattr(package, 'content_encoding', None)
+        if not encoding:
+            return body
+
+        # -- a strong ETag promises the exact bytes, which the compressed body doesn't have. Weak ones still match
+        # -- If-None-Match, but not If-Match or If-Range.
+        etag = package.header_data.get('ETag')
+        if etag and not etag.startswith('W/'):
+            package.header_data['ETag'] = 'W/' + etag
+
+        package.header_data['Content-Encoding'] = encoding
+        return self.cache.compress(body, encoding, self.level)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def _add_vary(cls, package):
+        # -- other adapters or the resource may have set a Vary of their own already.
+        vary = package.header_data.get('Vary')
+        if not vary:
+            package.header_data['Vary'] = 'Accept-Encoding'
+        elif 'accept-encoding' not in vary.lower():
+            package.header_data['Vary'] = '%s, Accept-Encoding' % vary
+
+
+register_adapter_type('compression', CompressionAdapter)
@@ -0,0 +1,87 @@
+from clacks import ServerAdapterBase, register_adapter_type
+
+from ..conditional import NotModified, hash_etag, etag_matches, format_http_date
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ConditionalGetAdapter(ServerAdapterBase):
+    """
+    Sends ETag and Last-Modified headers with GET responses, and answers conditional GET requests whose If-None-Match
+    or If-Modified-Since header shows the client's cached copy is still current with a bodiless 304.
+
+    Resources opt in through the `etag`, `version` and `last_modified` options of their decorator. Resources supplying
+    a version token or modification time are not called at all for a 304, others are called as usual and their ETag is
+    a hash of the marshalled body, which still saves sending it.
+
+    Set `default_mode` to 'strong' or 'weak' to hash an ETag for every GET resource that doesn't specify one.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, default_mode=None, **kwargs):
+        # type: (str) -> None
+        super(ConditionalGetAdapter, self).__init__(**kwargs)
+        self.default_mode = default_mode
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def server_post_digest(self, server, handler, connection, transaction_id, header_data, data, response):
+        # -- only GET requests for resources get these, see ClacksCoreWebAPIInterface._method
+        if '_etag_mode' not in header_data:
+            return
+
+        mode = header_data.pop('_etag_mode') or self.default_mode
+        etag, last_modified = header_data.pop('_validators', (None, None))
+
+        # -- errors are never cached.
+        if response.errors or response.traceback:
+            return
+
+        response.etag = etag
+        response.last_modified = last_modified
+        response.not_modified = isinstance(response.payload.get('response'), NotModified)
+
+        # -- without a version token the ETag can only be computed once the body has been marshalled.
+        response.etag_mode = mode if etag is None else None
+        response.if_none_match = header_data.get('If-None-Match')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def handler_pre_respond(self, server, handler, connection, transaction_id, package):
+        if 'header_data' not in package.payload:
+            package.payload['header_data'] = dict()
+
+        if getattr(package, 'etag', None):
+            package.header_data['ETag'] = package.etag
+
+        if getattr(package, 'last_modified', None) is not None:
+            package.header_data['Last-Modified'] = format_http_date(package.last_modified)
+
+        if getattr(package, 'not_modified', False):
+            self._not_modified(package)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def handler_encode_body(self, server, handler, connection, transaction_id, package, body):
+        # type: (object, object, object, str, object, bytes) -> bytes
+        if getattr(package, 'not_modified', False):
+            return b''
+
+        mode = getattr(package, 'etag_mode', None)
+        if not mode:
+            return body
+
+        etag = hash_etag(body, weak=mode == 'weak')
+        package.header_data['ETag'] = etag
+
+        if etag_matches(package.if_none_match, etag):
+            self._not_modified(package)
+            return b''
+
+        return body
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def _not_modified(cls, package):
+        package.not_modified = True
+        package.code = 304
+        package.reason = 'Not Modified'
+
+
+register_adapter_type('conditional', ConditionalGetAdapter)
@@ -8,7 +8,8 @@ class ContentTypeHeaderAdapter(ServerAdapterBase):
 
     # ------------------------------------------------------------------------------------------------------------------
     def server_post_digest(self, server, handler, connection, transaction_id, header_data, data, response):
-        content_type = 'text/json'
+        # -- set by the HTTP handler.
+        content_type = header_data.get('_content_type', 'text/json')
 
         if 'Content-Type' in header_data:
             content_type = header_data['Content-Type']
@@ -1,18 +1,77 @@
 import socket
+import collections
 from clacks.core.package import Package
 from clacks import ServerAdapterBase, register_adapter_type
 
+from ..header_writer import HeaderBlock
+
 
 # ----------------------------------------------------------------------------------------------------------------------
 class CORSHeaderAdapter(ServerAdapterBase):
+    """
+    Allows browsers to call the server from pages of any origin.
+
+    The HTTP handlers answer CORS preflight requests themselves, from the methods registered at the requested path,
+    without calling any resource, see `preflight_headers`. Browsers cache the answer for `max_age` seconds, rather
+    than sending a preflight before every request.
+    """
+
+    HEADERS = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': '*',
+        'Access-Control-Allow-Methods': '*',
+    }
+
+    # -- browsers cap this, at two hours for Chromium and a day for Firefox.
+    DEFAULT_MAX_AGE = 7200
+
+    # -- tells the HTTP handlers to answer preflights with our headers.
+    cors_preflight = True
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, max_age=DEFAULT_MAX_AGE, **kwargs):
+        # type: (int) -> None
+        super(CORSHeaderAdapter, self).__init__(**kwargs)
+        self.max_age = max_age
+        self.header_block = HeaderBlock(self.HEADERS)
 
     # ------------------------------------------------------------------------------------------------------------------
     def handler_pre_respond(self, server, handler, connection, transaction_id, package):
         if 'header_data' not in package.payload:
             package.payload['header_data'] = dict()
-        package.header_data['Access-Control-Allow-Origin'] = '*'
-        package.header_data['Access-Control-Allow-Headers'] = '*'
-        package.header_data['Access-Control-Allow-Methods'] = '*'
+
+        # -- HTTP handlers write our pre-encoded header block themselves.
+        if not getattr(handler, 'writes_header_blocks', False):
+            package.header_data.update(self.HEADERS)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def preflight_headers(self, methods, header_data):
+        # type: (str, dict) -> collections.OrderedDict
+        """
+        Get the headers to answer a preflight request with.
+
+        :param methods: the methods allowed at the requested path, like "GET, PUT".
+        :type methods: str
+
+        :param header_data: the headers of the preflight request.
+        :type header_data: dict
+
+        :return: the headers.
+        :rtype: collections.OrderedDict
+        """
+        headers = collections.OrderedDict()
+        headers['Access-Control-Allow-Origin'] = self.HEADERS['Access-Control-Allow-Origin']
+        headers['Access-Control-Allow-Methods'] = methods
+
+        # -- a "*" doesn't cover the Authorization header, echoing the requested headers does.
+        headers['Access-Control-Allow-Headers'] = (
+            header_data.get('Access-Control-Request-Headers') or self.HEADERS['Access-Control-Allow-Headers']
+        )
+
+        if self.max_age is not None:
+            headers['Access-Control-Max-Age'] = self.max_age
+
+        return headers
 
 
 register_adapter_type('cors', CORSHeaderAdapter)
@@ -0,0 +1,68 @@
+from clacks import ServerAdapterBase, register_adapter_type
+
+from ..timing import SlowRequestProfiler, ProfileRing
+from ..metrics import UNMATCHED_ROUTE
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ServerTimingAdapter(ServerAdapterBase):
+    """
+    Times the stages every request goes through, and reports them in a Server-Timing response header, which browser
+    developer tools show next to the request: parsing the head, decoding the body, the pre-digest adapters, routing,
+    the resource itself, the post-digest adapters, the pre-respond adapters, marshalling and encoding the body.
+
+    Pass a `profile_dir` to also keep profiles of requests taking longer than `slow_threshold` seconds, and of requests
+    sent with the `debug_header` (with the value `debug_token`, if one is given), see SlowRequestProfiler. At most
+    `max_profiles` profiles are kept, older ones are deleted. Profiles are only taken by the threaded HTTPHandler.
+    """
+
+    # -- tells the HTTP handlers to time requests.
+    request_timing = True
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            header=True,
+            profile_dir=None,
+            slow_threshold=1.0,
+            max_profiles=ProfileRing.DEFAULT_MAX_FILES,
+            debug_header=None,
+            debug_token=None,
+            sample_interval=SlowRequestProfiler.DEFAULT_SAMPLE_INTERVAL,
+            **kwargs
+    ):
+        # type: (bool, str, float, int, str, str, float) -> None
+        super(ServerTimingAdapter, self).__init__(**kwargs)
+        self.header = header
+
+        self.profiler = None
+        if profile_dir is not None:
+            self.profiler = SlowRequestProfiler(
+                profile_dir,
+                threshold=slow_threshold,
+                max_profiles=max_profiles,
+                debug_header=debug_header,
+                debug_token=debug_token,
+                sample_interval=sample_interval,
+            )
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def begin_profile(self, header_data):
+        # type: (dict) -> object
+        """
+        :return: the profile of the request about to be served, None if it isn't profiled.
+        """
+        if self.profiler is None:
+            return None
+        return self.profiler.begin(header_data)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def end_profile(self, profile, method, route, status, duration):
+        # type: (object, str, str, int, float) -> str
+        """
+        :return: the path of the profile of the request, if one was written.
+        """
+        return self.profiler.end(profile, '%s %s %s' % (method, route or UNMATCHED_ROUTE, status), duration)
+
+
+register_adapter_type('server_timing', ServerTimingAdapter)
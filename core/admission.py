@@ -0,0 +1,258 @@
+import math
+import time
+import threading
+import collections
+
+from .router import ResourceRouter
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TokenBucket(object):
+    """
+    Allows `rate` requests per second on average, and bursts of up to `burst` requests at once.
+
+    Not thread-safe on its own, the AdmissionController holding it takes care of that.
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, rate, burst=None):
+        # type: (float, float) -> None
+        if rate <= 0:
+            raise ValueError('The rate of a token bucket has to be positive, not %r!' % rate)
+
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def take(self, now=None):
+        # type: (float) -> float
+        """
+        Take a token, if there is one.
+
+        :return: 0.0 if a token was taken, otherwise the number of seconds until the next one is available.
+        :rtype: float
+        """
+        now = time.monotonic() if now is None else now
+
+        # -- buckets created while deciding on a request are younger than the time the decision was taken at.
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+
+        return (1.0 - self.tokens) / self.rate
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def refund(self):
+        """
+        Give back a token that was taken for a request which ended up being rejected for another reason.
+        """
+        self.tokens = min(self.burst, self.tokens + 1.0)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class Admission(object):
+    """
+    The decision on a single request. Admitted requests hold a slot of the controller until they are released, which
+    the HTTP handlers do once they have responded; rejected requests carry the status to reject them with.
+    """
+
+    __slots__ = ('controller', 'code', 'reason', 'message', 'retry_after')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, controller, code=None, reason=None, message='', retry_after=None):
+        # type: (AdmissionController, int, str, str, int) -> None
+        self.controller = controller
+        self.code = code
+        self.reason = reason
+        self.message = message
+        self.retry_after = retry_after
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def admitted(self):
+        # type: () -> bool
+        return self.code is None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def release(self):
+        """
+        Give back the slot of an admitted request. Releasing more than once, or releasing a rejection, does nothing.
+        """
+        controller, self.controller = self.controller, None
+        if controller is not None and self.code is None:
+            controller.release()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class AdmissionController(object):
+    """
+    Decides which requests to serve when more come in than the server can handle, so it keeps answering the requests
+    it does take on in time, rather than taking on everything and answering all of them too late.
+
+    Requests are rejected, in this order:
+        - with a 503 when `max_in_flight` requests are being served already, or when more than `max_queue_depth`
+          requests are waiting for a worker of the handler.
+        - with a 429 when the client has used up its token bucket of `rate` requests per second, with bursts of up to
+          `burst` requests. Every client gets a bucket of its own; only the `max_clients` most recently seen clients
+          are remembered.
+        - with a 503 when the route has used up its token bucket, see `limit_route`. The client gets back the token it
+          took for the request, as it was not served.
+
+    Every rejection carries a Retry-After: the time until the client or route has a token again, or `retry_after`
+    seconds when the server is at capacity.
+    """
+
+    DEFAULT_MAX_CLIENTS = 10000
+    DEFAULT_RETRY_AFTER = 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            rate=None,
+            burst=None,
+            max_in_flight=None,
+            max_queue_depth=None,
+            retry_after=DEFAULT_RETRY_AFTER,
+            max_clients=DEFAULT_MAX_CLIENTS,
+    ):
+        # type: (float, float, int, int, int, int) -> None
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_queue_depth = max_queue_depth
+        self.retry_after = retry_after
+        self.max_clients = max_clients
+
+        self.in_flight = 0
+        self.stats = collections.Counter()
+
+        # -- client -> TokenBucket, least recently seen first.
+        self._clients = collections.OrderedDict()
+
+        # -- method -> router of route token buckets, None for the routes limited for every method.
+        self._routes = dict()
+
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def limit_route(self, path, rate, burst=None, method=None):
+        # type: (str, float, float, str) -> None
+        """
+        Limit the requests to a route, from all clients together, to `rate` per second, with bursts of up to `burst`.
+
+        :param path: the path of the route, as its resource was declared, like "/users/{id:int}".
+        :type path: str
+
+        :param method: only limit requests with this method, rather than all requests to the route.
+        :type method: str
+        """
+        router = self._routes.get(method)
+        if router is None:
+            router = self._routes[method] = ResourceRouter()
+        router.add(path, TokenBucket(rate, burst))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _route_bucket(self, method, path):
+        # type: (str, str) -> TokenBucket
+        for key in (method, None):
+            router = self._routes.get(key)
+            if router is not None:
+                bucket = router.match(path)[0]
+                if bucket is not None:
+                    return bucket
+        return None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _client_bucket(self, client):
+        # type: (str) -> TokenBucket
+        # -- must be called with the lock held.
+        bucket = self._clients.get(client)
+
+        if bucket is None:
+            bucket = self._clients[client] = TokenBucket(self.rate, self.burst)
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client)
+
+        return bucket
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _reject(self, stat, code, reason, message, retry_after):
+        # type: (str, int, str, str, float) -> Admission
+        self.stats[stat] += 1
+        return Admission(None, code, reason, message, int(math.ceil(retry_after)))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def admit(self, client, method, path, queue_depth=0):
+        # type: (str, str, str, int) -> Admission
+        """
+        Decide on a request, before anything but its head has been read.
+
+        :param client: identifies the client, like its address.
+        :type client: str
+
+        :param method: the request method.
+        :type method: str
+
+        :param path: the requested path, without the query string.
+        :type path: str
+
+        :param queue_depth: the number of requests waiting for a worker of the handler.
+        :type queue_depth: int
+
+        :return: the decision, which has to be released if the request was admitted.
+        :rtype: Admission
+        """
+        with self._lock:
+            if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+                return self._reject(
+                    'over_capacity', 503, 'Service Unavailable', 'Server is at capacity.', self.retry_after,
+                )
+
+            if self.max_queue_depth is not None and queue_depth > self.max_queue_depth:
+                return self._reject(
+                    'queue_full', 503, 'Service Unavailable', 'Server is at capacity.', self.retry_after,
+                )
+
+            now = time.monotonic()
+
+            client_bucket = None
+            if self.rate is not None:
+                client_bucket = self._client_bucket(client)
+                wait = client_bucket.take(now)
+                if wait:
+                    return self._reject('rate_limited', 429, 'Too Many Requests', 'Rate limit exceeded.', wait)
+
+            if self._routes:
+                bucket = self._route_bucket(method, path)
+                wait = bucket.take(now) if bucket is not None else 0.0
+                if wait:
+                    # -- the client wasn't served, so this request doesn't count against its rate limit.
+                    if client_bucket is not None:
+                        client_bucket.refund()
+                    return self._reject('route_limited', 503, 'Service Unavailable', 'Route is at capacity.', wait)
+
+            self.in_flight += 1
+            self.stats['admitted'] += 1
+
+        return Admission(self)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def as_dict(self):
+        # type: () -> dict
+        with self._lock:
+            return dict(self.stats, in_flight=self.in_flight, clients=len(self._clients))
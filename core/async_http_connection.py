@@ -0,0 +1,149 @@
+import asyncio
+
+from .http_framing import HTTPConnectionError, NEED_DATA
+from .http_connection import HTTPConnection, HTTPRequest
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class AsyncHTTPConnection(HTTPConnection):
+    """
+    Persistent HTTP/1.1 connection on top of asyncio streams. Frames requests with the same HTTPFramer HTTPConnection
+    uses, but waiting for data suspends the coroutine rather than blocking a thread, so idle keep-alive connections
+    and slow clients cost no threads at all.
+
+    Responses are written through `sendall`, which only buffers the data in the stream writer, followed by `drain`.
+    This lets the connection stand in for a socket in the synchronous response code of HTTPHandler.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, reader, writer, **kwargs):
+        # type: (asyncio.StreamReader, asyncio.StreamWriter, dict) -> None
+        self.reader = reader
+        self.writer = writer
+        super(AsyncHTTPConnection, self).__init__(writer.get_extra_info('socket'), **kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __aiter__(self):
+        return self._iter_requests()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def _iter_requests(self):
+        while not self.closed:
+            request = await self.read_request_async()
+            if request is None:
+                return
+            yield request
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def _receive_async(self):
+        # type: () -> bool
+        try:
+            data = await asyncio.wait_for(self.reader.read(self.RECV_SIZE), self.idle_timeout)
+        except asyncio.TimeoutError:
+            self.stats.increment('idle_timeouts')
+            return False
+        except OSError:
+            return False
+
+        if not data:
+            return False
+
+        self.framer.receive_data(data)
+        return True
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def read_head_async(self):
+        # type: () -> tuple
+        """
+        Read the next request head from the connection, see HTTPConnection.read_head
+        """
+        if not self._accepts_requests():
+            return None
+
+        if self._pending_body is not None:
+            async for _ in self._pending_body:
+                pass
+            self._pending_body = None
+
+        pipelined = bool(self.framer.buffer)
+
+        head = self.framer.next_head()
+        while head is NEED_DATA:
+            if not await self._receive_async():
+                return None
+            head = self.framer.next_head()
+
+        return head + (pipelined,)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def iter_body_async(self, headers, chunk_size=HTTPConnection.RECV_SIZE):
+        # type: (dict, int) -> iter
+        """
+        Asynchronously iterate over the body of the request whose head was just read, see HTTPConnection.iter_body
+        """
+        self.framer.start_body(headers)
+        return self._iter_body_async(chunk_size)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def _iter_body_async(self, chunk_size):
+        # type: (int) -> iter
+        while True:
+            data = self.framer.next_body_data(chunk_size)
+            if data is None:
+                return
+
+            if data is NEED_DATA:
+                if not await self._receive_async():
+                    raise HTTPConnectionError('Connection closed while reading the request body!')
+                continue
+
+            yield data
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def read_request_async(self):
+        # type: () -> HTTPRequest
+        """
+        Read and frame the next complete request from the connection, see HTTPConnection.read_request
+
+        If the request body is streamed, its body is an asynchronous iterator of chunks.
+        """
+        head = await self.read_head_async()
+        if head is None:
+            return None
+
+        admission = self._admit(head)
+        if admission is not None and not admission.admitted:
+            return self._request(head, None, admission)
+
+        headers = head[2]
+        try:
+            if self.stream_body is not None and self.stream_body(headers):
+                body = self._pending_body = self.iter_body_async(headers)
+            else:
+                body = b''.join([data async for data in self.iter_body_async(headers)])
+        except BaseException:
+            if admission is not None:
+                admission.release()
+            raise
+
+        return self._request(head, body, admission)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def sendall(self, data):
+        # type: (bytes) -> None
+        if self.writer.is_closing():
+            raise ConnectionResetError('Connection closed by the client!')
+        self.writer.write(data)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def drain(self):
+        await self.writer.drain()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        if self.closed:
+            return
+
+        self.closed = True
+        self.stats.connection_closed()
+        self.writer.close()
@@ -0,0 +1,362 @@
+import asyncio
+import inspect
+import logging
+import threading
+import concurrent.futures
+
+from clacks.core.handler import register_handler_type
+
+from .http_handler import HTTPHandler
+from .http_connection import HTTPConnectionError
+from .http_framing import BadRequestError
+from .async_http_connection import AsyncHTTPConnection
+from .streaming import is_stream, is_async_stream, encode_stream_item
+from .executors import ResourceBusyError
+
+
+logger = logging.getLogger(__name__)
+
+
+# -- marks the end of a synchronous stream or body that is pulled from another thread.
+_END = object()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class AsyncHTTPHandler(HTTPHandler):
+    """
+    HTTP handler running every connection as a coroutine on a single asyncio event loop, rather than blocking a thread
+    per connection for as long as it is open.
+
+    Reading requests and writing responses happens on the loop. All blocking work of the request pipeline, decoding
+    the request, digesting it, which calls into the server and its synchronous resources, and marshalling the
+    response, runs in a thread pool of at most `max_workers` threads, so thousands of concurrent slow requests queue
+    up for a bounded number of threads instead of each needing one of their own. The pipeline itself is that of the
+    HTTPHandler, see HTTPHandler.process_request
+
+    Resources defined with `async def` return a coroutine from the digest, which is then awaited on the loop itself, so
+    resources waiting on databases and other services don't hold on to a thread at all. Async generators are streamed
+    like regular generators.
+
+    Connections either come in through `handle_connection`, which hands the accepted socket over to the loop, or
+    through a listening socket opened with `listen`.
+    """
+
+    DEFAULT_MAX_WORKERS = 32
+
+    # -- requests are timed, but not profiled, as other requests run on the loop thread in between.
+    profiles_requests = False
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, marshaller, max_workers=DEFAULT_MAX_WORKERS, **kwargs):
+        super(AsyncHTTPHandler, self).__init__(marshaller, **kwargs)
+        self.max_workers = max_workers
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix='ClacksAsyncHTTPWorker')
+
+        # -- calls handed to the worker pool that have not completed yet, only ever counted on the loop thread.
+        self.pending = 0
+
+        self.loop = None
+        self._loop_thread = None
+        self._loop_lock = threading.Lock()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def get_loop(self):
+        # type: () -> asyncio.AbstractEventLoop
+        """
+        Get the event loop connections are served on, starting it in a background thread if it isn't running yet.
+        """
+        with self._loop_lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self.loop.run_forever,
+                    name='ClacksAsyncHTTPLoop',
+                    daemon=True,
+                )
+                self._loop_thread.start()
+
+        return self.loop
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def listen(self, host, port, **kwargs):
+        # type: (str, int, dict) -> asyncio.AbstractServer
+        """
+        Open a listening socket served directly by the event loop.
+
+        :param host: the host to listen on.
+        :type host: str
+
+        :param port: the port to listen on, 0 for any free port.
+        :type port: int
+
+        :return: the asyncio server.
+        :rtype: asyncio.AbstractServer
+        """
+        loop = self.get_loop()
+        return asyncio.run_coroutine_threadsafe(asyncio.start_server(self.serve, host, port, **kwargs), loop).result()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def handle_connection(self, connection, address):
+        """
+        Hand an accepted client socket over to the event loop. Returns immediately, the connection is served and closed
+        by the loop.
+
+        :param connection: the accepted client socket.
+        :type connection: socket.socket
+
+        :param address: the address of the client.
+        :type address: tuple
+        """
+        asyncio.run_coroutine_threadsafe(self._serve_socket(connection), self.get_loop())
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        """
+        Stop the event loop and the worker threads.
+        """
+        with self._loop_lock:
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self._loop_thread.join()
+                self.loop.close()
+                self.loop = None
+
+        self.executor.shutdown(wait=False)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def _serve_socket(self, connection):
+        try:
+            reader, writer = await asyncio.open_connection(sock=connection)
+        except OSError:
+            connection.close()
+            return
+
+        await self.serve(reader, writer)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def run_blocking(self, fn, *args):
+        """
+        Run blocking work of the request pipeline in the worker pool, without blocking the event loop.
+        """
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def queue_depth(self):
+        # type: () -> int
+        """
+        The number of calls waiting for a worker thread to digest their request.
+        """
+        return max(0, self.pending - self.max_workers)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def serve(self, reader, writer):
+        """
+        Serve every request a client sends over a single connection, see HTTPHandler.handle_connection
+
+        :param reader: the stream reader of the connection.
+        :type reader: asyncio.StreamReader
+
+        :param writer: the stream writer of the connection.
+        :type writer: asyncio.StreamWriter
+        """
+        http_connection = AsyncHTTPConnection(
+            reader,
+            writer,
+            idle_timeout=self.keep_alive_timeout,
+            max_requests=self.max_keep_alive_requests,
+            stats=self.connection_stats,
+            encoding=self.FORMAT,
+            stream_body=self._accepts_body_stream,
+            admit=self.admission(writer.get_extra_info('peername')),
+        )
+
+        try:
+            async for request in http_connection:
+                if request.admission is not None and not request.admission.admitted:
+                    self.reject_request(http_connection, request)
+                    break
+
+                keep_alive = http_connection.keep_alive(request.request_line, request.headers) and not self.draining
+                keep_alive = await self.process_request(http_connection, request, keep_alive)
+
+                if not keep_alive:
+                    break
+
+        except HTTPConnectionError as e:
+            self.connection_stats.increment('framing_errors')
+            logger.warning('Closing connection from %s: %s' % (writer.get_extra_info('peername'), e))
+
+            # -- nothing of the request was read past its head yet, so it can still be told why it is rejected.
+            if isinstance(e, BadRequestError):
+                self.respond_error(http_connection, 400, 'Bad Request', str(e))
+
+        except (ConnectionError, OSError):
+            pass
+
+        finally:
+            try:
+                await http_connection.drain()
+            except (ConnectionError, OSError):
+                pass
+            http_connection.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def drain(self, connection):
+        await connection.drain()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def iter_body_blocking(self, body):
+        # type: (iter) -> iter
+        """
+        Get a streamed request body as an iterator that `run_blocking` work can consume, which pulls the chunks of the
+        body off the connection on the loop.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def next_chunk():
+            try:
+                return await body.__anext__()
+            except StopAsyncIteration:
+                return _END
+
+        def iter_chunks():
+            while True:
+                chunk = asyncio.run_coroutine_threadsafe(next_chunk(), loop).result()
+                if chunk is _END:
+                    return
+                yield chunk
+
+        return iter_chunks()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def is_stream(result):
+        # type: (object) -> bool
+        """
+        Whether a resource result is streamed by this handler, which streams async generators too.
+        """
+        return is_stream(result) or is_async_stream(result)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def resolve_result_async(self, transaction_id, response):
+        """
+        Await resource results that are not available yet when the server is done digesting the request, see
+        HTTPHandler.resolve_result. Neither futures nor coroutines hold on to a worker thread while waiting.
+
+        :return: the resolved result.
+        :rtype: object
+        """
+        result = response.payload.get('response') if isinstance(response.payload, dict) else None
+
+        if isinstance(result, concurrent.futures.Future):
+            result = asyncio.wrap_future(result)
+
+        if not inspect.isawaitable(result):
+            return result
+
+        try:
+            result = response.payload['response'] = await result
+        except ResourceBusyError as e:
+            self.fail_response(transaction_id, response, e, code=503, reason='Service Unavailable')
+            result = None
+        except Exception as e:
+            self.fail_response(transaction_id, response, e)
+            result = None
+
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def respond_file_async(self, connection, transaction_id, response, header_data):
+        """
+        Respond with a file returned by a static files resource, see HTTPHandler.respond_file. Files that aren't cached
+        are sent with the loop's sendfile, which falls back to reading the file in chunks where sendfile isn't
+        available.
+
+        :return: whether the connection can be kept open after this response.
+        :rtype: bool
+        """
+        static_file, offset, count = self._start_file(connection, transaction_id, response, header_data)
+        header = self.encode_response_head(transaction_id, response, count)
+
+        if not count:
+            connection.sendall(header)
+            await connection.drain()
+            return response.keep_alive
+
+        if static_file.data is not None:
+            connection.sendall(header + static_file.data[offset:offset + count])
+            await connection.drain()
+            return response.keep_alive
+
+        connection.sendall(header)
+
+        try:
+            with open(static_file.path, 'rb') as fp:
+                await connection.drain()
+                sent = await asyncio.get_running_loop().sendfile(connection.writer.transport, fp, offset, count)
+        except OSError:
+            logger.exception('Sending file %s for transaction %s failed!' % (static_file.path, transaction_id))
+            return False
+
+        return response.keep_alive and sent == count
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def respond_stream_async(self, connection, transaction_id, response, chunked=True, header_data=None):
+        """
+        Stream the items of a generator, iterator or async generator returned by a resource, see
+        HTTPHandler.respond_stream. Items of synchronous streams are produced in a worker thread, async ones on the
+        loop. The connection is drained after every write, so a slow client pauses the producer.
+
+        :return: whether the connection can be kept open after this response.
+        :rtype: bool
+        """
+        stream, writer = self._start_stream(connection, transaction_id, response, chunked, header_data)
+        flush_items = getattr(stream, 'flush_items', False)
+
+        try:
+            connection.sendall(self.encode_response_head(transaction_id, response, 0))
+
+            if is_async_stream(stream):
+                async for item in stream:
+                    writer.write(encode_stream_item(item, self.FORMAT))
+                    if flush_items:
+                        writer.flush()
+                    await connection.drain()
+
+            else:
+                while True:
+                    item = await self.run_blocking(next, stream, _END)
+                    if item is _END:
+                        break
+                    writer.write(encode_stream_item(item, self.FORMAT))
+                    if flush_items:
+                        writer.flush()
+                    await connection.drain()
+
+            writer.close()
+            await connection.drain()
+
+        except ConnectionError:
+            return False
+
+        except Exception:
+            logger.exception('Streaming response for transaction %s failed!' % transaction_id)
+            return False
+
+        finally:
+            close = getattr(stream, 'aclose', None)
+            if close is not None:
+                await close()
+            else:
+                close = getattr(stream, 'close', None)
+                if close is not None:
+                    close()
+
+        return response.keep_alive
+
+
+register_handler_type('async_http', AsyncHTTPHandler)
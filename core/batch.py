@@ -0,0 +1,139 @@
+import threading
+import concurrent.futures
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class BatchError(Exception):
+    """
+    Raised by a batch dispatcher to fail a single operation with a specific status code.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, code, message):
+        # type: (int, str) -> None
+        super(BatchError, self).__init__(message)
+        self.code = code
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class BatchRunner(object):
+    """
+    Runs the operations of batch requests, one after the other or in parallel.
+
+    Parallel batches are run by at most `max_concurrency` runners on a pool of `max_workers` threads shared by all
+    batches; every runner takes the next operation of its batch until there are none left, so a single large batch
+    can't take over the pool. Operations are dispatched by a callable taking the operation and returning its result.
+
+    Every operation gets its own status: 200 if it succeeded, the code of a BatchError it failed with, or 500 for any
+    other error. One operation failing never fails the rest of the batch.
+    """
+
+    DEFAULT_MAX_OPERATIONS = 100
+    DEFAULT_MAX_CONCURRENCY = 8
+    DEFAULT_MAX_WORKERS = 32
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            max_operations=DEFAULT_MAX_OPERATIONS,
+            max_concurrency=DEFAULT_MAX_CONCURRENCY,
+            max_workers=DEFAULT_MAX_WORKERS,
+    ):
+        # type: (int, int, int) -> None
+        self.max_operations = max_operations
+        self.max_concurrency = max_concurrency
+        self.max_workers = max_workers
+
+        self._pool = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def pool(self):
+        # type: () -> concurrent.futures.ThreadPoolExecutor
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix='ClacksBatch')
+        return self._pool
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def validate(self, operations, parallel=False, max_concurrency=None):
+        # type: (list, bool, int) -> None
+        """
+        Check a batch and its options before running any of it, raising a ValueError if it is malformed or too large.
+        """
+        # -- anything but an actual bool would be truthy, "false" included.
+        if type(parallel) is not bool:
+            raise ValueError('Batch "parallel" must be a boolean, not %r!' % (parallel,))
+
+        if max_concurrency is not None and (type(max_concurrency) is not int or max_concurrency < 0):
+            raise ValueError('Batch "max_concurrency" must be a non-negative integer, not %r!' % (max_concurrency,))
+
+        if not isinstance(operations, (list, tuple)):
+            raise ValueError('Batch operations must be a list!')
+
+        if len(operations) > self.max_operations:
+            msg = 'Batch has %s operations, at most %s are allowed!' % (len(operations), self.max_operations)
+            raise ValueError(msg)
+
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict) or not isinstance(operation.get('path'), str):
+                raise ValueError('Batch operation %s must be an object with a "path"!' % index)
+
+            if not isinstance(operation.get('kwargs', dict()), dict):
+                raise ValueError('The "kwargs" of batch operation %s must be an object!' % index)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def run_operation(cls, dispatch, operation):
+        # type: (callable, dict) -> dict
+        try:
+            return dict(status=200, response=dispatch(operation))
+        except BatchError as e:
+            return dict(status=e.code, error=str(e))
+        except Exception as e:
+            return dict(status=500, error=str(e))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def run(self, operations, dispatch, parallel=False, max_concurrency=None):
+        # type: (list, callable, bool, int) -> list
+        """
+        Run a batch.
+
+        :param operations: the operations, objects with a "method", a "path" and optionally "kwargs".
+        :type operations: list(dict)
+
+        :param dispatch: callable running a single operation, returning its result.
+        :type dispatch: callable
+
+        :param parallel: whether to run the operations in parallel.
+        :type parallel: bool
+
+        :param max_concurrency: at most this many operations run at the same time, capped by the runner's own limit.
+        :type max_concurrency: int
+
+        :return: the result of every operation, in the order of the operations.
+        :rtype: list(dict)
+        """
+        self.validate(operations, parallel, max_concurrency)
+
+        concurrency = min(max_concurrency or self.max_concurrency, self.max_concurrency, len(operations))
+        if not parallel or concurrency <= 1:
+            return [self.run_operation(dispatch, operation) for operation in operations]
+
+        results = [None] * len(operations)
+        remaining = iter(enumerate(operations))
+        lock = threading.Lock()
+
+        def runner():
+            while True:
+                with lock:
+                    index, operation = next(remaining, (None, None))
+                if index is None:
+                    return
+                results[index] = self.run_operation(dispatch, operation)
+
+        for future in [self.pool.submit(runner) for _ in range(concurrency)]:
+            future.result()
+
+        return results
@@ -0,0 +1,245 @@
+import json
+import typing
+import inspect
+
+
+# -- string values accepted for bool arguments, compared lower case.
+TRUE_VALUES = frozenset(('true', '1', 'yes', 'on'))
+FALSE_VALUES = frozenset(('false', '0', 'no', 'off', ''))
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ArgumentError(ValueError):
+    """
+    Raised by a binder when the arguments of a call don't match the resource: a required argument is missing, an
+    argument is not accepted by the resource, or a value can't be converted to the type the resource declares for it.
+    """
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _coerce_str(value):
+    if isinstance(value, str):
+        return value
+    raise TypeError
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _coerce_int(value):
+    if type(value) is int:
+        return value
+    if isinstance(value, str):
+        return int(value)
+    if type(value) is float and value.is_integer():
+        return int(value)
+    raise TypeError
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _coerce_float(value):
+    if type(value) is float:
+        return value
+    if type(value) is int or isinstance(value, str):
+        return float(value)
+    raise TypeError
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _coerce_bool(value):
+    if type(value) is bool:
+        return value
+    if isinstance(value, str):
+        value = value.lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+    elif type(value) is int and value in (0, 1):
+        return bool(value)
+    raise ValueError
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _coerce_dict(value):
+    if isinstance(value, str):
+        value = json.loads(value)
+    if isinstance(value, dict):
+        return value
+    raise TypeError
+
+
+_SIMPLE_COERCERS = {
+    str: _coerce_str,
+    int: _coerce_int,
+    float: _coerce_float,
+    bool: _coerce_bool,
+    dict: _coerce_dict,
+}
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _sequence_coercer(container, item_coercer):
+    # type: (type, callable) -> callable
+    def coerce(value):
+        # -- a query string carries lists as comma-separated values, like "?ids=1,2,3".
+        if isinstance(value, str):
+            value = value.split(',') if value else list()
+        elif not isinstance(value, (list, tuple)):
+            raise TypeError
+
+        if item_coercer is None:
+            return container(value)
+        return container([item_coercer(item) for item in value])
+
+    return coerce
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _union_coercer(coercers, optional):
+    # type: (list, bool) -> callable
+    def coerce(value):
+        if value is None and optional:
+            return None
+
+        for coercer in coercers:
+            try:
+                return coercer(value)
+            except (TypeError, ValueError):
+                continue
+        raise ValueError
+
+    return coerce
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def make_coercer(annotation):
+    # type: (object) -> callable
+    """
+    Build the function converting a request value to the given type.
+
+    Supported are str, int, float, bool and dict, lists, tuples and sets of these, and Optional or Union of any of
+    them. Values that already have the right type are passed through, strings are parsed.
+
+    :param annotation: the type hint.
+    :type annotation: object
+
+    :return: callable taking a value and returning the converted value, raising TypeError or ValueError if it can't
+        be converted. None if values of this type are not converted.
+    :rtype: callable
+    """
+    coercer = _SIMPLE_COERCERS.get(annotation)
+    if coercer is not None:
+        return coercer
+
+    origin = typing.get_origin(annotation) or annotation
+    args = typing.get_args(annotation)
+
+    if origin in (list, tuple, set, frozenset):
+        item_coercer = make_coercer(args[0]) if args and args[0] is not Ellipsis else None
+        return _sequence_coercer(origin, item_coercer)
+
+    if origin is dict:
+        return _coerce_dict
+
+    if origin is typing.Union:
+        optional = type(None) in args
+        coercers = [make_coercer(arg) for arg in args if arg is not type(None)]
+
+        # -- a union that accepts anything for any of its types can't be checked.
+        if None in coercers:
+            return None
+
+        if optional and len(coercers) == 1:
+            coercer = coercers[0]
+            return lambda value: None if value is None else coercer(value)
+
+        return _union_coercer(coercers, optional)
+
+    return None
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def compile_binder(fn):
+    # type: (callable) -> callable
+    """
+    Build the binder of a resource from its signature, once, when the resource is registered.
+
+    The binder takes the keyword arguments of a call and converts every value to the type hint of its parameter, or,
+    for parameters without a type hint, to the type of their bool, int or float default. It raises an ArgumentError if
+    a required argument is missing, if an argument isn't accepted by the resource, or if a value can't be converted.
+
+    A leading "self" or "cls" parameter is left out, since resources are called as bound methods.
+
+    :param fn: the resource function.
+    :type fn: callable
+
+    :return: callable taking the keyword arguments dict, converting its values in place and returning it.
+    :rtype: callable
+    """
+    try:
+        hints = typing.get_type_hints(fn)
+    except Exception:
+        hints = dict(getattr(fn, '__annotations__', dict()))
+
+    parameters = list(inspect.signature(fn).parameters.values())
+    if parameters and parameters[0].name in ('self', 'cls'):
+        parameters = parameters[1:]
+
+    coercers = list()
+    required = list()
+    accepted = set()
+    accepts_any = False
+
+    for parameter in parameters:
+        if parameter.kind is parameter.VAR_KEYWORD:
+            accepts_any = True
+            continue
+
+        if parameter.kind in (parameter.POSITIONAL_ONLY, parameter.VAR_POSITIONAL):
+            continue
+
+        accepted.add(parameter.name)
+
+        if parameter.default is parameter.empty:
+            required.append(parameter.name)
+
+        annotation = hints.get(parameter.name, parameter.empty)
+        if annotation is parameter.empty and type(parameter.default) in (bool, int, float):
+            annotation = type(parameter.default)
+
+        coercer = make_coercer(annotation)
+        if coercer is not None:
+            # -- a None default means the argument is optional, whatever its type hint says.
+            expected = getattr(annotation, '__name__', None) or str(annotation)
+            coercers.append((parameter.name, coercer, parameter.default is None, expected))
+
+    coercers = tuple(coercers)
+    required = tuple(required)
+    accepted = frozenset(accepted)
+
+    def bind(kwargs):
+        # type: (dict) -> dict
+        for name in required:
+            if name not in kwargs:
+                raise ArgumentError('Missing required argument "%s"!' % name)
+
+        if not accepts_any and not accepted.issuperset(kwargs):
+            unexpected = sorted(set(kwargs) - accepted)
+            raise ArgumentError('Unexpected argument "%s"!' % '", "'.join(unexpected))
+
+        for name, coercer, nullable, expected in coercers:
+            if name not in kwargs:
+                continue
+
+            value = kwargs[name]
+            if value is None and nullable:
+                continue
+
+            try:
+                kwargs[name] = coercer(value)
+            except (TypeError, ValueError):
+                raise ArgumentError('Invalid value for argument "%s": %r, expected %s!' % (name, value, expected))
+
+        return kwargs
+
+    return bind
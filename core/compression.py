@@ -0,0 +1,170 @@
+import zlib
+import hashlib
+import threading
+import collections
+
+
+# -- content codings we can produce, in order of preference when the client has no preference.
+SUPPORTED_ENCODINGS = ('gzip', 'deflate')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def parse_accept_encoding(value):
+    # type: (str) -> dict
+    """
+    Parse an Accept-Encoding header value into a dict of content coding -> quality value.
+
+    :param value: the Accept-Encoding header value, for example 'gzip;q=1.0, deflate;q=0.5, *;q=0'
+    :type value: str
+
+    :return: dict of lower case content coding -> quality value.
+    :rtype: dict
+    """
+    result = dict()
+
+    for item in value.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        quality = 1.0
+        key, _, q = params.strip().partition('=')
+        if key.strip().lower() == 'q':
+            try:
+                quality = float(q)
+            except ValueError:
+                quality = 0.0
+
+        result[coding] = quality
+
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def negotiate_encoding(accept_encoding, supported=SUPPORTED_ENCODINGS):
+    # type: (str, tuple) -> str
+    """
+    Pick the content coding to respond with.
+
+    :param accept_encoding: the Accept-Encoding header value of the request.
+    :type accept_encoding: str
+
+    :param supported: the content codings we can produce, in order of preference.
+    :type supported: tuple
+
+    :return: the content coding to use, or None to send the body as-is.
+    :rtype: str
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+
+    best, best_quality = None, 0.0
+    for coding in supported:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+
+    return best
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def compress(body, encoding, level=6):
+    # type: (bytes, str, int) -> bytes
+    """
+    Compress a body with the given content coding.
+
+    :param body: the body to compress.
+    :type body: bytes
+
+    :param encoding: 'gzip' or 'deflate'.
+    :type encoding: str
+
+    :param level: the compression level, 1 (fastest) to 9 (smallest).
+    :type level: int
+
+    :return: the compressed body.
+    :rtype: bytes
+    """
+    if encoding == 'gzip':
+        # -- zlib with a gzip container rather than the gzip module, which is slower and stamps the current time into
+        # -- the header, so the same body would not always compress to the same bytes.
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(body) + compressor.flush()
+
+    if encoding == 'deflate':
+        # -- "deflate" in HTTP means the zlib format, not raw deflate.
+        return zlib.compress(body, level)
+
+    raise ValueError('Unsupported content coding: %s' % encoding)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class CompressionCache(object):
+    """
+    Bounded LRU of compressed bodies, keyed by content coding, level and a digest of the uncompressed body, so repeated
+    responses are only compressed once. Uncompressed bodies are never held on to. Bounded both by number of entries and
+    by the total size of the cached compressed bodies.
+    """
+
+    DEFAULT_MAX_ENTRIES = 256
+    DEFAULT_MAX_BYTES = 64 * 1024 ** 2
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        # type: (int, int) -> None
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+
+        self.stats = collections.Counter()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __len__(self):
+        return len(self._entries)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def compress(self, body, encoding, level=6):
+        # type: (bytes, str, int) -> bytes
+        """
+        Get the compressed version of a body, compressing and caching it if it was not cached yet.
+        """
+        key = (encoding, level, hashlib.blake2b(body, digest_size=16).digest())
+
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return result
+
+        self.stats['misses'] += 1
+        result = compress(body, encoding, level)
+
+        entry_size = len(result)
+        if not self.max_entries or (self.max_bytes and entry_size > self.max_bytes):
+            return result
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = result
+                self.size += entry_size
+
+            while len(self._entries) > self.max_entries or (self.max_bytes and self.size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.stats['evictions'] += 1
+
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
@@ -0,0 +1,171 @@
+import hashlib
+import datetime
+import email.utils
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class NotModified(str):
+    """
+    Returned instead of a resource's result when the client's cached copy is still current. It is an empty string, so
+    that it marshals to an empty body no matter which marshaller is used.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __new__(cls, etag=None, last_modified=None):
+        instance = super(NotModified, cls).__new__(cls, '')
+        instance.etag = etag
+        instance.last_modified = last_modified
+        return instance
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def make_etag(token, weak=False):
+    # type: (object, bool) -> str
+    """
+    Turn a version token into an entity tag.
+
+    :param token: any value that changes whenever the resource changes.
+    :type token: object
+
+    :param weak: if True, make a weak entity tag.
+    :type weak: bool
+
+    :return: the entity tag, including quotes.
+    :rtype: str
+    """
+    tag = '"%s"' % str(token).replace('"', '')
+    return 'W/' + tag if weak else tag
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def hash_etag(body, weak=False):
+    # type: (bytes, bool) -> str
+    """
+    Compute an entity tag from a response body.
+    """
+    return make_etag(hashlib.blake2b(body, digest_size=16).hexdigest(), weak)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def etag_matches(if_none_match, etag):
+    # type: (str, str) -> bool
+    """
+    Whether an If-None-Match header value matches the given entity tag. Uses weak comparison, as is required for
+    If-None-Match, so 'W/"1"' matches '"1"'.
+    """
+    if not if_none_match or not etag:
+        return False
+
+    if if_none_match.strip() == '*':
+        return True
+
+    if etag.startswith('W/'):
+        etag = etag[2:]
+
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+
+    return False
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def to_timestamp(value):
+    # type: (object) -> float
+    """
+    Convert a datetime or a POSIX timestamp into a POSIX timestamp.
+    """
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def format_http_date(timestamp):
+    # type: (float) -> str
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def parse_http_date(value):
+    # type: (str) -> float
+    """
+    Parse an HTTP date into a POSIX timestamp, or None if it can't be parsed.
+    """
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def is_not_modified(header_data, etag=None, last_modified=None):
+    # type: (dict, str, float) -> bool
+    """
+    Evaluate the conditional headers of a GET request against the current validators of a resource.
+
+    If-Modified-Since is only considered if the request has no If-None-Match header, as per RFC 7232.
+
+    :param header_data: the request headers.
+    :type header_data: dict
+
+    :param etag: the current entity tag of the resource, if known.
+    :type etag: str
+
+    :param last_modified: the time the resource was last modified, as a POSIX timestamp, if known.
+    :type last_modified: float
+
+    :return: True if the client's cached copy is still current, and a 304 can be sent.
+    :rtype: bool
+    """
+    if_none_match = header_data.get('If-None-Match')
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = header_data.get('If-Modified-Since')
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    since = parse_http_date(if_modified_since)
+
+    # -- HTTP dates have a resolution of a second.
+    return since is not None and int(last_modified) <= since
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def resource_validators(resource, kwargs):
+    # type: (callable, dict) -> tuple
+    """
+    Get the validators a resource supplies through the `version` and `last_modified` options of its decorator. These
+    are called with the same arguments as the resource itself, which makes it possible to answer conditional requests
+    without calling the resource.
+
+    :param resource: the resource.
+    :type resource: callable
+
+    :param kwargs: the keyword arguments the resource would be called with.
+    :type kwargs: dict
+
+    :return: the entity tag and last modified timestamp, either of which may be None.
+    :rtype: tuple(str, float)
+    """
+    # -- the options are set on the plain function, bind them to the same instance as the resource.
+    instance = getattr(resource, '__self__', None)
+    args = () if instance is None else (instance,)
+
+    etag = None
+    version = getattr(resource, 'version', None)
+    if version is not None:
+        etag = make_etag(version(*args, **kwargs), weak=getattr(resource, 'etag', None) == 'weak')
+
+    last_modified = getattr(resource, 'last_modified', None)
+    if last_modified is not None:
+        last_modified = to_timestamp(last_modified(*args, **kwargs))
+
+    return etag, last_modified
+
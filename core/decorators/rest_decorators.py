@@ -1,10 +1,26 @@
+from clacks_web.core.response_cache import make_response_cache
+from clacks_web.core.executors import make_resource_executor, INLINE
+
+
 # ----------------------------------------------------------------------------------------------------------------------
-def resource(path, method, expose_as_method=False):
-    # type: (str, str, bool) -> callable
+def resource(
+        path,
+        method,
+        expose_as_method=False,
+        etag=None,
+        version=None,
+        last_modified=None,
+        cache=None,
+        executor=INLINE,
+        max_concurrency=0,
+        max_queue=0,
+):
+    # type: (str, str, bool, str, callable, callable, object, str, int, int) -> callable
     """
     Generic resource, requires that you declare an all-upper-case method type.
 
-    :param path: the URL to the resource, relative to the master page. Starts with '/'
+    :param path: the URL to the resource, relative to the master page. Starts with '/'. May contain typed path
+        parameters, like '/users/{id:int}', which are passed to the resource as keyword arguments.
     :type path: str
 
     :param method: The method to expose this resource under. Examples are POST, GET, PUT, DELETE, PATCH
@@ -13,12 +29,51 @@ def resource(path, method, expose_as_method=False):
     :param expose_as_method: If True, will not register this method as a server command.
     :type expose_as_method: bool
 
+    :param etag: 'strong' or 'weak' to send an ETag with every response of this resource, and answer requests whose
+        If-None-Match matches it with a bodiless 304. Without `version`, the ETag is a hash of the response body.
+        Requires the "conditional" adapter.
+    :type etag: str
+
+    :param version: callable taking the same arguments as the resource, returning a token that changes whenever the
+        result of the resource does. Used as the ETag, and when it matches the client's If-None-Match, the resource is
+        not called at all.
+    :type version: callable
+
+    :param last_modified: callable taking the same arguments as the resource, returning the time the result last
+        changed as a datetime or POSIX timestamp. Sent as Last-Modified and used to answer If-Modified-Since without
+        calling the resource.
+    :type last_modified: callable
+
+    :param cache: cache the marshalled responses of this resource. Either a ResponseCache, a dict of ResponseCache
+        arguments (ttl, max_entries, the kwargs and headers that make up the cache key, and a name to invalidate it
+        by), or a TTL in seconds.
+    :type cache: ResponseCache or dict or float
+
+    :param executor: where to run the resource: 'inline' on the handler thread (the default), 'thread' on the shared
+        thread pool, or 'process' on the shared process pool, for CPU-bound work. Process resources must be static
+        methods or plain functions.
+    :type executor: str
+
+    :param max_concurrency: maximum number of calls of this resource running at the same time, further calls are
+        queued. Requires the "thread" or "process" executor. 0 for no limit.
+    :type max_concurrency: int
+
+    :param max_queue: maximum number of queued calls of this resource, further calls are rejected. 0 for no limit.
+    :type max_queue: int
+
     :return: the decorated method
     :rtype: callable
     """
     def wrapper(fn):
         fn.resource_type = method.upper()
         fn.path = path
+        fn.executor = make_resource_executor(
+            executor, max_concurrency, max_queue, name='%s %s' % (fn.resource_type, path),
+        )
+        fn.etag = etag
+        fn.version = version
+        fn.last_modified = last_modified
+        fn.cache = make_response_cache(cache)
         # -- if the user doesn't want the decorated method to be registered as a server command, the "expose as method"
         # -- argument can be set to False, which will mark the method as private.
         if not expose_as_method:
@@ -28,11 +83,13 @@ def resource(path, method, expose_as_method=False):
 
 
 # ----------------------------------------------------------------------------------------------------------------------
-def post(path, expose_as_method=False):
-    # type: (str, bool) -> callable
+def post(path, expose_as_method=False, executor=INLINE, max_concurrency=0, max_queue=0):
+    # type: (str, bool, str, int, int) -> callable
     """
     Generic resource, requires that you declare an all-upper-case method type.
 
+    Any other options are documented on `resource`.
+
     :param path: the URL to the resource, relative to the master page. Starts with '/'
     :type path: str
 
@@ -45,6 +102,7 @@ def post(path, expose_as_method=False):
     def wrapper(fn):
         fn.resource_type = 'POST'
         fn.path = path
+        fn.executor = make_resource_executor(executor, max_concurrency, max_queue, name='POST %s' % path)
         # -- if the user doesn't want the decorated method to be registered as a server command, the "expose as method"
         # -- argument can be set to False, which will mark the method as private.
         if not expose_as_method:
@@ -54,11 +112,23 @@ def post(path, expose_as_method=False):
 
 
 # ----------------------------------------------------------------------------------------------------------------------
-def get(path, expose_as_method=False):
-    # type: (str, bool) -> callable
+def get(
+        path,
+        expose_as_method=False,
+        etag=None,
+        version=None,
+        last_modified=None,
+        cache=None,
+        executor=INLINE,
+        max_concurrency=0,
+        max_queue=0,
+):
+    # type: (str, bool, str, callable, callable, object, str, int, int) -> callable
     """
     Generic resource, requires that you declare an all-upper-case method type.
 
+    Any other options are documented on `resource`.
+
     :param path: the URL to the resource, relative to the master page. Starts with '/'
     :type path: str
 
@@ -71,6 +141,11 @@ def get(path, expose_as_method=False):
     def wrapper(fn):
         fn.resource_type = 'GET'
         fn.path = path
+        fn.executor = make_resource_executor(executor, max_concurrency, max_queue, name='GET %s' % path)
+        fn.etag = etag
+        fn.version = version
+        fn.last_modified = last_modified
+        fn.cache = make_response_cache(cache)
         # -- if the user doesn't want the decorated method to be registered as a server command, the "expose as method"
         # -- argument can be set to False, which will mark the method as private.
         if not expose_as_method:
@@ -80,11 +155,13 @@ def get(path, expose_as_method=False):
 
 
 # ----------------------------------------------------------------------------------------------------------------------
-def put(path, expose_as_method=False):
-    # type: (str, bool) -> callable
+def put(path, expose_as_method=False, executor=INLINE, max_concurrency=0, max_queue=0):
+    # type: (str, bool, str, int, int) -> callable
     """
     Generic resource, requires that you declare an all-upper-case method type.
 
+    Any other options are documented on `resource`.
+
     :param path: the URL to the resource, relative to the master page. Starts with '/'
     :type path: str
 
@@ -97,6 +174,7 @@ def put(path, expose_as_method=False):
     def wrapper(fn):
         fn.resource_type = 'PUT'
         fn.path = path
+        fn.executor = make_resource_executor(executor, max_concurrency, max_queue, name='PUT %s' % path)
         # -- if the user doesn't want the decorated method to be registered as a server command, the "expose as method"
         # -- argument can be set to False, which will mark the method as private.
         if not expose_as_method:
@@ -106,11 +184,13 @@ def put(path, expose_as_method=False):
 
 
 # ----------------------------------------------------------------------------------------------------------------------
-def patch(path, expose_as_method=False):
-    # type: (str, bool) -> callable
+def patch(path, expose_as_method=False, executor=INLINE, max_concurrency=0, max_queue=0):
+    # type: (str, bool, str, int, int) -> callable
     """
     Generic resource, requires that you declare an all-upper-case method type.
 
+    Any other options are documented on `resource`.
+
     :param path: the URL to the resource, relative to the master page. Starts with '/'
     :type path: str
 
@@ -123,6 +203,7 @@ def patch(path, expose_as_method=False):
     def wrapper(fn):
         fn.resource_type = 'PATCH'
         fn.path = path
+        fn.executor = make_resource_executor(executor, max_concurrency, max_queue, name='PATCH %s' % path)
         # -- if the user doesn't want the decorated method to be registered as a server command, the "expose as method"
         # -- argument can be set to False, which will mark the method as private.
         if not expose_as_method:
@@ -132,11 +213,13 @@ def patch(path, expose_as_method=False):
 
 
 # ----------------------------------------------------------------------------------------------------------------------
-def delete(path, expose_as_method=False):
-    # type: (str, bool) -> callable
+def delete(path, expose_as_method=False, executor=INLINE, max_concurrency=0, max_queue=0):
+    # type: (str, bool, str, int, int) -> callable
     """
     Generic resource, requires that you declare an all-upper-case method type.
 
+    Any other options are documented on `resource`.
+
     :param path: the URL to the resource, relative to the master page. Starts with '/'
     :type path: str
 
@@ -149,6 +232,7 @@ def delete(path, expose_as_method=False):
     def wrapper(fn):
         fn.resource_type = 'DELETE'
         fn.path = path
+        fn.executor = make_resource_executor(executor, max_concurrency, max_queue, name='DELETE %s' % path)
         # -- if the user doesn't want the decorated method to be registered as a server command, the "expose as method"
         # -- argument can be set to False, which will mark the method as private.
         if not expose_as_method:
@@ -0,0 +1,258 @@
+import os
+import inspect
+import weakref
+import functools
+import threading
+import collections
+import concurrent.futures
+
+
+# -- executor kinds a resource can be run on.
+INLINE, THREAD, PROCESS = 'inline', 'thread', 'process'
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ResourceBusyError(Exception):
+    """
+    Raised (through the returned future) when a resource's queue is full and the call was rejected.
+    """
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ExecutorPools(object):
+    """
+    Lazily created, size-limited thread and process pools shared by every resource that runs off the handler thread.
+    """
+
+    DEFAULT_THREAD_WORKERS = 32
+    DEFAULT_PROCESS_WORKERS = os.cpu_count() or 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, thread_workers=DEFAULT_THREAD_WORKERS, process_workers=DEFAULT_PROCESS_WORKERS):
+        # type: (int, int) -> None
+        self.workers = {THREAD: thread_workers, PROCESS: process_workers}
+        self._pools = dict()
+        self._lock = threading.Lock()
+
+        # -- calls submitted to each pool that have not completed yet.
+        self.in_flight = collections.Counter()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def configure(self, thread_workers=None, process_workers=None):
+        # type: (int, int) -> None
+        """
+        Set the size of the pools. Only affects pools that have not been created yet.
+        """
+        if thread_workers is not None:
+            self.workers[THREAD] = thread_workers
+        if process_workers is not None:
+            self.workers[PROCESS] = process_workers
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def get(self, kind):
+        # type: (str) -> concurrent.futures.Executor
+        with self._lock:
+            pool = self._pools.get(kind)
+            if pool is None:
+                if kind == THREAD:
+                    pool = concurrent.futures.ThreadPoolExecutor(
+                        self.workers[THREAD],
+                        thread_name_prefix='ClacksResourceWorker',
+                    )
+                elif kind == PROCESS:
+                    pool = concurrent.futures.ProcessPoolExecutor(self.workers[PROCESS])
+                else:
+                    raise ValueError('Unknown executor kind: %s' % kind)
+                self._pools[kind] = pool
+        return pool
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def submit(self, kind, fn, *args, **kwargs):
+        # type: (str, callable, tuple, dict) -> concurrent.futures.Future
+        future = self.get(kind).submit(fn, *args, **kwargs)
+
+        with self._lock:
+            self.in_flight[kind] += 1
+        future.add_done_callback(functools.partial(self._done, kind))
+
+        return future
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _done(self, kind, _):
+        with self._lock:
+            self.in_flight[kind] -= 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def shutdown(self, wait=True):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def as_dict(self):
+        # type: () -> dict
+        with self._lock:
+            return dict(
+                (kind, dict(max_workers=self.workers[kind], in_flight=self.in_flight[kind]))
+                for kind in (THREAD, PROCESS)
+            )
+
+
+pools = ExecutorPools()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ResourceExecutor(object):
+    """
+    Runs the calls of a single resource on a shared thread or process pool.
+
+    At most `max_concurrency` calls of the resource run at the same time, further calls wait in a queue of their own, so
+    a burst of calls to a single slow resource can't take over the shared pool. Once `max_queue` calls are waiting,
+    new calls are rejected with a ResourceBusyError. Either limit is disabled when 0.
+
+    Calls never block: `submit` returns a future straight away, which the handler waits for or awaits.
+
+    Process resources are pickled to the worker process along with their arguments, so they have to be plain functions
+    or static methods; resources that are bound to an interface instance can only run inline or on a thread.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, kind=THREAD, max_concurrency=0, max_queue=0, name=None, pools=pools):
+        # type: (str, int, int, str, ExecutorPools) -> None
+        if kind not in (THREAD, PROCESS):
+            raise ValueError('Unknown executor kind: %s' % kind)
+
+        self.kind = kind
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.name = name
+        self.pools = pools
+
+        self.running = 0
+        self._waiting = collections.deque()
+        self._lock = threading.Lock()
+
+        self.stats = collections.Counter()
+
+        _executors.add(self)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def queue_depth(self):
+        # type: () -> int
+        return len(self._waiting)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def submit(self, fn, *args, **kwargs):
+        # type: (callable, tuple, dict) -> concurrent.futures.Future
+        """
+        Run a call of the resource.
+
+        :return: future of the result. Fails with a ResourceBusyError if the call was rejected.
+        :rtype: concurrent.futures.Future
+        """
+        future = concurrent.futures.Future()
+
+        if self.kind == PROCESS and inspect.ismethod(fn):
+            future.set_exception(TypeError(
+                'Resource %s is bound to an instance and can not run in a process, make it a static method!' % self.name
+            ))
+            return future
+
+        with self._lock:
+            self.stats['calls'] += 1
+
+            if self.max_concurrency and self.running >= self.max_concurrency:
+                if self.max_queue and len(self._waiting) >= self.max_queue:
+                    self.stats['rejected'] += 1
+                    future.set_exception(ResourceBusyError('Resource %s is too busy!' % self.name))
+                    return future
+
+                self._waiting.append((future, fn, args, kwargs))
+                self.stats['queued'] += 1
+                self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], len(self._waiting))
+                return future
+
+            self.running += 1
+
+        self._start(future, fn, args, kwargs)
+        return future
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _start(self, future, fn, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            self._next()
+            return
+
+        try:
+            inner = self.pools.submit(self.kind, fn, *args, **kwargs)
+        except Exception as e:
+            self._finished(future, None, error=e)
+            return
+
+        inner.add_done_callback(functools.partial(self._finished, future))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _finished(self, future, inner, error=None):
+        if error is None:
+            error = concurrent.futures.CancelledError() if inner.cancelled() else inner.exception()
+
+        with self._lock:
+            self.stats['failed' if error is not None else 'completed'] += 1
+
+        if error is None:
+            future.set_result(inner.result())
+        else:
+            future.set_exception(error)
+
+        self._next()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _next(self):
+        # -- a slot freed up, hand it to the next waiting call, if any.
+        with self._lock:
+            if not self._waiting:
+                self.running -= 1
+                return
+            future, fn, args, kwargs = self._waiting.popleft()
+
+        self._start(future, fn, args, kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def as_dict(self):
+        # type: () -> dict
+        with self._lock:
+            result = dict(self.stats)
+            result['kind'] = self.kind
+            result['running'] = self.running
+            result['queue_depth'] = len(self._waiting)
+        return result
+
+
+# -- every live resource executor, for reporting.
+_executors = weakref.WeakSet()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def resource_executors():
+    # type: () -> list
+    return list(_executors)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def make_resource_executor(kind=INLINE, max_concurrency=0, max_queue=0, name=None):
+    # type: (str, int, int, str) -> ResourceExecutor
+    """
+    Turn the `executor` option of a resource decorator into a ResourceExecutor, or None for resources that run inline
+    on the handler thread.
+    """
+    if kind is None or kind == INLINE:
+        if max_concurrency or max_queue:
+            raise ValueError('Concurrency limits require the "thread" or "process" executor!')
+        return None
+
+    return ResourceExecutor(kind, max_concurrency=max_concurrency, max_queue=max_queue, name=name)
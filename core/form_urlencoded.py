@@ -0,0 +1,177 @@
+import urllib.parse
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class FormError(ValueError):
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class FormLimitError(FormError):
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class FormDecoder(object):
+    """
+    Incremental application/x-www-form-urlencoded decoder.
+
+    Body data is fed as bytes, in chunks of any size. Every field is decoded as soon as the '&' ending it has been
+    fed, so only the last, incomplete field is ever buffered. Fields are kept in the order they were sent, including
+    repeated ones.
+
+    Raises FormLimitError once the body has more than `max_fields` fields, a single field exceeds `max_field_size`
+    bytes, or the body as a whole exceeds `max_total_size` bytes. Set any of them to 0 to disable it.
+    """
+
+    DEFAULT_MAX_FIELDS = 10000
+    DEFAULT_MAX_FIELD_SIZE = 1024 ** 2
+    DEFAULT_MAX_TOTAL_SIZE = 16 * 1024 ** 2
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            max_fields=DEFAULT_MAX_FIELDS,
+            max_field_size=DEFAULT_MAX_FIELD_SIZE,
+            max_total_size=DEFAULT_MAX_TOTAL_SIZE,
+            encoding='utf-8',
+    ):
+        # type: (int, int, int, str) -> None
+        self.max_fields = max_fields
+        self.max_field_size = max_field_size
+        self.max_total_size = max_total_size
+        self.encoding = encoding
+
+        self.fields = list()
+        self.size = 0
+
+        self._buffer = b''
+        self._closed = False
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _unquote(self, data):
+        # type: (bytes) -> str
+        if b'+' in data:
+            data = data.replace(b'+', b' ')
+        if b'%' in data:
+            data = urllib.parse.unquote_to_bytes(data)
+        return data.decode(self.encoding, 'replace')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _add_fields(self, data):
+        # type: (bytes) -> None
+        """
+        Decode a run of complete fields, separated by '&'.
+        """
+        if self.max_field_size and len(data) > self.max_field_size:
+            if any(len(part) > self.max_field_size for part in data.split(b'&')):
+                raise FormLimitError('Form field exceeds %s bytes!' % self.max_field_size)
+
+        if b'%26' in data or b'%3D' in data or b'%3d' in data:
+            # -- encoded separators would be mistaken for real ones once unquoted, unquote field by field instead.
+            unquote = self._unquote
+            for part in data.split(b'&'):
+                if part:
+                    key, _, value = part.partition(b'=')
+                    self.fields.append((unquote(key), unquote(value)))
+
+        else:
+            # -- otherwise the whole run can be unquoted in one go, which is a lot cheaper than field by field.
+            for part in self._unquote(data).split('&'):
+                if part:
+                    key, _, value = part.partition('=')
+                    self.fields.append((key, value))
+
+        if self.max_fields and len(self.fields) > self.max_fields:
+            raise FormLimitError('Form has more than %s fields!' % self.max_fields)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def feed(self, data):
+        # type: (bytes) -> None
+        """
+        Decode the next chunk of the body.
+
+        :param data: the chunk.
+        :type data: bytes
+        """
+        if self._closed:
+            raise FormError('Form decoder is closed!')
+
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
+
+        self.size += len(data)
+        if self.max_total_size and self.size > self.max_total_size:
+            raise FormLimitError('Form body exceeds %s bytes!' % self.max_total_size)
+
+        # -- line breaks can only be sent encoded, raw ones separate fields like '&' does.
+        if b'\n' in data or b'\r' in data:
+            data = data.replace(b'\r', b'&').replace(b'\n', b'&')
+
+        end = data.rfind(b'&')
+        if end == -1:
+            self._buffer += data
+            if self.max_field_size and len(self._buffer) > self.max_field_size:
+                raise FormLimitError('Form field exceeds %s bytes!' % self.max_field_size)
+            return
+
+        # -- everything after the last '&' may be the start of a field that continues in the next chunk.
+        fields = self._buffer + data[:end]
+        self._buffer = data[end + 1:]
+        self._add_fields(fields)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        # type: () -> list
+        """
+        Decode the last field of the body.
+
+        :return: the (key, value) pairs of all fields, in order.
+        :rtype: list(tuple)
+        """
+        if not self._closed:
+            self._closed = True
+            self._add_fields(self._buffer)
+            self._buffer = b''
+
+        return self.fields
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def fields_to_dict(fields):
+    # type: (list) -> dict
+    """
+    Turn form fields into keyword arguments. Like in HTML forms, a field that was sent more than once becomes a list
+    of all its values, in order.
+
+    :param fields: the (key, value) pairs of the form.
+    :type fields: list(tuple)
+
+    :return: the keyword arguments, in the order their first field was sent.
+    :rtype: dict
+    """
+    result = dict()
+    repeated = set()
+
+    for key, value in fields:
+        if key not in result:
+            result[key] = value
+        elif key in repeated:
+            result[key].append(value)
+        else:
+            result[key] = [result[key], value]
+            repeated.add(key)
+
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def decode_form(data, **kwargs):
+    # type: (bytes, dict) -> dict
+    """
+    Decode a complete application/x-www-form-urlencoded body into keyword arguments, see FormDecoder and
+    fields_to_dict.
+    """
+    decoder = FormDecoder(**kwargs)
+    decoder.feed(data)
+    return fields_to_dict(decoder.close())
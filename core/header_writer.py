@@ -0,0 +1,140 @@
+import time
+import collections
+import email.utils
+
+
+# -- the Date header of the current second, as (second, encoded header line).
+_date = (None, b'')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def date_header(now=None):
+    # type: (float) -> bytes
+    """
+    Get the encoded Date header line for the current time. Dates only have a resolution of a second, so the line is
+    formatted once per second, and shared between all responses sent within it.
+
+    :param now: the current time as a POSIX timestamp, defaults to time.time().
+    :type now: float
+
+    :return: the header line, including its CRLF.
+    :rtype: bytes
+    """
+    global _date
+
+    second = int(time.time() if now is None else now)
+
+    # -- a single tuple is swapped in, so threads never see a line from one second paired with another.
+    cached = _date
+    if cached[0] != second:
+        cached = _date = second, b'Date: %s\r\n' % email.utils.formatdate(second, usegmt=True).encode('ascii')
+
+    return cached[1]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def encode_header_line(key, value, encoding='latin-1'):
+    # type: (str, object, str) -> bytes
+    return ('%s: %s\r\n' % (key, str(value).strip('\n\r'))).encode(encoding)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class HeaderBlock(object):
+    """
+    A set of headers sent with every response, like the headers of the CORS adapter, encoded once when it is created
+    rather than on every response.
+
+    Headers a response sets itself take precedence over those of a block.
+    """
+
+    __slots__ = ('headers', 'names', 'encoded')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, headers, encoding='latin-1'):
+        # type: (dict, str) -> None
+        self.headers = collections.OrderedDict(headers)
+        self.names = frozenset(self.headers)
+        self.encoded = b''.join(encode_header_line(key, value, encoding) for key, value in self.headers.items())
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ResponseHeaderWriter(object):
+    """
+    Writes response heads straight into a bytearray: the status line, the Date header, pre-encoded header blocks and
+    then the headers of the response itself, each terminated by CRLF, followed by the blank line ending the head.
+
+    Status lines are encoded once and reused. The headers of the response itself are formatted in a single join and
+    encoded in one go, which is much cheaper than encoding them one by one.
+    """
+
+    # -- status lines carrying an error message as their reason are not worth caching, don't let them grow the cache.
+    MAX_STATUS_LINES = 256
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, encoding='latin-1', protocol='HTTP/1.1'):
+        # type: (str, str) -> None
+        self.encoding = encoding
+        self.protocol = protocol
+
+        self._status_lines = dict()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def status_line(self, code, reason):
+        # type: (int, str) -> bytes
+        key = code, reason
+
+        line = self._status_lines.get(key)
+        if line is None:
+            line = ('%s %s %s\r\n' % (self.protocol, code, str(reason).strip('\n\r'))).encode(self.encoding)
+            if len(self._status_lines) < self.MAX_STATUS_LINES:
+                self._status_lines[key] = line
+
+        return line
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def write(self, code, reason, headers, blocks=(), date=True):
+        # type: (int, str, dict, iter, bool) -> bytes
+        """
+        Build a response head.
+
+        :param code: the status code.
+        :type code: int
+
+        :param reason: the reason phrase.
+        :type reason: str
+
+        :param headers: the headers of the response.
+        :type headers: dict
+
+        :param blocks: header blocks to include, whose headers are left out when the response sets them itself.
+        :type blocks: list(HeaderBlock)
+
+        :param date: whether to include a Date header, unless the response sets one.
+        :type date: bool
+
+        :return: the response head, including the blank line that ends it.
+        :rtype: bytes
+        """
+        result = bytearray(self.status_line(code, reason))
+
+        if date and 'Date' not in headers:
+            result += date_header()
+
+        for block in blocks:
+            if block.names.isdisjoint(headers):
+                result += block.encoded
+                continue
+
+            for key, value in block.headers.items():
+                if key not in headers:
+                    result += encode_header_line(key, value, self.encoding)
+
+        text = ''.join(['%s: %s\r\n' % item for item in headers.items()])
+
+        # -- values ending in line breaks would break the framing, in the rare case there are any, strip them.
+        if text.count('\n') != len(headers) or text.count('\r') != len(headers):
+            text = ''.join(['%s: %s\r\n' % (key, str(value).strip('\n\r')) for key, value in headers.items()])
+
+        result += text.encode(self.encoding)
+        result += b'\r\n'
+        return bytes(result)
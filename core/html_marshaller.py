@@ -1,58 +1,71 @@
-import os
 import json
-import urllib
+import functools
 
 from clacks.core.package import Package
 from clacks.core.marshaller import BasePackageMarshaller
 from clacks.core.marshaller import register_marshaller_type
 
+from .multipart import MultipartParser, get_boundary
+from .form_urlencoded import FormDecoder, fields_to_dict
+from .upload_store import UploadStore, get_default_upload_store
+
 
 # ----------------------------------------------------------------------------------------------------------------------
 class HTMLMarshaller(BasePackageMarshaller):
 
     DEFAULT_RAW_RESPONSE = False
 
+    # -- limits enforced on multipart uploads, set any of them to 0 to disable it.
+    MAX_PARTS = MultipartParser.DEFAULT_MAX_PARTS
+    MAX_PART_SIZE = MultipartParser.DEFAULT_MAX_PART_SIZE
+    MAX_UPLOAD_SIZE = MultipartParser.DEFAULT_MAX_TOTAL_SIZE
+    MAX_FIELD_SIZE = MultipartParser.DEFAULT_MAX_FIELD_SIZE
+
+    # -- limits enforced on url-encoded forms, set any of them to 0 to disable it.
+    MAX_FORM_FIELDS = FormDecoder.DEFAULT_MAX_FIELDS
+    MAX_FORM_SIZE = FormDecoder.DEFAULT_MAX_TOTAL_SIZE
+
+    # -- the UploadStore uploaded files are written to, None to use the default store.
+    UPLOAD_STORE = None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def get_upload_store(cls):
+        # type: () -> UploadStore
+        """
+        Get the store uploads are written to. Set UPLOAD_STORE to an UploadStore to configure its location, TTL and
+        quota, otherwise the process-wide default store is used.
+        """
+        return cls.UPLOAD_STORE or get_default_upload_store()
+
     # ------------------------------------------------------------------------------------------------------------------
     @classmethod
     def get_transaction_cache(cls, transaction_id):
-        path = os.path.join(os.getenv('TEMP'), 'ClacksTransactionCache', transaction_id)
-        if not os.path.isdir(path):
-            os.makedirs(path)
-        return path
+        return cls.get_upload_store().transaction_dir(transaction_id)
 
     # ------------------------------------------------------------------------------------------------------------------
     @classmethod
     def clear_transaction_cache(cls, transaction_id):
-        path = cls.get_transaction_cache(transaction_id)
-        if not os.path.isdir(path):
-            return True
-
-        # -- clear the entire cache
-        for root, dirs, files in os.walk(path):
-            for f in files:
-                p = os.path.join(root, f)
-                os.unlink(p)
-
-            for d in dirs:
-                p = os.path.join(root, d)
-                os.rmdir(p)
-
-        # -- then delete it
-        os.rmdir(path)
-
+        # -- this only renames the transaction directory, the files are deleted by the store's reaper.
+        cls.get_upload_store().release(transaction_id)
         return True
 
     # ------------------------------------------------------------------------------------------------------------------
     @classmethod
     def download_file(cls, transaction_id, filename, body):
-        # -- ensure the transaction cache exists
-        path = cls.get_transaction_cache(transaction_id)
-
-        file_path = os.path.join(path, filename)
-        with open(file_path, 'w+b') as fp:
-            fp.write(body)
+        upload = cls.get_upload_store().open_upload(transaction_id, filename)
+        upload.write(body)
+        return upload.commit()
 
-        return file_path
+    # ------------------------------------------------------------------------------------------------------------------
+    def release_transaction(self, transaction_id):
+        # type: (str) -> None
+        """
+        Called by the handler once a transaction has been responded to, releases any files uploaded with it.
+        """
+        store = self.get_upload_store()
+        if store.has_transaction(transaction_id):
+            store.release(transaction_id)
 
     # ------------------------------------------------------------------------------------------------------------------
     def _encode_package(self, transaction_id, package):
@@ -77,94 +90,121 @@ class HTMLMarshaller(BasePackageMarshaller):
         result = dict()
 
         if 'multipart/form-data' in header_data.get('Content-Type', ''):
-            boundary = header_data.get('Content-Type')
-            boundary = boundary.rpartition('; ')[2]
-            boundary = boundary[len('boundary='):]
-
+            boundary = get_boundary(header_data.get('Content-Type'))
             parts, data = self.handle_multipart(transaction_id, data, boundary)
+            result.update(self._multipart_result(parts))
 
-            # -- if we're dealing with forms, the 'command' field is the command argument.
-            if 'command' in parts:
-                result['command'] = parts['command']
-                del parts['command']
-
-            # -- if we're dealing with forms, we consider form fields to be keyword arguments
-            result['kwargs'] = parts
+        if data:
+            decoder = self.create_form_decoder()
+            decoder.feed(data)
+            result.update(self._form_result(decoder.close()))
 
-        for line in data.splitlines():
-            line = urllib.unquote(line)
+        return result
 
-            if '&' in line:
-                for part in line.split('&'):
-                    key, _, value = part.partition('=')
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def _form_result(cls, fields):
+        # type: (list) -> dict
+        # -- a single 'value' field carries its arguments as JSON, this is what raw requests are sent as.
+        if len(fields) == 1 and fields[0][0] == 'value':
+            return json.loads(fields[0][1])
 
-                    # -- if we add more than one value to the same argument, that is the HTML protocol for a list.
-                    if key in result:
-                        result[key] = [result[key]]
-                        result[key].append(value)
-                        result[key] = list(set(result[key]))
+        return fields_to_dict(fields)
 
-                    else:
-                        result[key] = value
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def _multipart_result(cls, parts):
+        # type: (dict) -> dict
+        result = dict()
 
-            else:
-                key, _, value = line.partition('=')
-                result[key] = value
+        # -- if we're dealing with forms, the 'command' field is the command argument.
+        if 'command' in parts:
+            result['command'] = parts['command']
+            del parts['command']
 
-        if len(result.keys()) == 1:
-            if result.keys()[0] == 'value':
-                result = json.loads(result[result.keys()[0]])
+        # -- if we're dealing with forms, we consider form fields to be keyword arguments
+        result['kwargs'] = parts
 
         return result
 
     # ------------------------------------------------------------------------------------------------------------------
-    def handle_multipart(self, transaction_id, data, boundary):
-        left, _, middle = data.partition('--%s' % boundary)
-        middle, _, right = data.partition('--%s--' % boundary)
+    def create_multipart_parser(self, transaction_id, boundary):
+        # type: (str, str) -> MultipartParser
+        return MultipartParser(
+            boundary,
+            open_upload=functools.partial(self.get_upload_store().open_upload, transaction_id),
+            max_part_size=self.MAX_PART_SIZE,
+            max_total_size=self.MAX_UPLOAD_SIZE,
+            max_field_size=self.MAX_FIELD_SIZE,
+            encoding=self.encoding,
+            max_parts=self.MAX_PARTS,
+        )
 
-        parts = middle.split('--%s' % boundary)
-        parts = list(part for part in parts if part)
+    # ------------------------------------------------------------------------------------------------------------------
+    def create_form_decoder(self):
+        # type: () -> FormDecoder
+        return FormDecoder(
+            max_fields=self.MAX_FORM_FIELDS,
+            max_field_size=self.MAX_FIELD_SIZE,
+            max_total_size=self.MAX_FORM_SIZE,
+            encoding=self.encoding,
+        )
 
-        result = dict()
-        for part in parts:
-            header, _, body = part.partition('\n\r')
-            body = body.lstrip('\n\r').rstrip('\n\r')
-            attr_blocks = header.partition('; ')[2].split('; ')
+    # ------------------------------------------------------------------------------------------------------------------
+    def accepts_stream(self, header_data):
+        # type: (dict) -> bool
+        """
+        Whether the body of a request with the given headers should be handed to `decode_package_stream` as it arrives,
+        rather than being read into memory first. This is the case for multipart uploads and url-encoded forms.
+        """
+        content_type = header_data.get('Content-Type', '')
+        return 'multipart/form-data' in content_type or 'application/x-www-form-urlencoded' in content_type
 
-            name = None
+    # ------------------------------------------------------------------------------------------------------------------
+    def decode_package_stream(self, transaction_id, header_data, chunks):
+        # type: (str, dict, iter) -> dict
+        """
+        Decode a multipart or url-encoded body straight from the socket, one chunk at a time. File parts are written
+        to the upload store as they arrive and form fields are decoded as they arrive, so memory use does not depend
+        on the size of the upload.
 
-            # -- ensure our attribute block exists in the result dict first.
-            for attr_block in attr_blocks:
-                key, value = attr_block.split('=')
+        :param transaction_id: the id of the transaction this body belongs to.
+        :type transaction_id: str
 
-                # -- sanitize our data
-                key = key.strip('\r').replace('"', '')
-                value = value.strip('\r').replace('"', '')
+        :param header_data: the decoded request header.
+        :type header_data: dict
 
-                if key == 'name':
-                    result[value] = dict()
-                    name = value
+        :param chunks: iterator of body chunks.
+        :type chunks: iter
 
-            for attr_block in attr_blocks:
-                key, value = attr_block.split('=')
+        :return: the decoded data.
+        :rtype: dict
+        """
+        content_type = header_data.get('Content-Type', '')
 
-                # -- sanitize our data
-                key = key.strip('\r').replace('"', '')
-                value = value.strip('\r').replace('"', '')
+        if 'multipart/form-data' not in content_type:
+            decoder = self.create_form_decoder()
+            for chunk in chunks:
+                decoder.feed(chunk)
+            return self._form_result(decoder.close())
 
-                if key == 'name':
-                    continue
+        parser = self.create_multipart_parser(transaction_id, get_boundary(content_type))
 
-                result[name][key] = value
+        for chunk in chunks:
+            parser.feed(chunk)
 
-            if 'filename' in result[name]:
-                file_path = self.download_file(transaction_id, result[name]['filename'], body=body)
-                result[name] = file_path
+        return self._multipart_result(parser.close())
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def handle_multipart(self, transaction_id, data, boundary):
+        if isinstance(data, str):
+            data = data.encode(self.encoding)
 
-            else:
-                result[name] = body
+        parser = self.create_multipart_parser(transaction_id, boundary)
+        parser.feed(data)
 
-        return result, left + right
+        # -- anything outside of the multipart body is preamble or epilogue, which carries no data.
+        return parser.close(), ''
 
 
 register_marshaller_type('html', HTMLMarshaller)
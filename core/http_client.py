@@ -0,0 +1,547 @@
+import json
+import time
+import socket
+import threading
+import collections
+import urllib.parse
+import concurrent.futures
+
+from .http_connection import HTTPConnection, HTTPConnectionError, ConnectionStats
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class HTTPClientError(Exception):
+    """
+    Raised when a request could not be sent, or no complete response was received for it.
+    """
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class HTTPStatusError(HTTPClientError):
+    """
+    Raised by HTTPClientProxy when a resource responds with an error status.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, response, message):
+        # type: (HTTPResponse, str) -> None
+        super(HTTPStatusError, self).__init__('%s %s' % (response.status, message))
+        self.response = response
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class PoolTimeoutError(HTTPClientError):
+    """
+    Raised when no connection could be checked out of a pool in time.
+    """
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class HTTPResponse(object):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, status, reason, headers, body):
+        # type: (int, str, dict, bytes) -> None
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def json(self):
+        return json.loads(self.body.decode('utf-8')) if self.body else None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __repr__(self):
+        return '<HTTPResponse %s %s>' % (self.status, self.reason)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class PooledConnection(object):
+    """
+    A persistent connection to the server of an HTTPConnectionPool, with the HTTPConnection that frames its responses.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, sock, timeout, encoding):
+        # type: (socket.socket, float, str) -> None
+        self.socket = sock
+        self.http_connection = HTTPConnection(sock, idle_timeout=timeout, max_requests=0, encoding=encoding)
+        self.created = self.last_used = time.time()
+        self.requests = 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def timed_out(self):
+        # type: () -> bool
+        return bool(self.http_connection.stats.as_dict().get('idle_timeouts'))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def is_healthy(self):
+        # type: () -> bool
+        """
+        Whether the connection is still usable: an idle connection the server has closed (or sent anything over) is
+        readable, a healthy one is not.
+        """
+        if self.http_connection.closed or self.http_connection.buffer:
+            return False
+
+        try:
+            self.socket.setblocking(False)
+            try:
+                self.socket.recv(1, socket.MSG_PEEK)
+            finally:
+                self.socket.setblocking(True)
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+        return False
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        self.http_connection.close()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class HTTPConnectionPool(object):
+    """
+    Thread-safe pool of keep-alive connections to a single server.
+
+    At most `max_size` connections are open at the same time. Checking out a connection when all of them are in use
+    waits for one to be returned, for at most `checkout_timeout` seconds. The most recently returned connection is
+    handed out first, so a pool that is larger than it needs to be lets the connections it doesn't need expire.
+
+    Connections are health checked when they are checked out: connections that have been idle for longer than
+    `max_idle_time` seconds, that have served `max_requests` requests, or that the server has closed, are replaced by a
+    new one.
+    """
+
+    DEFAULT_MAX_SIZE = 8
+    DEFAULT_TIMEOUT = 30.0
+    DEFAULT_MAX_IDLE_TIME = 4.0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            host,
+            port,
+            max_size=DEFAULT_MAX_SIZE,
+            timeout=DEFAULT_TIMEOUT,
+            checkout_timeout=DEFAULT_TIMEOUT,
+            max_idle_time=DEFAULT_MAX_IDLE_TIME,
+            max_requests=HTTPConnection.DEFAULT_MAX_REQUESTS,
+            encoding='utf-8',
+    ):
+        # type: (str, int, int, float, float, float, int, str) -> None
+        """
+        :param timeout: timeout of connecting and of every read, in seconds.
+        :type timeout: float
+
+        :param max_idle_time: how long a connection may sit in the pool before it is considered stale. Should be
+            shorter than the server's keep-alive timeout, which defaults to 5 seconds for HTTPHandler.
+        :type max_idle_time: float
+
+        :param max_requests: requests to send over a single connection before replacing it, 0 for no limit. Should be
+            at most the server's maximum number of keep-alive requests, 100 by default.
+        :type max_requests: int
+        """
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.timeout = timeout
+        self.checkout_timeout = checkout_timeout
+        self.max_idle_time = max_idle_time
+        self.max_requests = max_requests
+        self.encoding = encoding
+
+        self._idle = collections.deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self.stats = ConnectionStats()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def size(self):
+        # type: () -> int
+        return self._size
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def idle(self):
+        # type: () -> int
+        return len(self._idle)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _connect(self):
+        # type: () -> PooledConnection
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stats.connection_opened()
+        return PooledConnection(sock, self.timeout, self.encoding)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _is_usable(self, connection):
+        # type: (PooledConnection) -> bool
+        if time.time() - connection.last_used > self.max_idle_time:
+            self.stats.increment('expired')
+            return False
+
+        if self.max_requests and connection.requests >= self.max_requests:
+            self.stats.increment('max_requests_reached')
+            return False
+
+        if not connection.is_healthy():
+            self.stats.increment('unhealthy')
+            return False
+
+        return True
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def checkout(self, timeout=None):
+        # type: (float) -> PooledConnection
+        """
+        Take a connection out of the pool, opening a new one if there is no usable idle one and the pool isn't full.
+        Every connection checked out has to be returned with `checkin`.
+
+        :param timeout: how long to wait for a connection if all of them are in use, defaults to `checkout_timeout`.
+        :type timeout: float
+
+        :return: the connection.
+        :rtype: PooledConnection
+        """
+        deadline = time.time() + (self.checkout_timeout if timeout is None else timeout)
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise HTTPClientError('Connection pool is closed!')
+
+                while self._idle:
+                    connection = self._idle.pop()
+                    if self._is_usable(connection):
+                        self.stats.increment('reused')
+                        return connection
+                    self._discard(connection)
+
+                if self._size < self.max_size:
+                    # -- reserve the slot, connecting happens outside of the lock.
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.stats.increment('checkout_timeouts')
+                    raise PoolTimeoutError('No connection to %s:%s available!' % (self.host, self.port))
+
+                self.stats.increment('checkout_waits')
+                self._condition.wait(remaining)
+
+        try:
+            return self._connect()
+        except OSError as e:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise HTTPClientError('Could not connect to %s:%s: %s' % (self.host, self.port, e))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _discard(self, connection):
+        # type: (PooledConnection) -> None
+        # -- must be called with the condition held.
+        connection.close()
+        self._size -= 1
+        self.stats.connection_closed()
+        self._condition.notify()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def checkin(self, connection, reusable=True):
+        # type: (PooledConnection, bool) -> None
+        """
+        Return a connection to the pool.
+
+        :param connection: the connection, as checked out.
+        :type connection: PooledConnection
+
+        :param reusable: False if the connection can not be used for another request, in which case it is closed.
+        :type reusable: bool
+        """
+        with self._condition:
+            if not reusable or self._closed:
+                self._discard(connection)
+                return
+
+            connection.last_used = time.time()
+            self._idle.append(connection)
+            self._condition.notify()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        """
+        Close all idle connections. Connections that are checked out are closed when they are returned.
+        """
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                self._discard(self._idle.pop())
+            self._condition.notify_all()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def as_dict(self):
+        # type: () -> dict
+        result = self.stats.as_dict()
+        result['size'] = self._size
+        result['idle'] = len(self._idle)
+        return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class HTTPClientProxy(object):
+    """
+    Client for clacks_web REST APIs, sending requests over a pool of keep-alive connections, so any number of threads
+    can call the server at the same time without opening a connection per call, or waiting on a single one.
+
+    `call` and the per-method shortcuts (`get`, `post`, ...) return the result of the resource, `request` the raw
+    response. `submit` and `map` fire calls on a pool of `max_size` threads, returning futures.
+
+    Keyword arguments are sent in the query string of GET and DELETE requests, and as a JSON body otherwise.
+    """
+
+    # -- methods whose keyword arguments are sent in the query string.
+    QUERY_METHODS = ('GET', 'DELETE', 'HEAD', 'OPTIONS')
+
+    # -- methods that can safely be sent again, as the server may well have acted on a request it didn't respond to.
+    IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, host, port, max_size=HTTPConnectionPool.DEFAULT_MAX_SIZE, headers=None, **kwargs):
+        # type: (str, int, int, dict, dict) -> None
+        """
+        :param headers: headers to send with every request.
+        :type headers: dict
+
+        :param kwargs: further HTTPConnectionPool options.
+        """
+        self.pool = HTTPConnectionPool(host, port, max_size=max_size, **kwargs)
+        self.headers = dict(headers or dict())
+        self.host_header = '%s:%s' % (host, port)
+
+        self._executor = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __exit__(self, *_):
+        self.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.pool.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def encode_request(self, method, path, body=b'', headers=None):
+        # type: (str, str, bytes, dict) -> bytes
+        all_headers = collections.OrderedDict()
+        all_headers['Host'] = self.host_header
+        all_headers.update(self.headers)
+        all_headers.update(headers or dict())
+        all_headers['Content-Length'] = len(body)
+
+        lines = ['%s %s HTTP/1.1' % (method, path)]
+        lines.extend('%s: %s' % (key, str(value).strip('\n\r')) for key, value in all_headers.items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode(self.pool.encoding) + body
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _exchange(self, connection, method, data):
+        # type: (PooledConnection, str, bytes) -> tuple
+        http_connection = connection.http_connection
+
+        try:
+            connection.socket.sendall(data)
+            head = http_connection.read_head()
+        except (OSError, HTTPConnectionError) as e:
+            raise HTTPClientError(str(e))
+
+        if head is None:
+            if connection.timed_out:
+                raise HTTPClientError('Timed out waiting for a response from %s' % self.host_header)
+            return None
+
+        _, status_line, headers, _ = head
+        _, _, status = status_line.partition(' ')
+        code, _, reason = status.partition(' ')
+
+        try:
+            code = int(code)
+        except ValueError:
+            raise HTTPClientError('Invalid status line: %r' % status_line)
+
+        keep_alive = 'close' not in headers.get('Connection', '').lower()
+
+        try:
+            if method == 'HEAD' or code in (204, 304) or 100 <= code < 200:
+                body = b''
+            elif 'Content-Length' in headers or 'chunked' in headers.get('Transfer-Encoding', '').lower():
+                body = http_connection.read_body(headers)
+            else:
+                # -- neither a length nor chunked, the body ends when the server closes the connection.
+                body = http_connection.read_until_closed()
+                keep_alive = False
+        except (OSError, HTTPConnectionError) as e:
+            raise HTTPClientError(str(e))
+
+        connection.requests += 1
+        return HTTPResponse(code, reason, headers, body), keep_alive
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def request(self, method, path, body=b'', headers=None):
+        # type: (str, str, bytes, dict) -> HTTPResponse
+        """
+        Send a single request and read its response.
+
+        A request sent over a reused connection that the server closed before it could respond, which happens when
+        the server times out the connection right as it is checked out, is retried once on a new connection. Only
+        requests with an idempotent method are retried, as there is no telling whether the server acted on it or not.
+
+        :return: the response.
+        :rtype: HTTPResponse
+        """
+        method = method.upper()
+        data = self.encode_request(method, path, body, headers)
+
+        for attempt in range(2):
+            connection = self.pool.checkout()
+            reused = connection.requests > 0
+
+            try:
+                result = self._exchange(connection, method, data)
+            except BaseException:
+                self.pool.checkin(connection, reusable=False)
+                raise
+
+            if result is None:
+                self.pool.checkin(connection, reusable=False)
+                if reused and not attempt and method in self.IDEMPOTENT_METHODS:
+                    self.pool.stats.increment('retries')
+                    continue
+                raise HTTPClientError('Connection closed by %s before responding!' % self.host_header)
+
+            response, keep_alive = result
+            self.pool.checkin(connection, reusable=keep_alive)
+            return response
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def call(self, method, path, **kwargs):
+        # type: (str, str, dict) -> object
+        """
+        Call a resource.
+
+        :param method: the method of the resource, like GET or POST.
+        :type method: str
+
+        :param path: the path of the resource.
+        :type path: str
+
+        :param kwargs: the keyword arguments to call the resource with.
+        :type kwargs: dict
+
+        :return: the result of the resource. Raises an HTTPStatusError if it failed.
+        :rtype: object
+        """
+        method = method.upper()
+        body = b''
+        headers = {'Accept': 'application/json'}
+
+        if method in self.QUERY_METHODS:
+            if kwargs:
+                path += ('&' if '?' in path else '?') + urllib.parse.urlencode(kwargs, doseq=True)
+        else:
+            body = json.dumps(kwargs).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        response = self.request(method, path, body, headers)
+
+        try:
+            result = response.json()
+        except ValueError:
+            result = response.body.decode('utf-8', 'replace')
+
+        if response.status >= 400:
+            errors = result.get('errors') if isinstance(result, dict) else None
+            raise HTTPStatusError(response, (errors or [response.reason])[-1])
+
+        return result.get('response') if isinstance(result, dict) else result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def get(self, path, **kwargs):
+        return self.call('GET', path, **kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def post(self, path, **kwargs):
+        return self.call('POST', path, **kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def put(self, path, **kwargs):
+        return self.call('PUT', path, **kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def patch(self, path, **kwargs):
+        return self.call('PATCH', path, **kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def delete(self, path, **kwargs):
+        return self.call('DELETE', path, **kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def executor(self):
+        # type: () -> concurrent.futures.ThreadPoolExecutor
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    self.pool.max_size,
+                    thread_name_prefix='ClacksHTTPClient',
+                )
+        return self._executor
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def submit(self, method, path, **kwargs):
+        # type: (str, str, dict) -> concurrent.futures.Future
+        """
+        Call a resource in the background, see `call`.
+
+        :return: future of the result of the resource.
+        :rtype: concurrent.futures.Future
+        """
+        return self.executor.submit(self.call, method, path, **kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def map(self, calls):
+        # type: (iter) -> list
+        """
+        Call many resources concurrently, as many at the same time as the connection pool allows.
+
+        :param calls: (method, path) or (method, path, kwargs) tuples.
+        :type calls: iter
+
+        :return: a future for every call, in order.
+        :rtype: list(concurrent.futures.Future)
+        """
+        futures = list()
+        for call in calls:
+            method, path = call[:2]
+            kwargs = call[2] if len(call) > 2 else dict()
+            futures.append(self.submit(method, path, **kwargs))
+        return futures
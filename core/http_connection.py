@@ -0,0 +1,349 @@
+import socket
+import threading
+import collections
+
+from .http_parser import split_request_line
+from .http_framing import HTTPFramer, HTTPConnectionError, NEED_DATA
+
+
+# -- a single framed request read from a connection, with its head already parsed.
+HTTPRequest = collections.namedtuple(
+    'HTTPRequest', ['header', 'request_line', 'headers', 'body', 'pipelined', 'admission'], defaults=[None],
+)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ConnectionStats(object):
+    """
+    Thread-safe connection reuse counters, shared by every connection a handler serves.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = collections.Counter()
+        self.open_connections = 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def increment(self, key, amount=1):
+        # type: (str, int) -> None
+        with self._lock:
+            self._counts[key] += amount
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def connection_opened(self):
+        with self._lock:
+            self._counts['connections_opened'] += 1
+            self.open_connections += 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def connection_closed(self):
+        with self._lock:
+            self._counts['connections_closed'] += 1
+            self.open_connections -= 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def as_dict(self):
+        # type: () -> dict
+        with self._lock:
+            result = dict(self._counts)
+            result['open_connections'] = self.open_connections
+
+        # -- the average number of requests served per connection is the number people actually care about.
+        opened = result.get('connections_opened', 0)
+        result['requests_per_connection'] = float(result.get('requests', 0)) / opened if opened else 0.0
+
+        return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class HTTPConnection(object):
+    """
+    Persistent HTTP/1.1 connection, framing every request a client sends over a single socket.
+
+    Received data goes into a single HTTPFramer, which does all of the actual framing. Whatever is left in its buffer
+    after a request has been framed belongs to the next request, which is how back-to-back pipelined requests are
+    supported: they are served in order, one after the other, without ever hitting the socket again until the buffer
+    runs dry.
+
+    The connection is closed after `idle_timeout` seconds without a new request, or after `max_requests` requests.
+    """
+
+    DEFAULT_IDLE_TIMEOUT = 5.0
+    DEFAULT_MAX_REQUESTS = 100
+
+    RECV_SIZE = 65536
+    MAX_HEADER_SIZE = HTTPFramer.MAX_HEADER_SIZE
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            connection,
+            idle_timeout=DEFAULT_IDLE_TIMEOUT,
+            max_requests=DEFAULT_MAX_REQUESTS,
+            stats=None,
+            encoding='latin-1',
+            stream_body=None,
+            admit=None,
+    ):
+        # type: (socket.socket, float, int, ConnectionStats, str, callable, callable) -> None
+        self.connection = connection
+        self.idle_timeout = idle_timeout
+        self.max_requests = max_requests
+        self.stats = stats or ConnectionStats()
+        self.encoding = encoding
+        self.framer = HTTPFramer(encoding, self.MAX_HEADER_SIZE)
+
+        # -- optional predicate, taking the parsed request headers. If it returns True, the request body is not read
+        # -- up front, but handed over as an iterator of chunks instead.
+        self.stream_body = stream_body
+        self._pending_body = None
+
+        # -- optional callable, taking the request line and the parsed request headers, returning an Admission. It is
+        # -- called before the body is read, rejected requests are handed over without one.
+        self.admit = admit
+
+        self.requests = 0
+        self.closed = False
+
+        self.stats.connection_opened()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def buffer(self):
+        # type: () -> bytearray
+        """
+        The data received, but not framed yet.
+        """
+        return self.framer.buffer
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __iter__(self):
+        while not self.closed:
+            request = self.read_request()
+            if request is None:
+                return
+            yield request
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _receive(self):
+        # type: () -> bool
+        try:
+            data = self.connection.recv(self.RECV_SIZE)
+        except socket.timeout:
+            self.stats.increment('idle_timeouts')
+            return False
+        except OSError:
+            return False
+
+        if not data:
+            return False
+
+        self.framer.receive_data(data)
+        return True
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _accepts_requests(self):
+        # type: () -> bool
+        return not (self.closed or (self.max_requests and self.requests >= self.max_requests))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def read_head(self):
+        # type: () -> tuple
+        """
+        Read the next request head from the connection.
+
+        :return: the raw header bytes, the request line, the parsed headers and whether the request was pipelined.
+            Returns None if the connection was closed, timed out, or reached its maximum number of requests.
+        :rtype: tuple
+        """
+        if not self._accepts_requests():
+            return None
+
+        # -- a streamed body the previous request didn't consume still has to be read past to get to the next request.
+        if self._pending_body is not None:
+            for _ in self._pending_body:
+                pass
+            self._pending_body = None
+
+        # -- if the next request was already (partially) sent along with the previous one, it is pipelined.
+        pipelined = bool(self.framer.buffer)
+
+        self.connection.settimeout(self.idle_timeout)
+
+        head = self.framer.next_head()
+        while head is NEED_DATA:
+            if not self._receive():
+                return None
+            head = self.framer.next_head()
+
+        return head + (pipelined,)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def read_body(self, headers):
+        # type: (dict) -> bytes
+        """
+        Read the body of the request whose head was just read.
+
+        :param headers: the parsed headers of the request.
+        :type headers: dict
+
+        :return: the request body, de-chunked if it was sent with chunked transfer encoding.
+        :rtype: bytes
+        """
+        return b''.join(self.iter_body(headers))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def iter_body(self, headers, chunk_size=RECV_SIZE):
+        # type: (dict, int) -> iter
+        """
+        Iterate over the body of the request whose head was just read, in chunks of at most `chunk_size` bytes, without
+        ever holding more than a single chunk in memory.
+
+        :param headers: the parsed headers of the request.
+        :type headers: dict
+
+        :param chunk_size: maximum size of a single yielded chunk.
+        :type chunk_size: int
+
+        :return: iterator of body chunks, de-chunked if the body was sent with chunked transfer encoding.
+        :rtype: iter
+        """
+        # -- started right away rather than on the first chunk, so invalid framing headers are rejected before a
+        # -- streamed body is handed over.
+        self.framer.start_body(headers)
+        return self._iter_body(chunk_size)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _iter_body(self, chunk_size):
+        # type: (int) -> iter
+        while True:
+            data = self.framer.next_body_data(chunk_size)
+            if data is None:
+                return
+
+            if data is NEED_DATA:
+                if not self._receive():
+                    raise HTTPConnectionError('Connection closed while reading the request body!')
+                continue
+
+            yield data
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def read_until_closed(self):
+        # type: () -> bytes
+        """
+        Read everything the peer sends until it closes the connection, for messages whose end is marked by closing the
+        connection rather than by a Content-Length or chunked encoding.
+
+        :return: the data.
+        :rtype: bytes
+        """
+        while self._receive():
+            pass
+
+        data = bytes(self.buffer)
+        del self.buffer[:]
+        return data
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def read_request(self):
+        # type: () -> HTTPRequest
+        """
+        Read and frame the next complete request from the connection.
+
+        :return: the next request, or None if the connection was closed, timed out, or reached its request limit. If the
+            request body is streamed, its body is an iterator of chunks which has to be consumed before reading on. The
+            body of a request rejected by `admit` is None, and left unread.
+        :rtype: HTTPRequest
+        """
+        head = self.read_head()
+        if head is None:
+            return None
+
+        admission = self._admit(head)
+        if admission is not None and not admission.admitted:
+            return self._request(head, None, admission)
+
+        headers = head[2]
+        try:
+            if self.stream_body is not None and self.stream_body(headers):
+                body = self._pending_body = self.iter_body(headers)
+            else:
+                body = self.read_body(headers)
+        except BaseException:
+            if admission is not None:
+                admission.release()
+            raise
+
+        return self._request(head, body, admission)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _admit(self, head):
+        # type: (tuple) -> Admission
+        # -- decide on a request whose head was just read, before reading its body.
+        if self.admit is None:
+            return None
+        return self.admit(head[1], head[2])
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _request(self, head, body, admission):
+        # type: (tuple, bytes, Admission) -> HTTPRequest
+        header, request_line, headers, pipelined = head
+        self.request_received(pipelined)
+        return HTTPRequest(header, request_line, headers, body, pipelined, admission)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def request_received(self, pipelined=False):
+        # type: (bool) -> None
+        self.requests += 1
+        self.stats.increment('requests')
+
+        if self.requests > 1:
+            self.stats.increment('reused_requests')
+
+        if pipelined:
+            self.stats.increment('pipelined_requests')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def keep_alive(self, request_line, headers):
+        # type: (str, dict) -> bool
+        """
+        Whether this connection should be kept open after responding to the given request.
+
+        :param request_line: the request line of the request being responded to.
+        :type request_line: str
+
+        :param headers: the parsed headers of the request being responded to.
+        :type headers: dict
+
+        :return: True if the connection should stay open.
+        :rtype: bool
+        """
+        if self.max_requests and self.requests >= self.max_requests:
+            self.stats.increment('max_requests_reached')
+            return False
+
+        connection = headers.get('Connection', '').lower()
+        version = split_request_line(request_line)[3]
+
+        # -- HTTP/1.1 connections are persistent by default, HTTP/1.0 ones only if the client explicitly asks for it.
+        if version == 'HTTP/1.0':
+            return 'keep-alive' in connection
+
+        return 'close' not in connection
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        if self.closed:
+            return
+
+        self.closed = True
+        self.stats.connection_closed()
+
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+        self.connection.close()
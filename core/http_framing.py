@@ -0,0 +1,253 @@
+from .http_parser import parse_header_block
+
+
+_HEX_DIGITS = frozenset(b'0123456789abcdefABCDEF')
+
+# -- returned by HTTPFramer whenever more data has to be received before it can go on.
+NEED_DATA = object()
+
+# -- body framing states.
+_LENGTH = 'length'
+_CHUNK_SIZE = 'chunk_size'
+_CHUNK_DATA = 'chunk_data'
+_CHUNK_END = 'chunk_end'
+_TRAILERS = 'trailers'
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class HTTPConnectionError(Exception):
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class BadRequestError(HTTPConnectionError):
+    """
+    The framing headers of a message can't be read unambiguously. A request like this is answered with a 400 before
+    its connection is closed.
+    """
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def parse_content_length(headers):
+    # type: (dict) -> int
+    """
+    Get the length of a message body from its Content-Length header. Anything but plain digits is rejected, as any
+    other reading of a value like "-5", "+5" or "1_000" may frame the message differently from a proxy in front of
+    us, desyncing the connection and allowing request smuggling.
+
+    :param headers: the parsed headers of the message.
+    :type headers: dict
+
+    :return: the length of the body, 0 if no Content-Length was sent.
+    :rtype: int
+    """
+    value = headers.get('Content-Length')
+    if value is None:
+        return 0
+
+    if not (value.isdigit() and value.isascii()):
+        raise BadRequestError('Invalid Content-Length: %r' % value)
+
+    return int(value)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def is_chunked(headers):
+    # type: (dict) -> bool
+    """
+    Whether a message body is sent with chunked transfer encoding, going by its Transfer-Encoding header. The header
+    is a list of codings, in the order they were applied, and chunked has to be the last of them for the end of the
+    body to be found at all. Messages that also carry a Content-Length are rejected, as a proxy in front of us may go
+    by that one instead, desyncing the connection and allowing request smuggling.
+
+    :param headers: the parsed headers of the message.
+    :type headers: dict
+
+    :return: True if the body is chunked, False if no Transfer-Encoding was sent.
+    :rtype: bool
+    """
+    value = headers.get('Transfer-Encoding')
+    if value is None:
+        return False
+
+    if 'Content-Length' in headers:
+        raise BadRequestError('Both a Transfer-Encoding and a Content-Length were sent!')
+
+    codings = [coding.strip(' \t').lower() for coding in value.split(',')]
+    codings = [coding for coding in codings if coding]
+    if not codings or codings[-1] != 'chunked' or codings.count('chunked') > 1:
+        raise BadRequestError('Unsupported Transfer-Encoding: %r' % value)
+
+    return True
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def parse_chunk_size(line):
+    # type: (bytes) -> int
+    """
+    Get the size of a chunk from its size line, which has to be hex digits only, optionally followed by extensions.
+
+    :param line: the chunk size line, without its CRLF.
+    :type line: bytes
+
+    :return: the size of the chunk.
+    :rtype: int
+    """
+    digits = line.partition(b';')[0].rstrip(b' \t')
+    if not digits or len(digits) > 16 or not _HEX_DIGITS.issuperset(digits):
+        raise HTTPConnectionError('Invalid chunk size line: %r' % line)
+
+    return int(digits, 16)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class HTTPFramer(object):
+    """
+    Frames HTTP/1.1 messages out of a stream of received bytes, without doing any IO itself.
+
+    Received data is handed over with `receive_data`, framed heads and body data are pulled out with `next_head` and
+    `next_body_data`, both of which return NEED_DATA when the data received so far isn't enough to go on. Whatever
+    is left in the buffer once a message has been framed belongs to the next one, which is how pipelined requests are
+    supported. This is all of the framing logic, HTTPConnection and AsyncHTTPConnection only feed it from a blocking
+    socket and an asyncio stream respectively.
+    """
+
+    MAX_HEADER_SIZE = 65536
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, encoding='latin-1', max_header_size=MAX_HEADER_SIZE):
+        # type: (str, int) -> None
+        self.encoding = encoding
+        self.max_header_size = max_header_size
+        self.buffer = bytearray()
+
+        # -- where to resume searching for a terminator, only newly received data has to be searched.
+        self._search = 0
+
+        # -- the body being framed, its state and the number of bytes left of its current chunk.
+        self._state = None
+        self._remaining = 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def receive_data(self, data):
+        # type: (bytes) -> None
+        """
+        Add data received from the peer.
+        """
+        self.buffer += data
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _find(self, terminator, name):
+        # type: (bytes, str) -> int
+        index = self.buffer.find(terminator, self._search)
+        if index != -1:
+            self._search = 0
+            return index
+
+        if len(self.buffer) > self.max_header_size:
+            raise HTTPConnectionError('%s exceeds %s bytes!' % (name, self.max_header_size))
+
+        # -- the terminator may have been split across reads.
+        self._search = max(len(self.buffer) - len(terminator) + 1, 0)
+        return -1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _next_line(self):
+        # type: () -> bytes
+        index = self._find(b'\r\n', 'Chunk line')
+        if index == -1:
+            return NEED_DATA
+
+        line = bytes(self.buffer[:index])
+        del self.buffer[:index + 2]
+        return line
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def next_head(self):
+        # type: () -> tuple
+        """
+        Frame the head of the next message.
+
+        :return: the raw header bytes, the start line and the parsed headers, or NEED_DATA.
+        :rtype: tuple
+        """
+        end = self._find(b'\r\n\r\n', 'Message header')
+        if end == -1:
+            return NEED_DATA
+
+        header = bytes(self.buffer[:end + 4])
+        del self.buffer[:end + 4]
+
+        start_line, headers = parse_header_block(header, self.encoding)
+        return header, start_line, headers
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def start_body(self, headers):
+        # type: (dict) -> None
+        """
+        Start framing the body of the message whose head was just framed, by its Transfer-Encoding or Content-Length.
+
+        :param headers: the parsed headers of the message.
+        :type headers: dict
+        """
+        if is_chunked(headers):
+            self._state = _CHUNK_SIZE
+            self._remaining = 0
+        else:
+            self._state = _LENGTH
+            self._remaining = parse_content_length(headers)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def next_body_data(self, max_size):
+        # type: (int) -> bytes
+        """
+        Frame the next piece of the body being framed, de-chunked if it was sent with chunked transfer encoding.
+
+        :param max_size: the maximum size of the returned piece.
+        :type max_size: int
+
+        :return: the next piece of body data, NEED_DATA, or None once the whole body has been framed.
+        :rtype: bytes
+        """
+        while True:
+            if self._state is None:
+                return None
+
+            if self._state in (_LENGTH, _CHUNK_DATA):
+                if not self._remaining:
+                    self._state = None if self._state == _LENGTH else _CHUNK_END
+                    continue
+
+                if not self.buffer:
+                    return NEED_DATA
+
+                length = min(self._remaining, max_size, len(self.buffer))
+                data = bytes(self.buffer[:length])
+                del self.buffer[:length]
+
+                self._remaining -= length
+                return data
+
+            if self._state == _CHUNK_END:
+                if len(self.buffer) < 2:
+                    return NEED_DATA
+
+                if self.buffer[:2] != b'\r\n':
+                    raise HTTPConnectionError('Chunk is not terminated by a CRLF!')
+
+                del self.buffer[:2]
+                self._state = _CHUNK_SIZE
+                continue
+
+            line = self._next_line()
+            if line is NEED_DATA:
+                return NEED_DATA
+
+            if self._state == _CHUNK_SIZE:
+                self._remaining = parse_chunk_size(line)
+                self._state = _CHUNK_DATA if self._remaining else _TRAILERS
+
+            # -- trailers are skipped, up to the empty line ending the message.
+            elif not line:
+                self._state = None
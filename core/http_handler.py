@@ -1,87 +1,1001 @@
+import uuid
+import asyncio
+import inspect
+import logging
+import traceback
+import weakref
+import http
 import collections
+import concurrent.futures
 
 from clacks.core.handler import BaseRequestHandler
 from clacks.core.handler import register_handler_type
 from clacks.core.package import Question, Response, Package
 
+from .http_parser import parse_header_block, split_request_line, parse_query_string
+from .http_connection import HTTPConnection, HTTPConnectionError, ConnectionStats
+from .http_framing import BadRequestError
+from .streaming import ChunkedWriter, is_stream, encode_stream_item
+from .multipart import MultipartError, MultipartLimitError
+from .form_urlencoded import FormError, FormLimitError
+from .msgpack_codec import MessagePackError
+from .response_cache import MarshalledBody
+from .executors import ResourceBusyError
+from .static_files import StaticFile
+from .header_writer import ResponseHeaderWriter
+from .timing import RequestTimer, NULL_TIMER
+
+
+logger = logging.getLogger(__name__)
+
 
 # ----------------------------------------------------------------------------------------------------------------------
 class HTTPHandler(BaseRequestHandler):
 
+    # -- every live handler instance, so servers can report on the handlers registered to them.
+    _instances = weakref.WeakSet()
+
+    # -- adapters with static headers leave them to us, we write their pre-encoded header blocks instead.
+    writes_header_blocks = True
+
+    # -- slow requests are profiled, see ServerTimingAdapter, which takes a thread of their own.
+    profiles_requests = True
+
+    # -- the content type of requests and responses that don't specify one, passed on as "_content_type".
+    DEFAULT_CONTENT_TYPE = 'text/json'
+
     # ------------------------------------------------------------------------------------------------------------------
-    def _header_to_dict(self, header):
-        # type: (str) -> tuple
-        data = str(header.decode(self.FORMAT))
+    def __init__(
+            self,
+            marshaller,
+            keep_alive_timeout=HTTPConnection.DEFAULT_IDLE_TIMEOUT,
+            max_keep_alive_requests=HTTPConnection.DEFAULT_MAX_REQUESTS,
+            stream_chunk_size=ChunkedWriter.DEFAULT_CHUNK_SIZE,
+            marshallers=None,
+            **kwargs
+    ):
+        """
+        :param marshaller: the marshaller requests and responses are encoded with, unless negotiated otherwise.
+        :type marshaller: BasePackageMarshaller
 
-        flags = dict()
-        lines = list()
+        :param marshallers: alternative marshallers, chosen per request by its Content-Type and Accept headers, see
+            `add_marshaller`.
+        :type marshallers: list(BasePackageMarshaller)
+        """
+        super(HTTPHandler, self).__init__(marshaller, **kwargs)
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_keep_alive_requests = max_keep_alive_requests
+        self.stream_chunk_size = stream_chunk_size
+        self.connection_stats = ConnectionStats()
+        self.header_writer = ResponseHeaderWriter(self.FORMAT)
 
-        method = data.splitlines()[0]
+        # -- set while the server shuts down, connections are closed after their current request.
+        self.draining = False
 
-        for line in data.splitlines()[1:]:
-            if not line.strip():
-                continue
-            if ':' not in line:
-                continue
-            lines.append(line.strip())
+        # -- lower case media type -> alternative marshaller.
+        self.marshallers = collections.OrderedDict()
+        for alternative in marshallers or ():
+            self.add_marshaller(alternative)
 
-        for line in lines:
-            key, _, value = line.partition(': ')
-            flags[key] = value
+        HTTPHandler._instances.add(self)
 
-        return method, flags
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def instances(cls, server=None):
+        # type: (object) -> list
+        """
+        Get all live HTTP handler instances, optionally only those registered to the given server.
+
+        :param server: if provided, only return handlers registered to this server.
+        :type server: clacks.ServerBase
+
+        :return: list of handlers.
+        :rtype: list
+        """
+        return list(h for h in cls._instances if server is None or getattr(h, 'server', None) is server)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _header_to_dict(self, header):
+        # type: (bytes) -> tuple
+        return parse_header_block(header, self.FORMAT)
 
     # ------------------------------------------------------------------------------------------------------------------
     def decode_question_header(self, transaction_id, header):
         # type: (str, bytes) -> dict
-        method, result = self._header_to_dict(header)
+        request_line, result = self._header_to_dict(header)
+        return self._build_question_header(request_line, result)
 
-        # -- third part is the HTTP version
-        method, path, _ = method.split(' ')
-        result['command'] = method
+    # ------------------------------------------------------------------------------------------------------------------
+    def _build_question_header(self, request_line, result):
+        # type: (str, dict) -> dict
+        # -- fourth part is the HTTP version
+        method, path, query, _ = split_request_line(request_line)
 
-        if 'Access-Control-Request-Method' in result:
-            result['command'] = result['Access-Control-Request-Method']
+        # -- inject the command, path and keyword args of the request. Our own keys are set as they are, and parsed
+        # -- header names are always canonical, so neither needs the case-insensitive lookups of the HeaderMap.
+        dict.update(result, command=method, path=path, kwargs=parse_query_string(query))
+        dict.__setitem__(result, '_content_type', self.DEFAULT_CONTENT_TYPE)
 
-        # -- inject path argument
-        result['path'] = path.rpartition('?')[0] if '?' in path else path
+        return result
 
-        # -- get keyword args from the passed parameters
-        kwargs = dict()
+    # ------------------------------------------------------------------------------------------------------------------
+    def handle_connection(self, connection, address):
+        """
+        Serve every request a client sends over a single connection, keeping it open between requests as per HTTP/1.1.
+        Pipelined requests are answered in the order they were received. The connection is closed when the client asks
+        for it, when it has been idle for `keep_alive_timeout` seconds, or after `max_keep_alive_requests` requests.
 
-        if '?' in path:
-            kwarg_string = path.rpartition('?')[2]
-            pairs = kwarg_string.split('&')
-            for pair in pairs:
-                key, _, value = pair.partition('=')
-                kwargs[key] = value
+        :param connection: the accepted client socket.
+        :type connection: socket.socket
 
-        result['kwargs'] = kwargs
-        result['Accept-Encoding'] = result.get('Accept-Encoding', 'text/json')
+        :param address: the address of the client.
+        :type address: tuple
+        """
+        http_connection = HTTPConnection(
+            connection,
+            idle_timeout=self.keep_alive_timeout,
+            max_requests=self.max_keep_alive_requests,
+            stats=self.connection_stats,
+            encoding=self.FORMAT,
+            stream_body=self._accepts_body_stream,
+            admit=self.admission(address),
+        )
 
-        return result
+        try:
+            for request in http_connection:
+                if request.admission is not None and not request.admission.admitted:
+                    self.reject_request(connection, request)
+                    break
+
+                keep_alive = http_connection.keep_alive(request.request_line, request.headers) and not self.draining
+                keep_alive = self.handle_http_request(connection, request, keep_alive)
+
+                if not keep_alive:
+                    break
+
+        except HTTPConnectionError as e:
+            self.connection_stats.increment('framing_errors')
+            logger.warning('Closing connection from %s: %s' % (address, e))
+
+            # -- nothing of the request was read past its head yet, so it can still be told why it is rejected.
+            if isinstance(e, BadRequestError):
+                self.respond_error(connection, 400, 'Bad Request', str(e))
+
+        finally:
+            http_connection.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def handle_http_request(self, connection, request, keep_alive):
+        """
+        Digest a single framed request and respond to it, see `process_request`
+
+        :param connection: the client socket to respond on.
+        :type connection: socket.socket
+
+        :param request: the framed request, as read from the connection.
+        :type request: HTTPRequest
+
+        :param keep_alive: whether the connection should be kept open after this response.
+        :type keep_alive: bool
+
+        :return: whether the connection can still be kept open after this response.
+        :rtype: bool
+        """
+        return self.run_to_completion(self.process_request(connection, request, keep_alive))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def run_to_completion(coroutine):
+        """
+        Run a coroutine that never suspends, like `process_request` of this handler, without an event loop.
+
+        :return: the result of the coroutine.
+        :rtype: object
+        """
+        try:
+            coroutine.send(None)
+        except StopIteration as e:
+            return e.value
+
+        coroutine.close()
+        raise RuntimeError('%r suspended, it has to run on an event loop!' % coroutine)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def process_request(self, connection, request, keep_alive):
+        """
+        Digest a single framed request and respond to it. This is the request pipeline of both this handler and the
+        AsyncHTTPHandler, the steps that differ between the two are left to the methods it awaits: `run_blocking`,
+        `drain`, `iter_body_blocking`, `resolve_result_async`, `respond_stream_async` and `respond_file_async`. Here,
+        none of them ever suspend, so this handler runs the pipeline to completion without an event loop.
+
+        :param connection: the connection to respond on.
+        :type connection: socket.socket
+
+        :param request: the framed request, as read from the connection.
+        :type request: HTTPRequest
+
+        :param keep_alive: whether the connection should be kept open after this response.
+        :type keep_alive: bool
+
+        :return: whether the connection can still be kept open after this response.
+        :rtype: bool
+        """
+        transaction_id = str(uuid.uuid4())
+
+        metrics = self.metrics_registry()
+        if metrics is not None:
+            method = request.request_line.partition(' ')[0]
+            started = metrics.start(method)
+        status = 500
+
+        timing = self.timing_adapter()
+        timer = NULL_TIMER if timing is None else RequestTimer()
+
+        # -- the head was already parsed to frame the request, so build the header data from that directly.
+        header_data = self._build_question_header(request.request_line, request.headers)
+        request_marshaller, response_marshaller = self.negotiate_marshallers(header_data)
+        timer.mark('parse')
+
+        profile = None
+        if timing is not None:
+            header_data['_timer'] = timer
+            if self.profiles_requests:
+                profile = timing.begin_profile(header_data)
+
+        try:
+            if self.is_preflight(header_data):
+                status = self.respond_preflight(connection, header_data, keep_alive)
+                await self.drain(connection)
+                return keep_alive and status == 204
+
+            try:
+                if isinstance(request.body, bytes):
+                    data = await self.run_blocking(
+                        request_marshaller.decode_package, transaction_id, header_data, request.body,
+                    )
+                else:
+                    data = await self.run_blocking(
+                        request_marshaller.decode_package_stream,
+                        transaction_id,
+                        header_data,
+                        self.iter_body_blocking(request.body),
+                    )
+            except (MultipartLimitError, FormLimitError) as e:
+                status = 413
+                self.respond_error(connection, status, 'Payload Too Large', str(e))
+                return False
+            except (MultipartError, FormError, MessagePackError) as e:
+                status = 400
+                self.respond_error(connection, status, 'Bad Request', str(e))
+                return False
+            timer.mark('decode')
+
+            response = await self.run_blocking(self.server.digest, self, connection, transaction_id, header_data, data)
+            response.marshaller = response_marshaller
+            response.keep_alive = keep_alive
+            response.cache_entry = header_data.pop('_cache_entry', None)
+            self._attach_timer(timing, timer, response)
+            timer.mark('post_digest')
+
+            result = await self.resolve_result_async(transaction_id, response)
+            timer.mark('resource')
+            status = response.code
+
+            if self.is_stream(result):
+                # -- HTTP/1.0 clients don't understand chunked encoding, for them the end of the body is marked by
+                # -- closing the connection instead.
+                chunked = split_request_line(request.request_line)[3] != 'HTTP/1.0'
+                return await self.respond_stream_async(
+                    connection, transaction_id, response, chunked=chunked, header_data=header_data,
+                )
+
+            if isinstance(result, StaticFile):
+                return await self.respond_file_async(connection, transaction_id, response, header_data)
+
+            # -- marshalling, compressing and caching the response is blocking work too, only the sending is not.
+            data = await self.run_blocking(self.encode_response, connection, transaction_id, response)
+            connection.sendall(data)
+            await self.drain(connection)
+            return keep_alive
+
+        finally:
+            # -- uploads only live as long as the transaction they belong to.
+            self._release_transaction(transaction_id)
+
+            if request.admission is not None:
+                request.admission.release()
+
+            if metrics is not None:
+                metrics.finish(method, header_data.get('_route'), status, started)
+
+            if profile is not None:
+                method = request.request_line.partition(' ')[0]
+                timing.end_profile(profile, method, header_data.get('_route'), status, timer.elapsed())
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def run_blocking(self, fn, *args):
+        """
+        Run blocking work of the request pipeline, like decoding, digesting and marshalling. Here it simply runs on the
+        handler thread.
+        """
+        return fn(*args)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def drain(self, connection):
+        """
+        Wait for a response to be written to the connection. Sockets are written with blocking sends here, so there
+        is nothing to wait for.
+        """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def iter_body_blocking(self, body):
+        # type: (iter) -> iter
+        """
+        Get a streamed request body as an iterator that `run_blocking` work can consume, which it already is here.
+        """
+        return body
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def is_stream(result):
+        # type: (object) -> bool
+        """
+        Whether a resource result is streamed by this handler, see streaming.is_stream
+        """
+        return is_stream(result)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def resolve_result_async(self, transaction_id, response):
+        """
+        Resolve the result of a digested request, see `resolve_result`
+
+        :return: the resolved result.
+        :rtype: object
+        """
+        self.resolve_result(transaction_id, response)
+        return response.payload.get('response') if isinstance(response.payload, dict) else None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def respond_stream_async(self, connection, transaction_id, response, chunked=True, header_data=None):
+        """
+        Stream the result of a digested request, see `respond_stream`
+
+        :return: whether the connection can be kept open after this response.
+        :rtype: bool
+        """
+        return self.respond_stream(connection, transaction_id, response, chunked=chunked, header_data=header_data)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def respond_file_async(self, connection, transaction_id, response, header_data):
+        """
+        Respond with the file returned for a digested request, see `respond_file`
+
+        :return: whether the connection can be kept open after this response.
+        :rtype: bool
+        """
+        return self.respond_file(connection, transaction_id, response, header_data)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def metrics_registry(self):
+        # type: () -> MetricsRegistry
+        """
+        Get the registry to record requests into, that of the server's "metrics" interface. None if the server doesn't
+        have one, in which case requests aren't recorded at all.
+        """
+        interfaces = getattr(self.server, 'interfaces', None)
+        interface = interfaces.get('metrics') if interfaces else None
+        return getattr(interface, 'registry', None)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _adapter_with(self, attribute):
+        # type: (str) -> ServerAdapterBase
+        for adapter in getattr(self.server, 'adapters', dict()).values():
+            if getattr(adapter, attribute, False):
+                return adapter
+        return None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def timing_adapter(self):
+        # type: () -> ServerTimingAdapter
+        """
+        Get the adapter requests are timed for, the server's ServerTimingAdapter. None if the server doesn't have one,
+        in which case requests aren't timed at all.
+        """
+        return self._adapter_with('request_timing')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def admission(self, address):
+        # type: (tuple) -> callable
+        """
+        Get the callable deciding on the requests of a new connection, before their bodies are read, see
+        AdmissionControlAdapter. None if the server doesn't have such an adapter, in which case every request is
+        served.
+
+        :param address: the address of the client.
+        :type address: tuple
+        """
+        adapter = self._adapter_with('admission_control')
+        if adapter is None:
+            return None
+
+        def admit(request_line, headers):
+            return adapter.admit(address, request_line, headers, self.queue_depth())
+
+        return admit
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def queue_depth(self):
+        # type: () -> int
+        """
+        The number of requests waiting for a worker. Every connection has a thread of its own here, so none ever wait.
+        """
+        return 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def reject_request(self, connection, request):
+        """
+        Respond to a request that was not admitted, with the status and Retry-After header of its admission. Its body
+        was never read, so the connection is closed afterwards.
+
+        :param connection: the client socket to respond on.
+        :type connection: socket.socket
+
+        :param request: the rejected request.
+        :type request: HTTPRequest
+        """
+        admission = request.admission
+
+        metrics = self.metrics_registry()
+        if metrics is not None:
+            method = request.request_line.partition(' ')[0]
+            started = metrics.start(method)
+
+        headers = None
+        if admission.retry_after is not None:
+            headers = {'Retry-After': admission.retry_after}
+
+        self.respond_error(connection, admission.code, admission.reason, admission.message, headers)
+
+        if metrics is not None:
+            metrics.finish(method, None, admission.code, started)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def _attach_timer(timing, timer, response):
+        # type: (ServerTimingAdapter, RequestTimer, Response) -> None
+        # -- responses with a timer get a Server-Timing header, see _get_header_data
+        if timing is not None and timing.header:
+            response.timer = timer
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def resolve_result(self, transaction_id, response):
+        # type: (str, Response) -> None
+        """
+        Wait for resource results that are not available yet when the server is done digesting the request: futures of
+        resources running on a thread or process pool, and coroutines of async resources. Async resources work with
+        this handler too, they just don't free up the handler thread while waiting.
+        """
+        result = response.payload.get('response') if isinstance(response.payload, dict) else None
+
+        try:
+            if isinstance(result, concurrent.futures.Future):
+                response.payload['response'] = result.result()
+
+            elif inspect.iscoroutine(result):
+                response.payload['response'] = asyncio.run(result)
+
+        except ResourceBusyError as e:
+            self.fail_response(transaction_id, response, e, code=503, reason='Service Unavailable')
+
+        except Exception as e:
+            self.fail_response(transaction_id, response, e)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def fail_response(cls, transaction_id, response, error, code=500, reason=None):
+        # type: (str, Response, Exception, int, str) -> None
+        """
+        Turn a response into an error response, for resources that fail after the server has digested the request,
+        like async resources, which only run once their coroutine is awaited.
+        """
+        if code >= 500 and code != 503:
+            logger.exception('Resource for transaction %s failed!' % transaction_id)
+
+        response.payload['response'] = None
+        response.code = code
+        response.errors = list(response.errors or []) + [str(error)]
+        response.traceback = traceback.format_exc()
+
+        if reason is not None:
+            response.reason = reason
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _release_transaction(self, transaction_id):
+        # type: (str) -> None
+        release_transaction = getattr(self.marshaller, 'release_transaction', None)
+        if release_transaction is not None:
+            release_transaction(transaction_id)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _accepts_body_stream(self, headers):
+        # type: (dict) -> bool
+        accepts_stream = getattr(self.request_marshaller(headers), 'accepts_stream', None)
+        return accepts_stream is not None and accepts_stream(headers)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def add_marshaller(self, marshaller, content_types=None):
+        # type: (BasePackageMarshaller, iter) -> None
+        """
+        Serve an alternative marshaller next to the main one. Request bodies are decoded with it when their
+        Content-Type is one of its media types, and responses are encoded with it when the client prefers one of its
+        media types in its Accept header. All other requests keep using the main marshaller.
+
+        :param marshaller: the marshaller, for example a MessagePackMarshaller.
+        :type marshaller: BasePackageMarshaller
+
+        :param content_types: the media types to select it by, defaults to its CONTENT_TYPES.
+        :type content_types: list(str)
+        """
+        for content_type in content_types or marshaller.CONTENT_TYPES:
+            self.marshallers[content_type.lower()] = marshaller
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _bind_marshaller(self, marshaller):
+        # type: (BasePackageMarshaller) -> BasePackageMarshaller
+        # -- alternative marshallers are wired up like the main one, so they run the same adapters.
+        for name in ('server', 'handler'):
+            value = getattr(self.marshaller, name, None)
+            if value is not None and getattr(marshaller, name, None) is not value:
+                setattr(marshaller, name, value)
+        return marshaller
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def request_marshaller(self, header_data):
+        # type: (dict) -> BasePackageMarshaller
+        """
+        Get the marshaller to decode the body of a request with, by its Content-Type.
+        """
+        if self.marshallers:
+            content_type = header_data.get('Content-Type', '').partition(';')[0].strip().lower()
+            marshaller = self.marshallers.get(content_type)
+            if marshaller is not None:
+                return self._bind_marshaller(marshaller)
+
+        return self.marshaller
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def response_marshaller(self, header_data):
+        # type: (dict) -> BasePackageMarshaller
+        """
+        Get the marshaller to encode the response to a request with: the alternative marshaller of the media type the
+        client's Accept header prefers, or the main marshaller if that isn't one of them.
+        """
+        accept = header_data.get('Accept')
+        if not self.marshallers or not accept:
+            return self.marshaller
+
+        best, best_quality = None, 0.0
+        for item in accept.split(','):
+            media_type, _, params = item.partition(';')
+
+            quality = 1.0
+            for param in params.split(';'):
+                key, _, value = param.partition('=')
+                if key.strip().lower() == 'q':
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+
+            # -- on equal quality, the media type listed first wins.
+            if quality > best_quality:
+                best, best_quality = media_type.strip().lower(), quality
+
+        marshaller = self.marshallers.get(best)
+        return self.marshaller if marshaller is None else self._bind_marshaller(marshaller)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def negotiate_marshallers(self, header_data):
+        # type: (dict) -> tuple
+        """
+        Pick the marshallers to decode a request and encode its response with.
+
+        :return: the request marshaller and the response marshaller.
+        :rtype: tuple
+        """
+        request_marshaller = self.request_marshaller(header_data)
+        response_marshaller = self.response_marshaller(header_data)
+
+        # -- response caches hold marshalled bodies, they have to be kept apart per marshaller.
+        if response_marshaller is not self.marshaller:
+            header_data['_marshaller'] = response_marshaller
+
+        return request_marshaller, response_marshaller
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def respond_error(self, connection, code, reason, message='', header_data=None):
+        # type: (socket.socket, int, str, str, dict) -> None
+        """
+        Respond with a bare error status, without going through the server or the marshaller. Used for requests that
+        are rejected before they could be digested. The connection is marked to be closed after this response.
+
+        :param connection: the client socket to respond on.
+        :type connection: socket.socket
+
+        :param code: the HTTP status code.
+        :type code: int
+
+        :param reason: the HTTP reason phrase.
+        :type reason: str
+
+        :param message: optional plain text body.
+        :type message: str
+
+        :param header_data: optional additional headers.
+        :type header_data: dict
+        """
+        body = message.encode(self.FORMAT)
+
+        headers = collections.OrderedDict(header_data or dict())
+        headers['Content-Type'] = 'text/plain'
+        headers['Content-Length'] = len(body)
+        headers['Connection'] = 'close'
+
+        try:
+            connection.sendall(self.header_writer.write(code, reason, headers) + body)
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def is_preflight(header_data):
+        # type: (dict) -> bool
+        """
+        Whether a request is a CORS preflight, which a browser sends to ask whether it may send the actual request.
+        """
+        return header_data['command'] == 'OPTIONS' and 'Access-Control-Request-Method' in header_data
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def respond_preflight(self, connection, header_data, keep_alive):
+        # type: (socket.socket, dict, bool) -> int
+        """
+        Answer a CORS preflight request with the methods registered at the requested path, without calling any of the
+        resources there, nor running them through the adapters. The CORS headers are those of the server's
+        CORSHeaderAdapter; without one, the preflight is answered without them, which tells the browser no.
+
+        :param connection: the client socket to respond on.
+        :type connection: socket.socket
+
+        :param header_data: the decoded request header.
+        :type header_data: dict
+
+        :param keep_alive: whether the connection should be kept open after this response.
+        :type keep_alive: bool
+
+        :return: the status code responded with, 204, or 404 if there are no resources at the path.
+        :rtype: int
+        """
+        interfaces = getattr(self.server, 'interfaces', None)
+        interface = interfaces.get('web_core') if interfaces else None
+
+        route, methods = None, None
+        if interface is not None:
+            route, methods = interface.allowed_methods(header_data['path'])
+
+        if not methods:
+            self.respond_error(connection, 404, 'Not Found', 'No resources at %s' % header_data['path'])
+            return 404
+
+        header_data['_route'] = route
+        allowed = ', '.join(sorted(methods))
+
+        headers = collections.OrderedDict()
+        if keep_alive:
+            headers['Connection'] = 'keep-alive'
+            headers['Keep-Alive'] = 'timeout=%d, max=%d' % (self.keep_alive_timeout, self.max_keep_alive_requests)
+        else:
+            headers['Connection'] = 'close'
+
+        cors = self._adapter_with('cors_preflight')
+        if cors is not None:
+            headers.update(cors.preflight_headers(allowed, header_data))
+
+        headers['Allow'] = allowed + ', OPTIONS'
+        headers['Content-Length'] = 0
+
+        try:
+            connection.sendall(self.header_writer.write(204, 'No Content', headers))
+        except OSError:
+            pass
+
+        return 204
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _run_adapters(self, hook, *args):
+        for adapter in self.server.adapters.values():
+            getattr(adapter, hook)(self.server, self, *args)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def respond(self, connection, transaction_id, package):
+        # type: (socket.socket, str, Response) -> None
+        """
+        Marshal a response and send it, see `encode_response`
+
+        :param connection: the client socket to respond on.
+        :type connection: socket.socket
+
+        :param transaction_id: the id of the transaction being responded to.
+        :type transaction_id: str
+
+        :param package: the response to send.
+        :type package: Response
+        """
+        connection.sendall(self.encode_response(connection, transaction_id, package))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def encode_response(self, connection, transaction_id, package):
+        # type: (socket.socket, str, Response) -> bytes
+        """
+        Marshal a response into the bytes to send, head included. Responses served from a resource's response cache
+        are sent as they were marshalled the first time, other responses of cached resources are stored once
+        marshalled.
+
+        Once the body has been encoded, adapters implementing `handler_encode_body` get to transform it (to compress
+        it, for example) before the header is built, so Content-Length always matches the bytes actually sent.
+
+        :param connection: the client socket to respond on.
+        :type connection: socket.socket
+
+        :param transaction_id: the id of the transaction being responded to.
+        :type transaction_id: str
+
+        :param package: the response to send.
+        :type package: Response
+
+        :return: the encoded response.
+        :rtype: bytes
+        """
+        timer = getattr(package, 'timer', NULL_TIMER)
+
+        self._run_adapters('handler_pre_respond', connection, transaction_id, package)
+        timer.mark('pre_respond')
+
+        result = package.payload.get('response') if isinstance(package.payload, dict) else None
+
+        marshaller = getattr(package, 'marshaller', None) or self.marshaller
+
+        # -- cached responses were marshalled when they were first sent, others, like metrics, bring their own type.
+        content_type = None
+        if isinstance(result, MarshalledBody):
+            body = bytes(result)
+            content_type = getattr(result, 'content_type', None)
+
+        else:
+            body = marshaller.encode_package(transaction_id, package)
+
+            cache_entry = getattr(package, 'cache_entry', None)
+            if cache_entry is not None and not (package.errors or package.traceback):
+                cache, key = cache_entry
+                cache.put(key, body)
+        timer.mark('marshal')
+
+        for adapter in self.server.adapters.values():
+            encode_body = getattr(adapter, 'handler_encode_body', None)
+            if encode_body is not None:
+                body = encode_body(self.server, self, connection, transaction_id, package, body)
+        timer.mark('encode_body')
+
+        if self.marshallers:
+            if marshaller is not self.marshaller:
+                package.header_data['Content-Type'] = marshaller.CONTENT_TYPES[0]
+
+            # -- the response depends on the request's Accept header, caches in between need to know that.
+            vary = package.header_data.get('Vary')
+            package.header_data['Vary'] = '%s, Accept' % vary if vary else 'Accept'
+
+        if content_type is not None:
+            package.header_data['Content-Type'] = content_type
+
+        package.content_length = len(body)
+
+        return self.encode_response_head(transaction_id, package, len(body)) + body
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _start_stream(self, connection, transaction_id, response, chunked, header_data=None):
+        # type: (socket.socket, str, Response, bool, dict) -> tuple
+        stream = response.payload['response']
+        response.payload['response'] = None
+
+        # -- event streams pick up where the client left off before it reconnected.
+        resume = getattr(stream, 'resume', None)
+        if resume is not None and header_data is not None:
+            resume(header_data.get('Last-Event-ID'))
+
+        response.stream = stream
+        response.chunked = chunked
+        response.keep_alive = response.keep_alive and chunked
+
+        self._run_adapters('handler_pre_respond', connection, transaction_id, response)
+        getattr(response, 'timer', NULL_TIMER).mark('pre_respond')
+
+        # -- streams can bring headers of their own, like the Content-Type of an event stream.
+        response.header_data.update(getattr(stream, 'headers', None) or dict())
+
+        return stream, ChunkedWriter(connection, chunk_size=self.stream_chunk_size, chunked=chunked)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def respond_stream(self, connection, transaction_id, response, chunked=True, header_data=None):
+        """
+        Respond with the items of a generator or iterator returned by a resource, as they are produced, rather than
+        marshalling the whole result up front. Items are coalesced into chunks of at most `stream_chunk_size` bytes
+        and written with blocking sends, so a slow client pauses the producer instead of growing a buffer. Streams
+        with a true `flush_items` attribute, like event streams, have every item sent as soon as it is produced.
+
+        :param connection: the client socket to respond on.
+        :type connection: socket.socket
+
+        :param transaction_id: the id of the transaction being responded to.
+        :type transaction_id: str
+
+        :param response: the response, whose "response" payload entry is the iterator to stream.
+        :type response: Response
+
+        :param chunked: whether to use chunked transfer encoding. If False the connection is closed afterwards.
+        :type chunked: bool
+
+        :param header_data: the decoded request header.
+        :type header_data: dict
+
+        :return: whether the connection can be kept open after this response.
+        :rtype: bool
+        """
+        stream, writer = self._start_stream(connection, transaction_id, response, chunked, header_data)
+        flush_items = getattr(stream, 'flush_items', False)
+
+        try:
+            connection.sendall(self.encode_response_head(transaction_id, response, 0))
+
+            for item in stream:
+                writer.write(encode_stream_item(item, self.FORMAT))
+                if flush_items:
+                    writer.flush()
+
+            writer.close()
+
+        except ConnectionError:
+            # -- the client went away, which is how long-lived streams usually end.
+            return False
+
+        except Exception:
+            # -- the status line is long gone at this point, all we can do is cut the body short, which tells the
+            # -- client the response is incomplete.
+            logger.exception('Streaming response for transaction %s failed!' % transaction_id)
+            return False
+
+        finally:
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+
+        return response.keep_alive
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _start_file(self, connection, transaction_id, response, header_data):
+        # type: (socket.socket, str, Response, dict) -> tuple
+        static_file = response.payload['response']
+        response.payload['response'] = None
+
+        code, offset, count = static_file.evaluate(header_data)
+
+        self._run_adapters('handler_pre_respond', connection, transaction_id, response)
+        getattr(response, 'timer', NULL_TIMER).mark('pre_respond')
+
+        response.header_blocks = [static_file.header_block]
+        response.code = code
+        response.reason = http.HTTPStatus(code).phrase
+        response.content_length = count
+
+        if code == 304:
+            response.not_modified = True
+
+        elif code == 206:
+            response.header_data['Content-Range'] = 'bytes %d-%d/%d' % (offset, offset + count - 1, static_file.size)
+
+        elif code == 416:
+            response.header_data['Content-Range'] = 'bytes */%d' % static_file.size
+
+        return static_file, offset, count
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def respond_file(self, connection, transaction_id, response, header_data):
+        """
+        Respond with a file returned by a static files resource, honouring the conditional and Range headers of the
+        request. Cached files are sent from memory along with the header, other files are sent from disk with
+        sendfile, which copies them to the socket without passing them through Python.
+
+        :param connection: the client socket to respond on.
+        :type connection: socket.socket
+
+        :param transaction_id: the id of the transaction being responded to.
+        :type transaction_id: str
+
+        :param response: the response, whose "response" payload entry is the StaticFile to send.
+        :type response: Response
+
+        :param header_data: the request headers.
+        :type header_data: dict
+
+        :return: whether the connection can be kept open after this response.
+        :rtype: bool
+        """
+        static_file, offset, count = self._start_file(connection, transaction_id, response, header_data)
+        header = self.encode_response_head(transaction_id, response, count)
+
+        if not count:
+            connection.sendall(header)
+            return response.keep_alive
+
+        if static_file.data is not None:
+            connection.sendall(header + static_file.data[offset:offset + count])
+            return response.keep_alive
+
+        connection.sendall(header)
+
+        try:
+            with open(static_file.path, 'rb') as fp:
+                sent = connection.sendfile(fp, offset, count)
+        except OSError:
+            logger.exception('Sending file %s for transaction %s failed!' % (static_file.path, transaction_id))
+            return False
+
+        # -- the file was truncated since it was opened, the client can tell from the body being cut short.
+        return response.keep_alive and sent == count
 
     # ------------------------------------------------------------------------------------------------------------------
     @classmethod
     def dict_to_header(cls, data):
         result = ''
         for key, value in data.items():
-            result += '%s: %s\n' % (key, str(value).strip('\n\r'))
-        return result.strip('\n')
+            result += '%s: %s\r\n' % (key, str(value).strip('\n\r'))
+        return result[:-2]
 
     # ------------------------------------------------------------------------------------------------------------------
     def _get_header_data(self, transaction_id, payload, header_data):
         # type: (str, Package, collections.OrderedDict) -> collections.OrderedDict
         if payload.keep_alive:
             header_data['Connection'] = 'keep-alive'
-        header_data['Accept-Encoding'] = payload.accept_encoding
-        header_data['Content-Length'] = self.get_content_length(transaction_id, payload)
+            header_data['Keep-Alive'] = 'timeout=%d, max=%d' % (self.keep_alive_timeout, self.max_keep_alive_requests)
+
+        # -- let clients know we're about to close the connection, so they don't try to reuse it.
+        elif isinstance(payload, Response):
+            header_data['Connection'] = 'close'
+
+        timer = getattr(payload, 'timer', None)
+        if timer:
+            header_data['Server-Timing'] = timer.header_value()
+
+        # -- a 304 has no body, and its Content-Length would have to be that of the body it stands in for.
+        if getattr(payload, 'not_modified', False):
+            return header_data
+
+        # -- streamed bodies have no length known up front.
+        if getattr(payload, 'stream', None) is not None:
+            if payload.chunked:
+                header_data['Transfer-Encoding'] = 'chunked'
+            return header_data
+
+        # -- responses sent by `respond` know the length of their (possibly transformed) body already.
+        content_length = getattr(payload, 'content_length', None)
+        if content_length is None:
+            content_length = self.get_content_length(transaction_id, payload)
+
+        header_data['Content-Length'] = content_length
         return header_data
 
     # ------------------------------------------------------------------------------------------------------------------
     def encode_question_header(self, transaction_id, payload, expected_content_length):
         # type: (str, Question, int) -> bytes
-        data = '%s %s HTTP/1.1\n' % (payload.command, payload.kwargs.get('path', '/'))
+        data = '%s %s HTTP/1.1\r\n' % (payload.command, payload.kwargs.get('path', '/'))
         data += self.dict_to_header(self.get_outgoing_header_data(transaction_id, payload, expected_content_length))
         return bytes(data, self.FORMAT)
 
@@ -92,13 +1006,12 @@ class HTTPHandler(BaseRequestHandler):
         protocol, _, parts = method.partition(' ')
         ret_code, _, reason = parts.partition(' ')
         result['code'] = int(ret_code)
-        result['Accept-Encoding'] = result.get('Accept-Encoding', 'text/json')
+        result['_content_type'] = self.DEFAULT_CONTENT_TYPE
         return result
 
     # ------------------------------------------------------------------------------------------------------------------
-    def encode_response_header(self, transaction_id, payload, expected_content_length):
-        # type: (str, Response, int) -> bytes
-        # -- if this outgoing, it will not
+    def _response_reason(self, payload):
+        # type: (Response) -> str
         error = ''
 
         if payload.traceback:
@@ -107,9 +1020,41 @@ class HTTPHandler(BaseRequestHandler):
         if payload.errors:
             error = payload.errors[-1]
 
-        data = 'HTTP/1.1 %s %s\n' % (payload.code, 'OK' if not error else error)
-        data += self.dict_to_header(self.get_outgoing_header_data(transaction_id, payload, expected_content_length))
-        return bytes(data, self.FORMAT)
+        return getattr(payload, 'reason', None) or ('OK' if not error else error)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _header_blocks(self, payload):
+        # type: (Response) -> list
+        result = list()
+        for adapter in self.server.adapters.values():
+            block = getattr(adapter, 'header_block', None)
+            if block is not None:
+                result.append(block)
+
+        # -- responses can bring static headers of their own, like those of a static file.
+        result.extend(getattr(payload, 'header_blocks', ()))
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def encode_response_head(self, transaction_id, payload, expected_content_length):
+        # type: (str, Response, int) -> bytes
+        """
+        Encode the complete head of a response: the status line, the Date header, the header blocks of the adapters
+        and the response, and the headers of the response itself, ending in the blank line that separates the head
+        from the body.
+
+        :return: the encoded head.
+        :rtype: bytes
+        """
+        headers = self.get_outgoing_header_data(transaction_id, payload, expected_content_length)
+        reason = self._response_reason(payload)
+        return self.header_writer.write(payload.code, reason, headers, self._header_blocks(payload))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def encode_response_header(self, transaction_id, payload, expected_content_length):
+        # type: (str, Response, int) -> bytes
+        # -- the head without the blank line ending it, as clacks expects it.
+        return self.encode_response_head(transaction_id, payload, expected_content_length)[:-4]
 
 
 register_handler_type('http', HTTPHandler)
@@ -0,0 +1,335 @@
+# -- optional whitespace around header values, as per RFC 7230.
+_OWS = ' \t'
+
+_MISSING = object()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class HeaderMap(dict):
+    """
+    Case-insensitive, multi-value header map.
+
+    This is a regular dict, so it can be passed anywhere the plain header dicts used to go (adapters, packages, json
+    serialization). Parsed header names are stored in their canonical Title-Case form, which is what nearly every
+    client already sends, so lookups using the canonical name cost exactly as much as a plain dict lookup. Lookups
+    using any other casing fall back to the canonical form on a miss, and then to the keys that were set in some other
+    casing. Setting a header that is already present in another casing replaces it, rather than adding a second one.
+
+    Repeated headers are folded into a single comma-separated value as per RFC 7230, with the individual values still
+    available through `getall`.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, *args, **kwargs):
+        super(HeaderMap, self).__init__()
+        if args or kwargs:
+            self.update(*args, **kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _stored_key(self, key):
+        # -- the key an entry is stored under in a casing other than the one asked for, None if there is none.
+        if not isinstance(key, str):
+            return None
+
+        canonical = key.title()
+        if canonical != key and dict.__contains__(self, canonical):
+            return canonical
+
+        # -- lower case name -> key, of the keys stored in a casing other than the canonical one.
+        aliases = self.__dict__.get('_aliases')
+        if aliases:
+            return aliases.get(key.lower())
+
+        return None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _forget(self, key):
+        aliases = self.__dict__.get('_aliases')
+        if aliases and isinstance(key, str) and aliases.get(key.lower()) == key:
+            del aliases[key.lower()]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __missing__(self, key):
+        stored = self._stored_key(key)
+        if stored is not None:
+            return dict.__getitem__(self, stored)
+        raise KeyError(key)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or self._stored_key(key) is not None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __setitem__(self, key, value):
+        if not dict.__contains__(self, key):
+            stored = self._stored_key(key)
+            if stored is not None:
+                key = stored
+            elif isinstance(key, str) and key != key.title():
+                self.__dict__.setdefault('_aliases', dict())[key.lower()] = key
+        dict.__setitem__(self, key, value)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __delitem__(self, key):
+        if not dict.__contains__(self, key):
+            key = self._stored_key(key)
+            if key is None:
+                raise KeyError(key)
+        self._forget(key)
+        dict.__delitem__(self, key)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def get(self, key, default=None):
+        # -- a single lookup for the canonical names nearly every caller uses.
+        value = dict.get(self, key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        stored = self._stored_key(key)
+        if stored is not None:
+            return dict.__getitem__(self, stored)
+        return default
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def pop(self, key, *default):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default:
+            return default[0]
+        raise KeyError(key)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._forget(key)
+        return key, value
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+            return default
+        return self[key]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def clear(self):
+        dict.clear(self)
+        self.__dict__.pop('_aliases', None)
+        self.__dict__.pop('_multi', None)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def copy(self):
+        result = HeaderMap()
+        dict.update(result, self)
+        for name in ('_aliases', '_multi'):
+            if name in self.__dict__:
+                result.__dict__[name] = dict((k, list(v) if isinstance(v, list) else v)
+                                             for k, v in self.__dict__[name].items())
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def add(self, key, value):
+        # type: (str, str) -> None
+        """
+        Add a value for the given header, keeping any values that were already received for it.
+
+        :param key: the header name.
+        :type key: str
+
+        :param value: the header value.
+        :type value: str
+        """
+        if key not in self:
+            self[key.title()] = value
+            return
+
+        key = key if dict.__contains__(self, key) else self._stored_key(key)
+
+        multi = self.__dict__.setdefault('_multi', dict())
+        values = multi.get(key)
+        if values is None:
+            values = multi[key] = [dict.__getitem__(self, key)]
+        values.append(value)
+        dict.__setitem__(self, key, ', '.join(values))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def getall(self, key, default=None):
+        # type: (str, list) -> list
+        """
+        Get all values received for the given header, in the order they were received.
+
+        :param key: the header name.
+        :type key: str
+
+        :param default: value to return if the header is not present.
+        :type default: list
+
+        :return: list of values for this header.
+        :rtype: list
+        """
+        if key not in self:
+            return list() if default is None else default
+
+        key = key if dict.__contains__(self, key) else self._stored_key(key)
+        values = self.__dict__.get('_multi', dict()).get(key)
+
+        # -- a value that was overwritten after being received more than once is a single value again.
+        if values is None or ', '.join(values) != dict.__getitem__(self, key):
+            return [dict.__getitem__(self, key)]
+
+        return list(values)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _parse_header_lines(text):
+    # type: (str) -> tuple
+    # -- slow path, handles everything the fast path in parse_header_block bails out on: bare LF line endings, stray
+    # -- CRs, lines without a ": " separator, repeated headers, non-canonical header names and folded lines.
+    lines = text.split('\n')
+    start_line = lines[0].rstrip('\r').strip()
+
+    headers = HeaderMap()
+    name = None
+
+    for line in lines[1:]:
+        if line.endswith('\r'):
+            line = line[:-1]
+
+        # -- an empty line marks the end of the message head, anything beyond it is body data.
+        if not line:
+            break
+
+        # -- a CR is only ever part of a line ending, one anywhere else is replaced by a space as per RFC 7230, so it
+        # -- can't end the line for anything reading the value later on.
+        line = line.replace('\r', ' ')
+
+        # -- obsolete line folding continues the value of the previous header.
+        if line[0] in _OWS:
+            if name is not None:
+                values = headers.getall(name)
+                values[-1] = ' '.join(filter(None, (values[-1], line.strip(_OWS))))
+                headers.pop(name)
+                for value in values:
+                    headers.add(name, value)
+            continue
+
+        name, sep, value = line.partition(':')
+
+        # -- header names are tokens, whitespace in or around them is invalid and differently interpreted by different
+        # -- servers, so these headers are dropped rather than guessed at.
+        if not sep or name.split() != [name]:
+            name = None
+            continue
+
+        headers.add(name, value.strip(_OWS))
+
+    return start_line, headers
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def parse_header_block(data, encoding='latin-1'):
+    # type: (bytes, str) -> tuple
+    """
+    Parse a raw HTTP message head. Lines only ever end at a CRLF, or a bare LF, never at any of the other characters
+    unicode considers line breaks, so none of those can be used to sneak extra headers into a value. Parsing stops at
+    the first empty line, so any trailing body data is ignored.
+
+    :param data: the raw header bytes, starting at the start line.
+    :type data: bytes
+
+    :param encoding: the encoding to decode header names and values with. HTTP headers are latin-1 by spec.
+    :type encoding: str
+
+    :return: the start line and a HeaderMap of all header fields.
+    :rtype: tuple(str, HeaderMap)
+    """
+    # -- CR and LF never occur inside a multi-byte character of any ascii compatible encoding, so splitting the decoded
+    # -- text on CRLF splits at exactly the same places as splitting the raw bytes would, in a single decode.
+    text = data.decode(encoding)
+    lines = text.split('\r\n')
+
+    # -- every CR and LF has to be part of a CRLF, anything else, like bare LFs or stray CRs, is rare and handled by the
+    # -- slow path.
+    count = len(lines) - 1
+    if text.count('\n') != count or text.count('\r') != count:
+        return _parse_header_lines(text)
+
+    fields = dict()
+    for line in lines[1:]:
+        name, sep, value = line.partition(': ')
+
+        # -- anything unusual, like repeated or non-canonical headers, or whitespace in a name, which includes folded
+        # -- lines, is handed off to the slow path instead.
+        if not sep or name in fields or not name.istitle() or ' ' in name or '\t' in name:
+            if not line:
+                break
+            return _parse_header_lines(text)
+
+        fields[name] = value.strip(_OWS)
+
+    # -- all names are canonical, so they can go straight into the map.
+    headers = HeaderMap.__new__(HeaderMap)
+    dict.update(headers, fields)
+
+    return lines[0].strip(), headers
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def split_request_line(line):
+    # type: (str) -> tuple
+    """
+    Split an HTTP request line into its method, path, query string and protocol version.
+
+    :param line: the request line, for example "GET /users?id=1 HTTP/1.1"
+    :type line: str
+
+    :return: method, path, query string and version. The query string is empty if none was given.
+    :rtype: tuple(str, str, str, str)
+    """
+    method, _, rest = line.partition(' ')
+    target, _, version = rest.rpartition(' ')
+
+    # -- HTTP/0.9 style request lines do not carry a version.
+    if not target:
+        target, version = version, ''
+
+    path, _, query = target.rpartition('?')
+    if not _:
+        path, query = query, ''
+
+    return method, path, query, version
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def parse_query_string(query):
+    # type: (str) -> dict
+    """
+    Parse a query string into a dict of keyword arguments. Values are kept as they were received.
+
+    :param query: the query string, without the leading "?".
+    :type query: str
+
+    :return: keyword arguments.
+    :rtype: dict
+    """
+    result = dict()
+    if not query:
+        return result
+
+    for pair in query.split('&'):
+        key, _, value = pair.partition('=')
+        result[key] = value
+
+    return result
@@ -1 +1,3 @@
 from .core_interface import ClacksCoreWebAPIInterface
+from .static_files_interface import ClacksStaticFilesInterface
+from .metrics_interface import ClacksMetricsInterface
@@ -1,4 +1,8 @@
 import clacks
+from clacks_web.core.http_handler import HTTPHandler
+from clacks_web.core.prefork import current_worker, aggregate_stats
+from clacks_web.core.response_cache import response_caches
+from clacks_web.core.executors import pools, resource_executors
 from clacks_web.core.decorators.rest_decorators import get
 
 
@@ -12,8 +16,65 @@ class ClacksBasicRestAPIInterface(clacks.ServerInterface):
     def list_endpoints(self):
         result = dict()
         for method in self.server.resources:
-            result[method] = sorted(list(set(self.server.resources[method].keys())))
+            # -- templated paths, like "/users/{id:int}", are held by the router rather than the resources dict.
+            paths = set(self.server.resources[method].keys())
+            paths.update(self.server.routers[method].paths)
+            result[method] = sorted(paths)
         return result
 
+    # ------------------------------------------------------------------------------------------------------------------
+    @get('/connection_stats', expose_as_method=False)
+    def connection_stats(self):
+        """
+        Connection reuse counters for all HTTP handlers registered to this server: connections opened and closed,
+        requests served, how many of those reused an existing connection or were pipelined, and why connections were
+        closed.
+
+        When running as a pre-fork worker, the counters are summed over all workers of the server, with each worker's
+        own counters under "workers".
+        """
+        worker = current_worker()
+        if worker is not None:
+            return aggregate_stats(worker.stats_dir)
+
+        result = dict()
+        for handler in HTTPHandler.instances(self.server):
+            for key, value in handler.connection_stats.as_dict().items():
+                result[key] = result.get(key, 0) + value
+
+        opened = result.get('connections_opened', 0)
+        result['requests_per_connection'] = float(result.get('requests', 0)) / opened if opened else 0.0
+
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @get('/cache_stats', expose_as_method=False)
+    def cache_stats(self):
+        """
+        Hit, miss, eviction and invalidation counters of all response caches, per named cache and in total.
+        """
+        result = dict(total=dict(), caches=dict())
+
+        for cache in response_caches():
+            stats = cache.as_dict()
+
+            for key, value in stats.items():
+                result['total'][key] = result['total'].get(key, 0) + value
+
+            if cache.name is not None:
+                result['caches'][cache.name] = stats
+
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @get('/executor_stats', expose_as_method=False)
+    def executor_stats(self):
+        """
+        Load of the shared thread and process pools, and per resource running off the handler thread: calls running,
+        queue depth, and calls queued, rejected, completed and failed.
+        """
+        resources = dict((executor.name, executor.as_dict()) for executor in resource_executors())
+        return dict(pools=pools.as_dict(), resources=resources)
+
 
 clacks.register_server_interface_type('rest_basic', ClacksBasicRestAPIInterface)
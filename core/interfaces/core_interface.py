@@ -1,7 +1,17 @@
 import clacks
+import asyncio
 import inspect
 from clacks import command
 
+from clacks_web.core.router import ResourceRouter, is_template
+from clacks_web.core.conditional import NotModified, resource_validators, is_not_modified
+from clacks_web.core.batch import BatchRunner, BatchError
+from clacks_web.core.executors import ResourceBusyError
+from clacks_web.core.binders import ArgumentError, compile_binder
+from clacks_web.core.streaming import is_stream, is_async_stream
+from clacks_web.core.timing import NULL_TIMER
+from clacks_web.core.decorators.rest_decorators import post
+
 
 # ----------------------------------------------------------------------------------------------------------------------
 class ClacksCoreWebAPIInterface(clacks.ServerInterface):
@@ -22,11 +32,27 @@ class ClacksCoreWebAPIInterface(clacks.ServerInterface):
     def __init__(self):
         super(ClacksCoreWebAPIInterface, self).__init__()
         self.resources = dict()
+        self.routers = dict()
+        self.batch_runner = BatchRunner()
+
+        # -- the functions the registered resources wrap, which are what resources running on an executor submit, see
+        # -- `resource_function`.
+        self.resource_functions = dict()
+
+        # -- the binders of the resources declared with a resource decorator, compiled once, when they are registered.
+        self.resource_binders = dict()
+
+        # -- the methods registered per path, to answer CORS preflights with, see `allowed_methods`. Static paths are
+        # -- looked up in the dict, templated paths matched by the router, which holds (path, methods) pairs.
+        self.allowed = dict()
+        self.allowed_templates = dict()
+        self.allowed_router = ResourceRouter()
 
     # ------------------------------------------------------------------------------------------------------------------
     def get_resources_from_object(self, obj):
         """
-        From a given object, register all callables as resources on the server.
+        From a given object, register all methods as resources on the server, along with the static methods and
+        functions that were declared as resources using one of the resource decorators.
 
         :param obj: the object to gather resources from. Usually a ServerInterface instance.
         :type obj: object
@@ -40,7 +66,8 @@ class ClacksCoreWebAPIInterface(clacks.ServerInterface):
             if not callable(v):
                 continue
 
-            if not inspect.ismethod(v):
+            # -- static methods and functions are only registered when decorated, they could be anything otherwise.
+            if not inspect.ismethod(v) and not (inspect.isfunction(v) and hasattr(v, 'resource_type')):
                 continue
 
             # -- don't register private methods as resources, but register decorated hidden ones.
@@ -66,6 +93,10 @@ class ClacksCoreWebAPIInterface(clacks.ServerInterface):
             if not resource:
                 continue
 
+            self.resource_functions[resource] = v
+            if hasattr(v, 'resource_type'):
+                self.resource_binders[resource] = compile_binder(v)
+
             self.register_resource(resource_type, path, resource)
 
     # ------------------------------------------------------------------------------------------------------------------
@@ -92,7 +123,7 @@ class ClacksCoreWebAPIInterface(clacks.ServerInterface):
         :param resource_type: Name of the method to use to request this resource. For example, GET, POST, etc...
         :type resource_type: str
 
-        :param path: The path at which to register the resource. Example: '/list_methods'
+        :param path: The path at which to register the resource. Example: '/list_methods' or '/users/{id:int}'
         :type path: str
 
         :param func: callable function to register at the given resource.
@@ -101,49 +132,252 @@ class ClacksCoreWebAPIInterface(clacks.ServerInterface):
         """
         if resource_type not in self.resources:
             self.resources[resource_type] = dict()
+            self.routers[resource_type] = ResourceRouter()
+
         self.logger.debug('Registering REST resource %s of type %s at path %s' % (func, resource_type, path))
-        self.resources[resource_type][path] = func
+
+        # -- paths with parameters are matched by the router, static paths by a lookup in the resources dict.
+        if is_template(path):
+            self.routers[resource_type].add(path, func)
+        else:
+            self.resources[resource_type][path] = func
+
+        if is_template(path):
+            methods = self.allowed_templates.get(path)
+            if methods is None:
+                methods = self.allowed_templates[path] = set()
+                self.allowed_router.add(path, (path, methods))
+        else:
+            methods = self.allowed.setdefault(path, set())
+        methods.add(resource_type)
 
     # ------------------------------------------------------------------------------------------------------------------
-    def get_resource(self, resource_type, path):
+    def allowed_methods(self, path):
         """
-        Get a registered resource by its type and path.
+        Get the methods resources are registered for at a requested path, without calling or even binding any of them.
+
+        :param path: The requested path. Example: '/users/42'
+        :type path: str
+
+        :return: The path the resources were registered at and their methods, or (None, None) if there are none.
+        :rtype: tuple(str, set)
+        """
+        route, methods = self.allowed_router.match(path)[0] or (None, None)
+
+        # -- static paths take precedence, like they do when matching resources, but templated ones may add methods.
+        static = self.allowed.get(path)
+        if static is not None:
+            route, methods = path, static | methods if methods else static
+
+        return route, methods
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def match_resource(self, resource_type, path):
+        """
+        Get a registered resource by its type and path, along with any path parameters extracted from the path.
 
         :param resource_type: Name of the method to use to request this resource. For example, GET, POST, etc...
         :type resource_type: str
 
-        :param path: The path at which to register the resource. Example: '/list_methods'
+        :param path: The requested path. Example: '/users/42'
         :type path: str
 
-        :return: The resource, if one was found. None otherwise.
-        :rtype: object(callable)
+        :return: The resource and a dict of path parameters. Raises ClacksCommandNotFoundError if nothing matched.
+        :rtype: tuple(object(callable), dict)
         """
         if resource_type not in self.resources:
             msg = f'Resource type {resource_type} is not recognized!'
             self.logger.error(msg)
             raise clacks.errors.ClacksCommandNotFoundError(msg)
 
-        if path not in self.resources[resource_type]:
+        # -- fast path, static resources are a single dict lookup.
+        resource = self.resources[resource_type].get(path)
+        if resource is not None:
+            return resource, dict()
+
+        resource, params = self.routers[resource_type].match(path)
+        if resource is None:
             msg = f'Resource {path} of type {resource_type} could not be found!'
             self.logger.error(msg)
             raise clacks.errors.ClacksCommandNotFoundError(msg)
 
-        return self.resources[resource_type][path]
+        return resource, params
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def get_resource(self, resource_type, path):
+        """
+        Get a registered resource by its type and path.
+
+        :param resource_type: Name of the method to use to request this resource. For example, GET, POST, etc...
+        :type resource_type: str
+
+        :param path: The path at which to register the resource. Example: '/list_methods'
+        :type path: str
+
+        :return: The resource, if one was found. None otherwise.
+        :rtype: object(callable)
+        """
+        return self.match_resource(resource_type, path)[0]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def resource_function(self, resource):
+        """
+        Get the function a registered resource wraps. This is what is submitted to the executor of resources that
+        don't run inline: unlike the ServerCommand wrapping it, a static method or plain function can be sent to a
+        process, and a bound method is recognized as such and refused by process executors.
+
+        :param resource: a registered resource.
+        :type resource: object(callable)
+
+        :return: the function, or the resource itself if it was registered as a plain callable.
+        :rtype: callable
+        """
+        return self.resource_functions.get(resource, resource)
 
     # ------------------------------------------------------------------------------------------------------------------
     def _method(self, method, *args, **kwargs):
         path = kwargs.get('path')
+        header_data = dict()
 
         if '_header_data' in kwargs:
-            path = kwargs['_header_data'].get('path')
+            header_data = kwargs['_header_data']
+            path = header_data.get('path')
             del kwargs['_header_data']
 
         if not path:
             raise clacks.errors.ClacksBadCommandArgsError('No "path" argument provided in kwargs!')
 
-        resource = self.get_resource(method, path)
+        # -- the time since the handler decoded the request went into the pre-digest adapters.
+        timer = header_data.get('_timer', NULL_TIMER)
+        timer.mark('pre_digest')
+
+        resource, params = self.match_resource(method, path)
+
+        # -- metrics are labelled by the path the resource was declared with, not by the requested one.
+        header_data['_route'] = getattr(resource, 'path', None) or path
+
+        # -- path parameters take precedence over keyword arguments of the same name passed in the query string.
+        kwargs.update(params)
+
+        # -- convert the arguments to the types the resource declares, before anything gets to see them, so malformed
+        # -- requests are rejected up front and response caches are keyed on the converted values.
+        binder = self.resource_binders.get(resource)
+        if binder is not None and not args:
+            try:
+                binder(kwargs)
+            except ArgumentError as e:
+                raise clacks.errors.ClacksBadCommandArgsError(str(e))
+        timer.mark('route')
 
-        return resource(*args, **kwargs), clacks.ReturnCodes.OK
+        if method == 'GET':
+            # -- the conditional adapter picks these up to set the ETag and Last-Modified headers.
+            header_data['_etag_mode'] = getattr(resource, 'etag', None)
+
+            etag, last_modified = resource_validators(resource, kwargs)
+            header_data['_validators'] = etag, last_modified
+
+            # -- if the resource can tell us its version cheaply, there is no need to call it when the client is
+            # -- up to date.
+            if (etag or last_modified) and is_not_modified(header_data, etag, last_modified):
+                return NotModified(etag, last_modified), clacks.ReturnCodes.OK
+
+        cache = getattr(resource, 'cache', None)
+        if cache is not None:
+            key = cache.make_key(path, kwargs, header_data)
+
+            body = cache.get(key)
+            if body is not None:
+                return body, clacks.ReturnCodes.OK
+
+            # -- the handler stores the response once it has been marshalled.
+            header_data['_cache_entry'] = cache, key
+
+        # -- resources that don't run inline return a future, which the handler waits for.
+        executor = getattr(resource, 'executor', None)
+        if executor is not None:
+            result = executor.submit(self.resource_function(resource), *args, **kwargs)
+        else:
+            result = resource(*args, **kwargs)
+        timer.mark('resource')
+        return result, clacks.ReturnCodes.OK
+
+    # ------------------------------------------------------------------------------------------------------------------
+    # -- the type hints have the binder convert options sent as strings, like those of a query string or form.
+    @post('/_batch', expose_as_method=False)
+    def batch(self, operations=None, parallel: bool = False, max_concurrency: int = None, **_):
+        """
+        Call many resources in a single request, rather than paying for a round trip, the adapters and marshalling for
+        every one of them. Every operation is an object with a "method" (GET if omitted), a "path", and optionally the
+        "kwargs" to pass to the resource. Only the resources themselves are called, their response caches and
+        conditional request handling are bypassed.
+
+        :param operations: the operations to run.
+        :type operations: list(dict)
+
+        :param parallel: run the operations in parallel, rather than one after the other.
+        :type parallel: bool
+
+        :param max_concurrency: at most this many operations run at the same time, capped by the server.
+        :type max_concurrency: int
+
+        :return: for every operation, in order, an object with its HTTP "status", and either its "response" or the
+            "error" it failed with.
+        :rtype: list(dict)
+        """
+        try:
+            return self.batch_runner.run(operations, self._run_batch_operation, parallel, max_concurrency)
+        except ValueError as e:
+            raise clacks.errors.ClacksBadCommandArgsError(str(e))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _run_batch_operation(self, operation):
+        # type: (dict) -> object
+        method = str(operation.get('method') or 'GET').upper()
+        path = operation['path']
+
+        try:
+            resource, params = self.match_resource(method, path)
+        except clacks.errors.ClacksCommandNotFoundError as e:
+            raise BatchError(404, str(e))
+
+        # -- batches run on a pool of their own, a batch waiting for a batch on that same pool could deadlock it.
+        if self.resource_function(resource) == self.batch:
+            raise BatchError(400, 'Batches can not be nested!')
+
+        kwargs = dict(operation.get('kwargs') or dict())
+        kwargs.update(params)
+
+        try:
+            binder = self.resource_binders.get(resource)
+            if binder is not None:
+                binder(kwargs)
+            else:
+                inspect.signature(resource).bind(**kwargs)
+        except (ArgumentError, TypeError) as e:
+            raise BatchError(400, str(e))
+
+        try:
+            executor = getattr(resource, 'executor', None)
+            if executor is not None:
+                result = executor.submit(self.resource_function(resource), **kwargs).result()
+            else:
+                result = resource(**kwargs)
+        except ResourceBusyError as e:
+            raise BatchError(503, str(e))
+
+        # -- everything has to be marshalled together, so async and streamed results are collected here.
+        if inspect.iscoroutine(result):
+            return asyncio.run(result)
+
+        if is_async_stream(result):
+            async def collect():
+                return [item async for item in result]
+            return asyncio.run(collect())
+
+        if is_stream(result):
+            return list(result)
+
+        return result
 
     # ------------------------------------------------------------------------------------------------------------------
     @clacks.returns_status_code
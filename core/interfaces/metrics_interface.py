@@ -0,0 +1,42 @@
+import clacks
+
+from clacks_web.core.metrics import MetricsRegistry, PrometheusText, DEFAULT_BUCKETS
+from clacks_web.core.decorators.rest_decorators import get
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ClacksMetricsInterface(clacks.ServerInterface):
+    """
+    Request metrics of the server: request counts per route and status code, latency histograms per route and the
+    number of requests in flight, served at /metrics in the Prometheus text format.
+
+    Registering this interface is what turns the metrics on; the HTTP handlers of the server record every request
+    into its registry once it is registered. Routes are labelled by the path their resource was declared with, so
+    "/users/42" and "/users/43" both count towards "/users/{id:int}".
+    """
+
+    _REQUIRED_INTERFACES = ['web_core']
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        super(ClacksMetricsInterface, self).__init__()
+        self.registry = MetricsRegistry(buckets)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @get('/metrics', expose_as_method=False)
+    def metrics(self):
+        """
+        All metrics, in the Prometheus text exposition format.
+        """
+        return PrometheusText(self.registry.render().encode('utf-8'))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @get('/metrics_stats', expose_as_method=False)
+    def metrics_stats(self):
+        """
+        Request counts per status code and mean latency per route, and the requests in flight per method, as JSON.
+        """
+        return self.registry.as_dict()
+
+
+clacks.register_server_interface_type('metrics', ClacksMetricsInterface)
@@ -0,0 +1,42 @@
+import os
+
+import clacks
+from clacks_web.core.static_files import StaticFiles
+from clacks_web.core.decorators.rest_decorators import get
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ClacksStaticFilesInterface(clacks.ServerInterface):
+    """
+    Serves the files in a directory under "/static/". Files are sent by the HTTP handler as they are, without going
+    through the marshaller, see StaticFiles and HTTPHandler.respond_file. Supports conditional requests through ETag
+    and Last-Modified, and Range requests.
+
+    Without a root, the "static" directory in the current working directory is served.
+    """
+
+    _REQUIRED_INTERFACES = ['web_core']
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, root=None, **kwargs):
+        super(ClacksStaticFilesInterface, self).__init__()
+        self.static_files = StaticFiles(root or os.path.join(os.getcwd(), 'static'), **kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @get('/static/{path:path}', expose_as_method=False)
+    def static_file(self, path, **_):
+        try:
+            return self.static_files.open(path)
+        except FileNotFoundError:
+            raise clacks.errors.ClacksCommandNotFoundError('File %s could not be found!' % path)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @get('/static_stats', expose_as_method=False)
+    def static_stats(self):
+        """
+        Hit, miss and eviction counters of the static file cache, and the number of files and bytes it holds.
+        """
+        return self.static_files.as_dict()
+
+
+clacks.register_server_interface_type('static_files', ClacksStaticFilesInterface)
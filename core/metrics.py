@@ -0,0 +1,272 @@
+import time
+import bisect
+import threading
+
+from .response_cache import MarshalledBody
+
+
+# -- latency histogram bucket bounds, in seconds.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# -- route label of requests that didn't match a resource, or were rejected before they could be routed. Labelling them
+# -- by their path would let any client grow the metrics without bounds.
+UNMATCHED_ROUTE = 'unmatched'
+
+# -- methods are labelled as they are, any other method a client makes up is labelled as OTHER_METHOD, for the same
+# -- reason.
+KNOWN_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+OTHER_METHOD = 'OTHER'
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class PrometheusText(MarshalledBody):
+    """
+    A body in the Prometheus text exposition format, sent as-is rather than through the marshaller.
+    """
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _Series(object):
+    """
+    The counters of a single method and route: a latency histogram, the sum of all latencies, and a count per status.
+    """
+
+    __slots__ = ('counts', 'sum', 'statuses')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, size):
+        # type: (int) -> None
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.statuses = dict()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def merge(self, other):
+        # type: (_Series) -> None
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            counts[index] += count
+        self.sum += other.sum
+        # -- the thread owning the other series may be adding statuses to it while it is merged.
+        for status, count in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _Shard(object):
+    """
+    The counters written by a single thread. Only that thread ever writes them, so it doesn't need a lock to.
+    """
+
+    __slots__ = ('thread', 'series', 'in_flight')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, thread):
+        # type: (threading.Thread) -> None
+        self.thread = thread
+        self.series = dict()
+        self.in_flight = dict()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class MetricsRegistry(object):
+    """
+    Request metrics per method and route: request counts per status code, latency histograms with fixed buckets, and
+    the number of requests in flight per method.
+
+    Every thread counts into a shard of its own, so recording a request takes no lock and no thread ever waits on
+    another; the shards are only summed up when the metrics are read. Shards of threads that have ended are folded into
+    a single retired shard, so a server that runs a thread per connection doesn't pile them up.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        # type: (tuple) -> None
+        self.buckets = tuple(sorted(buckets))
+
+        self._local = threading.local()
+        self._shards = list()
+        self._retired = _Shard(None)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _shard(self):
+        # type: () -> _Shard
+        try:
+            return self._local.shard
+        except AttributeError:
+            pass
+
+        shard = self._local.shard = _Shard(threading.current_thread())
+        with self._lock:
+            self._retire()
+            self._shards.append(shard)
+        return shard
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _retire(self):
+        # -- must be called with the lock held.
+        alive = list()
+
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+                continue
+
+            self._merge(self._retired, shard)
+
+        self._shards = alive
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _merge(self, target, shard):
+        # type: (_Shard, _Shard) -> None
+        for key, series in list(shard.series.items()):
+            merged = target.series.get(key)
+            if merged is None:
+                merged = target.series[key] = _Series(len(self.buckets) + 1)
+            merged.merge(series)
+
+        for method, count in list(shard.in_flight.items()):
+            target.in_flight[method] = target.in_flight.get(method, 0) + count
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def start(self, method):
+        # type: (str) -> float
+        """
+        Count a request as in flight.
+
+        :return: the start time to pass to `finish`.
+        :rtype: float
+        """
+        if method not in KNOWN_METHODS:
+            method = OTHER_METHOD
+
+        in_flight = self._shard().in_flight
+        in_flight[method] = in_flight.get(method, 0) + 1
+        return time.perf_counter()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def finish(self, method, route, status, start):
+        # type: (str, str, int, float) -> None
+        """
+        Record a request that was started with `start`. Must be called on the thread that started it.
+
+        :param method: the request method, as passed to `start`.
+        :type method: str
+
+        :param route: the path of the resource, with its parameters as declared, like "/users/{id:int}".
+        :type route: str
+
+        :param status: the status code of the response.
+        :type status: int
+
+        :param start: the start time returned by `start`.
+        :type start: float
+        """
+        duration = time.perf_counter() - start
+        shard = self._shard()
+
+        if method not in KNOWN_METHODS:
+            method = OTHER_METHOD
+
+        in_flight = shard.in_flight
+        in_flight[method] = in_flight.get(method, 0) - 1
+
+        key = method, route or UNMATCHED_ROUTE
+        series = shard.series.get(key)
+        if series is None:
+            series = shard.series[key] = _Series(len(self.buckets) + 1)
+
+        series.counts[bisect.bisect_left(self.buckets, duration)] += 1
+        series.sum += duration
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def snapshot(self):
+        # type: () -> _Shard
+        """
+        Sum up the counters of all threads.
+
+        :return: a shard holding the sums.
+        :rtype: _Shard
+        """
+        result = _Shard(None)
+
+        with self._lock:
+            self._retire()
+            self._merge(result, self._retired)
+            for shard in self._shards:
+                self._merge(result, shard)
+
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def as_dict(self):
+        # type: () -> dict
+        """
+        :return: per "METHOD route", the number of requests, the count per status, and the mean latency in seconds,
+            and the requests in flight per method.
+        :rtype: dict
+        """
+        snapshot = self.snapshot()
+
+        routes = dict()
+        for (method, route), series in sorted(snapshot.series.items()):
+            count = sum(series.counts)
+            routes['%s %s' % (method, route)] = dict(
+                requests=count,
+                statuses=dict((str(status), value) for status, value in sorted(series.statuses.items())),
+                mean_latency=series.sum / count if count else 0.0,
+            )
+
+        return dict(routes=routes, in_flight=snapshot.in_flight)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def render(self, prefix='clacks_web'):
+        # type: (str) -> str
+        """
+        Render the metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        series = sorted(snapshot.series.items())
+        bounds = ['%g' % bound for bound in self.buckets] + ['+Inf']
+
+        lines = [
+            '# HELP %s_requests_total Requests served, by method, route and status code.' % prefix,
+            '# TYPE %s_requests_total counter' % prefix,
+        ]
+        for (method, route), values in series:
+            labels = 'method="%s",route="%s"' % (_escape(method), _escape(route))
+            for status, count in sorted(values.statuses.items()):
+                lines.append('%s_requests_total{%s,status="%s"} %d' % (prefix, labels, status, count))
+
+        lines.extend([
+            '# HELP %s_request_duration_seconds Time from reading a request to having sent its response.' % prefix,
+            '# TYPE %s_request_duration_seconds histogram' % prefix,
+        ])
+        for (method, route), values in series:
+            labels = 'method="%s",route="%s"' % (_escape(method), _escape(route))
+
+            total = 0
+            for bound, count in zip(bounds, values.counts):
+                total += count
+                lines.append('%s_request_duration_seconds_bucket{%s,le="%s"} %d' % (prefix, labels, bound, total))
+
+            lines.append('%s_request_duration_seconds_sum{%s} %r' % (prefix, labels, values.sum))
+            lines.append('%s_request_duration_seconds_count{%s} %d' % (prefix, labels, total))
+
+        lines.extend([
+            '# HELP %s_requests_in_flight Requests being served right now, by method.' % prefix,
+            '# TYPE %s_requests_in_flight gauge' % prefix,
+        ])
+        for method, count in sorted(snapshot.in_flight.items()):
+            lines.append('%s_requests_in_flight{method="%s"} %d' % (prefix, _escape(method), count))
+
+        return '\n'.join(lines) + '\n'
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _escape(value):
+    # type: (str) -> str
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
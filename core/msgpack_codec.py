@@ -0,0 +1,315 @@
+import struct
+
+try:
+    import msgpack as _msgpack
+except ImportError:
+    _msgpack = None
+
+
+_UINT8 = struct.Struct('>B')
+_UINT16 = struct.Struct('>H')
+_UINT32 = struct.Struct('>I')
+_UINT64 = struct.Struct('>Q')
+_INT8 = struct.Struct('>b')
+_INT16 = struct.Struct('>h')
+_INT32 = struct.Struct('>i')
+_INT64 = struct.Struct('>q')
+_FLOAT32 = struct.Struct('>f')
+_FLOAT64 = struct.Struct('>d')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class MessagePackError(ValueError):
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def has_accelerator():
+    # type: () -> bool
+    """
+    Whether the msgpack package is installed, in which case packb and unpackb use its C implementation.
+    """
+    return _msgpack is not None
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _pack_length(out, length, fix_marker, fix_limit, markers):
+    # type: (bytearray, int, int, int, tuple) -> None
+    if fix_marker is not None and length < fix_limit:
+        out.append(fix_marker | length)
+    elif markers[0] is not None and length < 0x100:
+        out.append(markers[0])
+        out.append(length)
+    elif length < 0x10000:
+        out.append(markers[1])
+        out += _UINT16.pack(length)
+    elif length < 0x100000000:
+        out.append(markers[2])
+        out += _UINT32.pack(length)
+    else:
+        raise MessagePackError('Object of %s items or bytes is too large to pack!' % length)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _pack_int(out, value):
+    # type: (bytearray, int) -> None
+    if 0 <= value < 0x80:
+        out.append(value)
+    elif -0x20 <= value < 0:
+        out.append(value & 0xff)
+    elif 0 <= value < 0x100:
+        out.append(0xcc)
+        out.append(value)
+    elif 0 <= value < 0x10000:
+        out.append(0xcd)
+        out += _UINT16.pack(value)
+    elif 0 <= value < 0x100000000:
+        out.append(0xce)
+        out += _UINT32.pack(value)
+    elif 0 <= value < 0x10000000000000000:
+        out.append(0xcf)
+        out += _UINT64.pack(value)
+    elif -0x80 <= value < 0:
+        out.append(0xd0)
+        out += _INT8.pack(value)
+    elif -0x8000 <= value < 0:
+        out.append(0xd1)
+        out += _INT16.pack(value)
+    elif -0x80000000 <= value < 0:
+        out.append(0xd2)
+        out += _INT32.pack(value)
+    elif -0x8000000000000000 <= value < 0:
+        out.append(0xd3)
+        out += _INT64.pack(value)
+    else:
+        raise MessagePackError('Integer %s is out of range!' % value)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _pack(out, value):
+    # type: (bytearray, object) -> None
+    # -- exact type checks first, they are much cheaper than isinstance and cover nearly everything.
+    kind = type(value)
+
+    if kind is str:
+        data = value.encode('utf-8')
+        _pack_length(out, len(data), 0xa0, 32, (0xd9, 0xda, 0xdb))
+        out += data
+    elif kind is int:
+        _pack_int(out, value)
+    elif value is None:
+        out.append(0xc0)
+    elif kind is bool:
+        out.append(0xc3 if value else 0xc2)
+    elif kind is float:
+        out.append(0xcb)
+        out += _FLOAT64.pack(value)
+    elif kind is dict or isinstance(value, dict):
+        _pack_length(out, len(value), 0x80, 16, (None, 0xde, 0xdf))
+        for key, item in value.items():
+            _pack(out, key)
+            _pack(out, item)
+    elif kind is list or kind is tuple or isinstance(value, (list, tuple)):
+        _pack_length(out, len(value), 0x90, 16, (None, 0xdc, 0xdd))
+        for item in value:
+            _pack(out, item)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        _pack_length(out, len(value), None, 0, (0xc4, 0xc5, 0xc6))
+        out += value
+    elif isinstance(value, str):
+        _pack(out, str(value))
+    elif isinstance(value, bool):
+        _pack(out, bool(value))
+    elif isinstance(value, int):
+        _pack_int(out, int(value))
+    elif isinstance(value, float):
+        _pack(out, float(value))
+    else:
+        raise TypeError('Object of type %s is not MessagePack serializable' % type(value).__name__)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def pack(value):
+    # type: (object) -> bytes
+    """
+    Encode a value as MessagePack, in pure Python. Supports None, bools, ints, floats, strings, bytes, lists, tuples
+    and dicts. Tuples come back as lists.
+    """
+    out = bytearray()
+    _pack(out, value)
+    return bytes(out)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _Unpacker(object):
+
+    __slots__ = ('data', 'offset')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, data):
+        # type: (bytes) -> None
+        self.data = data
+        self.offset = 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _take(self, size):
+        # type: (int) -> bytes
+        start = self.offset
+        end = start + size
+        if end > len(self.data):
+            raise MessagePackError('MessagePack data ends unexpectedly!')
+        self.offset = end
+        return self.data[start:end]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _unpack(self, fmt):
+        # type: (struct.Struct) -> object
+        start = self.offset
+        self.offset = start + fmt.size
+        if self.offset > len(self.data):
+            raise MessagePackError('MessagePack data ends unexpectedly!')
+        return fmt.unpack_from(self.data, start)[0]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _array(self, length):
+        # type: (int) -> list
+        read = self.read
+        return [read() for _ in range(length)]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _map(self, length):
+        # type: (int) -> dict
+        read = self.read
+        result = dict()
+        for _ in range(length):
+            key = read()
+            if isinstance(key, list):
+                key = tuple(key)
+            try:
+                result[key] = read()
+            except TypeError:
+                raise MessagePackError('Unhashable MessagePack map key of type %s!' % type(key).__name__)
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _str(self, length):
+        # type: (int) -> str
+        try:
+            return bytes(self._take(length)).decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise MessagePackError('Invalid UTF-8 in MessagePack string: %s' % e)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def read(self):
+        # type: () -> object
+        if self.offset >= len(self.data):
+            raise MessagePackError('MessagePack data ends unexpectedly!')
+
+        marker = self.data[self.offset]
+        self.offset += 1
+
+        if marker < 0x80:
+            return marker
+        if marker >= 0xe0:
+            return marker - 0x100
+        if 0xa0 <= marker <= 0xbf:
+            return self._str(marker & 0x1f)
+        if 0x90 <= marker <= 0x9f:
+            return self._array(marker & 0x0f)
+        if 0x80 <= marker <= 0x8f:
+            return self._map(marker & 0x0f)
+
+        if marker == 0xc0:
+            return None
+        if marker == 0xc2:
+            return False
+        if marker == 0xc3:
+            return True
+
+        if marker == 0xcc:
+            return self._unpack(_UINT8)
+        if marker == 0xcd:
+            return self._unpack(_UINT16)
+        if marker == 0xce:
+            return self._unpack(_UINT32)
+        if marker == 0xcf:
+            return self._unpack(_UINT64)
+        if marker == 0xd0:
+            return self._unpack(_INT8)
+        if marker == 0xd1:
+            return self._unpack(_INT16)
+        if marker == 0xd2:
+            return self._unpack(_INT32)
+        if marker == 0xd3:
+            return self._unpack(_INT64)
+        if marker == 0xca:
+            return self._unpack(_FLOAT32)
+        if marker == 0xcb:
+            return self._unpack(_FLOAT64)
+
+        if marker == 0xd9:
+            return self._str(self._unpack(_UINT8))
+        if marker == 0xda:
+            return self._str(self._unpack(_UINT16))
+        if marker == 0xdb:
+            return self._str(self._unpack(_UINT32))
+        if marker == 0xc4:
+            return bytes(self._take(self._unpack(_UINT8)))
+        if marker == 0xc5:
+            return bytes(self._take(self._unpack(_UINT16)))
+        if marker == 0xc6:
+            return bytes(self._take(self._unpack(_UINT32)))
+        if marker == 0xdc:
+            return self._array(self._unpack(_UINT16))
+        if marker == 0xdd:
+            return self._array(self._unpack(_UINT32))
+        if marker == 0xde:
+            return self._map(self._unpack(_UINT16))
+        if marker == 0xdf:
+            return self._map(self._unpack(_UINT32))
+
+        raise MessagePackError('Unsupported MessagePack type 0x%02x!' % marker)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def unpack(data):
+    # type: (bytes) -> object
+    """
+    Decode a single MessagePack value, in pure Python. Extension types are not supported.
+    """
+    unpacker = _Unpacker(memoryview(data))
+
+    try:
+        result = unpacker.read()
+    except RecursionError:
+        raise MessagePackError('MessagePack data is nested too deeply!')
+    if unpacker.offset != len(data):
+        raise MessagePackError('Extra data after the MessagePack value!')
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def packb(value):
+    # type: (object) -> bytes
+    """
+    Encode a value as MessagePack, with the msgpack package if it is installed, in pure Python otherwise.
+    """
+    if _msgpack is not None:
+        return _msgpack.packb(value, use_bin_type=True)
+    return pack(value)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def unpackb(data):
+    # type: (bytes) -> object
+    """
+    Decode a MessagePack value, with the msgpack package if it is installed, in pure Python otherwise. Raises a
+    MessagePackError if the data is malformed.
+    """
+    if _msgpack is None:
+        return unpack(data)
+
+    try:
+        return _msgpack.unpackb(data, raw=False, strict_map_key=False)
+    except (ValueError, TypeError, _msgpack.UnpackException) as e:
+        raise MessagePackError(str(e))
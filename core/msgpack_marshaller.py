@@ -0,0 +1,44 @@
+from clacks.core.package import Package
+from clacks.core.marshaller import BasePackageMarshaller
+from clacks.core.marshaller import register_marshaller_type
+
+from .msgpack_codec import packb, unpackb
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class MessagePackMarshaller(BasePackageMarshaller):
+    """
+    Marshals packages as MessagePack, which is smaller than JSON, and faster to encode and decode when the msgpack
+    package is installed. Without it, a pure Python implementation is used.
+
+    Packages are encoded the way they are as JSON, so clients get the same {"response": ...} structure either way.
+
+    Meant to be served next to a JSON marshaller, see HTTPHandler's `marshallers`, so browsers get JSON while internal
+    clients that send `Accept: application/msgpack` get MessagePack.
+    """
+
+    # -- the media types this marshaller is negotiated by, the first is the one responses are sent as.
+    CONTENT_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _encode_package(self, transaction_id, package):
+        # type: (str, Package) -> bytes
+        payload = package.payload
+        if isinstance(payload, dict) and 'header_data' in payload:
+            payload = dict((key, value) for key, value in payload.items() if key != 'header_data')
+        return packb(payload)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _decode_package(self, transaction_id, header_data, payload):
+        # type: (str, dict, bytes) -> dict
+        if not payload:
+            return dict()
+
+        result = unpackb(payload)
+        if not isinstance(result, dict):
+            raise ValueError('MessagePack request body must be a map!')
+
+        return result
+
+
+register_marshaller_type('msgpack', MessagePackMarshaller)
@@ -0,0 +1,349 @@
+import os
+import functools
+
+from .http_parser import parse_header_block
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class MultipartError(ValueError):
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class MultipartLimitError(MultipartError):
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def get_boundary(content_type):
+    # type: (str) -> str
+    """
+    Get the multipart boundary from a Content-Type header value.
+
+    :param content_type: the Content-Type header value, for example 'multipart/form-data; boundary=xyz'
+    :type content_type: str
+
+    :return: the boundary, or an empty string if none was given.
+    :rtype: str
+    """
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.strip().partition('=')
+        if key.lower() == 'boundary':
+            return value.strip('"')
+    return ''
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _parse_disposition(value):
+    # type: (str) -> dict
+    result = dict()
+    for param in value.split(';')[1:]:
+        key, _, value = param.strip().partition('=')
+        result[key.lower()] = value.strip('"')
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def sanitize_filename(filename, default='upload'):
+    # type: (str, str) -> str
+    """
+    Never trust client-provided paths, only the file name itself is used. Names that don't name a file, like "" or
+    "..", are replaced by the default, which is sanitized just the same, as it may be client-provided too.
+    """
+    for name in (filename, default):
+        name = os.path.basename(name.replace('\\', '/'))
+        if name not in ('', '.', '..'):
+            return name
+    return 'upload'
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class FileUpload(object):
+    """
+    Uploaded file, written straight to a file in the given directory.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, directory, filename):
+        # type: (str, str) -> None
+        self.path = os.path.join(directory, sanitize_filename(filename))
+        self.fp = open(self.path, 'w+b')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def write(self, data):
+        # type: (bytes) -> None
+        self.fp.write(data)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def commit(self):
+        # type: () -> str
+        self.fp.close()
+        return self.path
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def discard(self):
+        self.fp.close()
+        os.unlink(self.path)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class MultipartParser(object):
+    """
+    Incremental multipart/form-data parser.
+
+    Body data is fed in chunks of any size as it comes off the socket. File parts are written to `spool_dir` as they
+    arrive and never held in memory as a whole, so memory use is bounded by the size of the fed chunks rather than
+    the size of the upload. Regular form fields are kept in memory, up to `max_field_size` bytes each.
+
+    Rather than a spool directory, an `open_upload` callable can be given, which takes the uploaded file name and
+    returns an object with `write(data)`, `commit()` (returning the final file path) and `discard()` methods.
+
+    Once the closing boundary has been seen, `fields` maps every part name to either its value (for form fields) or
+    the path of the file it was spooled to (for file uploads). Like in HTML forms, a name that was sent more than once
+    maps to a list of all its values, in order. Uploaded files sharing a file name are spooled under numbered names,
+    rather than overwriting each other.
+
+    Raises MultipartError if the body is malformed, or MultipartLimitError if it has more than `max_parts` parts, or
+    if any of the size limits are exceeded.
+    """
+
+    PREAMBLE, HEADERS, BODY, DONE = range(4)
+
+    DEFAULT_MAX_PARTS = 1000
+    DEFAULT_MAX_PART_SIZE = 1024 ** 3
+    DEFAULT_MAX_TOTAL_SIZE = 4 * 1024 ** 3
+    DEFAULT_MAX_FIELD_SIZE = 1024 ** 2
+    MAX_HEADER_SIZE = 16384
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            boundary,
+            spool_dir=None,
+            max_part_size=DEFAULT_MAX_PART_SIZE,
+            max_total_size=DEFAULT_MAX_TOTAL_SIZE,
+            max_field_size=DEFAULT_MAX_FIELD_SIZE,
+            encoding='utf-8',
+            open_upload=None,
+            max_parts=DEFAULT_MAX_PARTS,
+    ):
+        # type: (str, str, int, int, int, str, callable, int) -> None
+        if not boundary:
+            raise MultipartError('No multipart boundary given!')
+
+        if open_upload is None:
+            if spool_dir is None:
+                raise ValueError('Either a spool directory or an open_upload callable is required!')
+            open_upload = functools.partial(FileUpload, spool_dir)
+
+        self.open_upload = open_upload
+        self.max_parts = max_parts
+        self.max_part_size = max_part_size
+        self.max_total_size = max_total_size
+        self.max_field_size = max_field_size
+        self.encoding = encoding
+
+        self.fields = dict()
+        self.filenames = set()
+
+        # -- names of the fields that were sent more than once, and hold a list of values.
+        self._repeated = set()
+
+        # -- the first boundary isn't preceded by a line break, the data is fed with one prepended so that every
+        # -- boundary can be found using the same delimiter.
+        self.delimiter = b'\r\n--' + boundary.encode('latin-1')
+        self.buffer = bytearray(b'\r\n')
+        self.state = self.PREAMBLE
+
+        self.total_size = 0
+        self.part_count = 0
+        self.part_size = 0
+        self.part_name = None
+        self.part_upload = None
+        self.part_value = None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def done(self):
+        # type: () -> bool
+        return self.state == self.DONE
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def feed(self, data):
+        # type: (bytes) -> None
+        """
+        Feed the next piece of the body to the parser.
+
+        :param data: body data, of any size.
+        :type data: bytes
+        """
+        if self.state == self.DONE or not data:
+            return
+
+        self.total_size += len(data)
+        if self.max_total_size and self.total_size > self.max_total_size:
+            self._abort()
+            raise MultipartLimitError('Multipart body exceeds %s bytes!' % self.max_total_size)
+
+        self.buffer += data
+
+        try:
+            self._process()
+        except Exception:
+            self._abort()
+            raise
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        # type: () -> dict
+        """
+        Signal the end of the body.
+
+        :return: the parsed fields.
+        :rtype: dict
+        """
+        if self.state != self.DONE:
+            self._abort()
+            raise MultipartError('Multipart body ended before its closing boundary!')
+        return self.fields
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _process(self):
+        delimiter = self.delimiter
+
+        while True:
+            if self.state == self.PREAMBLE or self.state == self.BODY:
+                index = self.buffer.find(delimiter)
+
+                # -- everything up to the last few bytes is part body, those few bytes may be the start of a delimiter.
+                if index == -1:
+                    keep = len(delimiter) - 1
+                    if len(self.buffer) > keep:
+                        self._write_part(self.buffer[:-keep])
+                        del self.buffer[:-keep]
+                    return
+
+                # -- we need the two bytes following the delimiter to know if this is the last one.
+                if len(self.buffer) < index + len(delimiter) + 2:
+                    self._write_part(self.buffer[:index])
+                    del self.buffer[:index]
+                    return
+
+                self._write_part(self.buffer[:index])
+                self._end_part()
+
+                suffix = bytes(self.buffer[index + len(delimiter):index + len(delimiter) + 2])
+                del self.buffer[:index + len(delimiter) + 2]
+
+                if suffix == b'--':
+                    self.state = self.DONE
+                    self.buffer = bytearray()
+                    return
+
+                if suffix != b'\r\n':
+                    raise MultipartError('Malformed multipart boundary!')
+
+                self.state = self.HEADERS
+
+            elif self.state == self.HEADERS:
+                index = self.buffer.find(b'\r\n\r\n')
+                if index == -1:
+                    if len(self.buffer) > self.MAX_HEADER_SIZE:
+                        raise MultipartLimitError('Multipart part header exceeds %s bytes!' % self.MAX_HEADER_SIZE)
+                    return
+
+                # -- part headers have no start line, give the parser an empty one.
+                _, headers = parse_header_block(b'\r\n' + bytes(self.buffer[:index]), self.encoding)
+                del self.buffer[:index + 4]
+
+                self._start_part(headers)
+                self.state = self.BODY
+
+            else:
+                return
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _start_part(self, headers):
+        disposition = _parse_disposition(headers.get('Content-Disposition', ''))
+
+        name = disposition.get('name')
+        if name is None:
+            raise MultipartError('Multipart part without a name!')
+
+        self.part_count += 1
+        if self.max_parts and self.part_count > self.max_parts:
+            raise MultipartLimitError('Multipart body has more than %s parts!' % self.max_parts)
+
+        self.part_name = name
+        self.part_size = 0
+
+        if 'filename' in disposition:
+            self.part_upload = self.open_upload(self._unique_filename(sanitize_filename(disposition['filename'], name)))
+        else:
+            self.part_value = bytearray()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _write_part(self, data):
+        if self.state != self.BODY or not data:
+            return
+
+        self.part_size += len(data)
+        if self.max_part_size and self.part_size > self.max_part_size:
+            raise MultipartLimitError('Multipart part "%s" exceeds %s bytes!' % (self.part_name, self.max_part_size))
+
+        if self.part_upload is not None:
+            self.part_upload.write(data)
+            return
+
+        if self.max_field_size and self.part_size > self.max_field_size:
+            raise MultipartLimitError('Form field "%s" exceeds %s bytes!' % (self.part_name, self.max_field_size))
+
+        self.part_value += data
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _end_part(self):
+        if self.state != self.BODY:
+            return
+
+        if self.part_upload is not None:
+            value = self.part_upload.commit()
+            self.part_upload = None
+        else:
+            try:
+                value = self.part_value.decode(self.encoding)
+            except UnicodeDecodeError as e:
+                raise MultipartError('Invalid %s in form field "%s": %s' % (self.encoding, self.part_name, e))
+            self.part_value = None
+
+        name = self.part_name
+        if name not in self.fields:
+            self.fields[name] = value
+        elif name in self._repeated:
+            self.fields[name].append(value)
+        else:
+            self.fields[name] = [self.fields[name], value]
+            self._repeated.add(name)
+
+        self.part_name = None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _unique_filename(self, filename):
+        # type: (str) -> str
+        # -- "albedo.png", "albedo-2.png", "albedo-3.png", ...
+        result = filename
+        stem, ext = os.path.splitext(filename)
+        index = 1
+        while result in self.filenames:
+            index += 1
+            result = '%s-%d%s' % (stem, index, ext)
+
+        self.filenames.add(result)
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _abort(self):
+        # -- don't leave half-written uploads lying around.
+        if self.part_upload is not None:
+            self.part_upload.discard()
+            self.part_upload = None
+        self.state = self.DONE
@@ -0,0 +1,412 @@
+import os
+import sys
+import json
+import time
+import errno
+import signal
+import socket
+import logging
+import tempfile
+import threading
+import collections
+import concurrent.futures
+
+
+logger = logging.getLogger(__name__)
+
+
+# -- the worker running in this process, if any.
+_current_worker = None
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def current_worker():
+    # type: () -> PreforkWorker
+    """
+    Get the pre-fork worker this process is running as, or None if this process isn't a pre-fork worker.
+    """
+    return _current_worker
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def aggregate_stats(stats_dir):
+    # type: (str) -> dict
+    """
+    Sum up the stats the workers of a pre-fork server have written to their stats directory.
+
+    :param stats_dir: the stats directory of the pre-fork server.
+    :type stats_dir: str
+
+    :return: the summed connection stats of all workers, plus the number of workers and their stats separately.
+    :rtype: dict
+    """
+    total = collections.Counter()
+    workers = dict()
+
+    for name in sorted(os.listdir(stats_dir)):
+        if not name.endswith('.json'):
+            continue
+
+        try:
+            with open(os.path.join(stats_dir, name)) as fp:
+                stats = json.load(fp)
+        except (OSError, ValueError):
+            continue
+
+        workers[name[:-5]] = stats
+        for key, value in stats.get('connection_stats', dict()).items():
+            if isinstance(value, (int, float)):
+                total[key] += value
+
+    result = dict(total)
+
+    # -- averages can't be summed, recompute them from the totals.
+    opened = result.get('connections_opened', 0)
+    result['requests_per_connection'] = float(result.get('requests', 0)) / opened if opened else 0.0
+    result['workers'] = workers
+
+    return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def create_listener(host, port, backlog=128, reuse_port=False):
+    # type: (str, int, int, bool) -> socket.socket
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+    if reuse_port:
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+    listener.bind((host, port))
+    listener.listen(backlog)
+    return listener
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class PreforkWorker(object):
+    """
+    A single worker process of a PreforkServer: accepts connections from the shared listening socket and hands them to
+    its handler, on a bounded pool of connection threads.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, index, listener, handler, stats_dir, max_connections=64, drain_timeout=10.0, stats_interval=1.0):
+        # type: (int, socket.socket, object, str, int, float, float) -> None
+        self.index = index
+        self.listener = listener
+        self.handler = handler
+        self.stats_dir = stats_dir
+        self.stats_path = os.path.join(stats_dir, '%s.json' % index)
+        self.drain_timeout = drain_timeout
+        self.stats_interval = stats_interval
+
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_connections, thread_name_prefix='ClacksPreforkConnection')
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def stop(self, *_):
+        self._stopping.set()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _handle(self, connection, address):
+        try:
+            self.handler.handle_connection(connection, address)
+        except Exception:
+            logger.exception('Worker %s failed to handle connection from %s!' % (self.index, address))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def write_stats(self):
+        connection_stats = getattr(self.handler, 'connection_stats', None)
+        stats = dict(
+            pid=os.getpid(),
+            index=self.index,
+            in_flight=self.in_flight,
+            connection_stats=connection_stats.as_dict() if connection_stats is not None else dict(),
+        )
+
+        # -- written to a temp file first, so readers never see a half-written file.
+        temp_path = '%s.%s.tmp' % (self.stats_path, os.getpid())
+        with open(temp_path, 'w') as fp:
+            json.dump(stats, fp)
+        os.replace(temp_path, self.stats_path)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _write_stats_forever(self):
+        while not self._stopping.wait(self.stats_interval):
+            try:
+                self.write_stats()
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        threading.Thread(target=self._write_stats_forever, name='ClacksPreforkStats', daemon=True).start()
+
+        # -- wake up regularly to check whether we were asked to stop.
+        self.listener.settimeout(0.2)
+
+        while not self._stopping.is_set():
+            try:
+                connection, address = self.listener.accept()
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if e.errno in (errno.EINTR, errno.EAGAIN):
+                    continue
+                raise
+
+            connection.settimeout(None)
+
+            with self._lock:
+                self.in_flight += 1
+            self.pool.submit(self._handle, connection, address)
+
+        self.drain()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def drain(self):
+        """
+        Stop accepting connections and give the connections being served up to `drain_timeout` seconds to finish.
+        Handlers that support it are told to stop keeping connections alive.
+        """
+        self.listener.close()
+
+        if hasattr(self.handler, 'draining'):
+            self.handler.draining = True
+
+        deadline = time.time() + self.drain_timeout
+        while self.in_flight and time.time() < deadline:
+            time.sleep(0.05)
+
+        if self.in_flight:
+            logger.warning('Worker %s exiting with %s connections still open!' % (self.index, self.in_flight))
+
+        try:
+            self.write_stats()
+        except OSError:
+            pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class PreforkServer(object):
+    """
+    Pre-fork multi-process server. Starts `workers` worker processes, each running its own server and handler built by
+    `factory`, all accepting connections on the same port, so request handling scales with the number of cores rather
+    than being limited to one by the GIL.
+
+    The port is shared either through a listening socket created before forking and inherited by every worker, or,
+    with `reuse_port`, through a listening socket per worker bound with SO_REUSEPORT, which has the kernel balance
+    connections across workers.
+
+    The supervisor (the process calling `serve_forever`) restarts workers that exit unexpectedly. On SIGTERM or SIGINT,
+    or when `stop` is called, every worker stops accepting connections and gets `drain_timeout` seconds to finish
+    serving the ones it has, after which it is killed.
+
+    Every worker regularly writes its connection stats to `stats_dir`, `stats()` sums them up. Only available on
+    platforms with os.fork.
+    """
+
+    DEFAULT_WORKERS = os.cpu_count() or 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            factory,
+            host,
+            port,
+            workers=DEFAULT_WORKERS,
+            reuse_port=False,
+            backlog=128,
+            max_connections=64,
+            drain_timeout=10.0,
+            restart_delay=1.0,
+            stats_dir=None,
+    ):
+        # type: (callable, str, int, int, bool, int, int, float, float, str) -> None
+        """
+        :param factory: called in every worker process, returns either a clacks server with an HTTP handler registered
+            to it, or the handler to use directly. Anything with a `handle_connection(connection, address)` method can
+            be used as a handler. The server is never started, so its handler should not be registered to the port
+            being served, or binding it will fail.
+        :type factory: callable
+        """
+        if not hasattr(os, 'fork'):
+            raise NotImplementedError('Pre-fork mode requires os.fork, which is not available on this platform!')
+
+        self.factory = factory
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.reuse_port = reuse_port
+        self.backlog = backlog
+        self.max_connections = max_connections
+        self.drain_timeout = drain_timeout
+        self.restart_delay = restart_delay
+        self.stats_dir = stats_dir or tempfile.mkdtemp(prefix='ClacksPrefork')
+
+        self.listener = None
+        self.pids = dict()
+        self.restarts = 0
+
+        self._stopping = threading.Event()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def address(self):
+        # type: () -> tuple
+        return self.listener.getsockname() if self.listener is not None else (self.host, self.port)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def stats(self):
+        # type: () -> dict
+        result = aggregate_stats(self.stats_dir)
+        result['restarts'] = self.restarts
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _get_handler(self):
+        result = self.factory()
+        if hasattr(result, 'handle_connection'):
+            return result
+
+        from .http_handler import HTTPHandler
+
+        handlers = HTTPHandler.instances(result)
+        if not handlers:
+            raise ValueError('The pre-fork server factory returned a server without an HTTP handler!')
+        return handlers[0]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _spawn(self, index):
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = index
+            return pid
+
+        # -- in the worker process, from here on we never return.
+        global _current_worker
+
+        code = 0
+        try:
+            listener = self.listener
+            if self.reuse_port:
+                listener = create_listener(self.host, self.port, self.backlog, reuse_port=True)
+
+            worker = PreforkWorker(
+                index,
+                listener,
+                self._get_handler(),
+                self.stats_dir,
+                max_connections=self.max_connections,
+                drain_timeout=self.drain_timeout,
+            )
+            _current_worker = worker
+            worker.run()
+
+        except Exception:
+            logger.exception('Pre-fork worker %s crashed!' % index)
+            code = 1
+
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def start(self):
+        """
+        Bind the port and start the workers.
+        """
+        # -- with SO_REUSEPORT every worker binds its own socket, but we still bind one here to pick a free port if
+        # -- port 0 was asked for, and to fail early if the port is taken.
+        self.listener = create_listener(self.host, self.port, self.backlog, reuse_port=self.reuse_port)
+        self.port = self.listener.getsockname()[1]
+
+        for index in range(self.workers):
+            self._spawn(index)
+
+        # -- the supervisor never accepts connections itself.
+        if self.reuse_port:
+            self.listener.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def stop(self, *_):
+        """
+        Stop serving: drain and stop all workers. Safe to call from any thread or from a signal handler.
+        """
+        self._stopping.set()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _reap(self):
+        # type: () -> list
+        exited = list()
+        while self.pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if not pid:
+                break
+            if pid in self.pids:
+                exited.append((self.pids.pop(pid), status))
+        return exited
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def serve_forever(self, poll_interval=0.2):
+        """
+        Start the workers if needed, and supervise them until the server is stopped.
+        """
+        if self.listener is None:
+            self.start()
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        try:
+            while not self._stopping.wait(poll_interval):
+                for index, status in self._reap():
+                    logger.warning('Pre-fork worker %s exited with status %s, restarting it.' % (index, status))
+                    self.restarts += 1
+
+                    # -- don't spin if a worker keeps crashing on start up.
+                    if self._stopping.wait(self.restart_delay):
+                        break
+                    self._spawn(index)
+
+        finally:
+            self.shutdown()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def shutdown(self):
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        # -- the workers drain themselves, give them a little longer than that before killing them.
+        deadline = time.time() + self.drain_timeout + 1.0
+        while self.pids and time.time() < deadline:
+            self._reap()
+            time.sleep(0.05)
+
+        for pid in list(self.pids):
+            logger.warning('Pre-fork worker %s did not drain in time, killing it.' % self.pids[pid])
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            del self.pids[pid]
+
+        if self.listener is not None:
+            self.listener.close()
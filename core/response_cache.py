@@ -0,0 +1,223 @@
+import time
+import weakref
+import threading
+import collections
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class MarshalledBody(bytes):
+    """
+    Already-marshalled response body, returned instead of a resource's result on a cache hit. The handler sends it
+    as-is rather than passing it through the marshaller again.
+    """
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ResponseCache(object):
+    """
+    Bounded, thread-safe LRU of marshalled response bodies for a single resource.
+
+    Entries are keyed on the request path plus the values of the keyword arguments and request headers named in
+    `kwargs` and `headers`, so only those determine whether two requests get the same response. Entries expire
+    `ttl` seconds after they were stored; a ttl of 0 means they only ever leave the cache through eviction or
+    invalidation.
+
+    Caches given a name can be looked up with `get_response_cache`, so resources that change the cached data can
+    invalidate it:
+
+        @get('/assets/{id:int}', cache=dict(name='assets', ttl=60, kwargs=['fields']))
+        def get_asset(self, id, fields=None):
+            ...
+
+        @put('/assets/{id:int}')
+        def update_asset(self, id, **kwargs):
+            ...
+            get_response_cache('assets').invalidate('/assets/%s' % id)
+    """
+
+    DEFAULT_TTL = 60
+    DEFAULT_MAX_ENTRIES = 1024
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, kwargs=(), headers=(), name=None):
+        # type: (float, int, tuple, tuple, str) -> None
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.kwargs = tuple(kwargs)
+        self.headers = tuple(headers)
+        self.name = name
+
+        # -- key -> (expiry time, body), in least recently used order.
+        self._entries = collections.OrderedDict()
+
+        # -- path -> keys, so invalidating a path doesn't have to go through every entry.
+        self._paths = collections.defaultdict(set)
+
+        self._lock = threading.Lock()
+        self.stats = collections.Counter()
+
+        _caches.add(self)
+        if name is not None:
+            _named_caches[name] = self
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __len__(self):
+        return len(self._entries)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def make_key(self, path, kwargs, header_data):
+        # type: (str, dict, dict) -> tuple
+        """
+        Build the cache key of a request.
+
+        :param path: the request path.
+        :type path: str
+
+        :param kwargs: the keyword arguments the resource is called with.
+        :type kwargs: dict
+
+        :param header_data: the request headers.
+        :type header_data: dict
+
+        :return: the cache key.
+        :rtype: tuple
+        """
+        return (
+            path,
+            tuple(str(kwargs.get(key)) for key in self.kwargs),
+            tuple(header_data.get(key) for key in self.headers),
+            # -- set by the handler when the response is negotiated to another marshaller than its main one.
+            header_data.get('_marshaller'),
+        )
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def get(self, key, now=None):
+        # type: (tuple, float) -> MarshalledBody
+        """
+        Get a cached body, or None if the key isn't cached or its entry has expired.
+        """
+        now = time.time() if now is None else now
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[0] and entry[0] <= now:
+                self._remove(key)
+                self.stats['expired'] += 1
+                entry = None
+
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def put(self, key, body, now=None):
+        # type: (tuple, bytes, float) -> None
+        """
+        Store a marshalled body.
+        """
+        now = time.time() if now is None else now
+        expires = now + self.ttl if self.ttl else 0
+
+        with self._lock:
+            self._entries[key] = (expires, MarshalledBody(body))
+            self._entries.move_to_end(key)
+            self._paths[key[0]].add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _remove(self, key):
+        del self._entries[key]
+
+        keys = self._paths[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._paths[key[0]]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def invalidate(self, path=None):
+        # type: (str) -> int
+        """
+        Drop cached responses.
+
+        :param path: only drop the responses for this request path. Drops everything if not given.
+        :type path: str
+
+        :return: the number of entries dropped.
+        :rtype: int
+        """
+        with self._lock:
+            if path is None:
+                count = len(self._entries)
+                self._entries.clear()
+                self._paths.clear()
+
+            else:
+                keys = self._paths.pop(path, ())
+                count = len(keys)
+                for key in keys:
+                    del self._entries[key]
+
+            self.stats['invalidated'] += count
+
+        return count
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def as_dict(self):
+        # type: () -> dict
+        result = dict(self.stats)
+        result['entries'] = len(self._entries)
+        return result
+
+
+# -- every live cache, for reporting, and the named ones, for invalidation.
+_caches = weakref.WeakSet()
+_named_caches = weakref.WeakValueDictionary()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def get_response_cache(name):
+    # type: (str) -> ResponseCache
+    """
+    Get a named response cache, as declared by the `cache` option of a resource decorator.
+
+    :param name: the name of the cache.
+    :type name: str
+
+    :return: the cache. Raises KeyError if no cache by this name exists.
+    :rtype: ResponseCache
+    """
+    return _named_caches[name]
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def response_caches():
+    # type: () -> list
+    return list(_caches)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def make_response_cache(cache):
+    # type: (object) -> ResponseCache
+    """
+    Turn the value of a decorator's `cache` option into a ResponseCache: a ResponseCache is used as-is, a dict is
+    passed to the ResponseCache constructor, and a number is used as the TTL.
+    """
+    if cache is None or isinstance(cache, ResponseCache):
+        return cache
+
+    if isinstance(cache, dict):
+        return ResponseCache(**cache)
+
+    if cache is True:
+        return ResponseCache()
+
+    return ResponseCache(ttl=cache)
@@ -0,0 +1,222 @@
+import re
+import uuid
+
+
+_NO_MATCH = object()
+
+# -- plain decimal numbers only, float() would also take "nan", "inf", "1_0" and exponents large enough to be inf.
+_FLOAT = re.compile(r'-?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _convert_str(segment):
+    return segment if segment else _NO_MATCH
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _convert_int(segment):
+    if segment.isdigit():
+        return int(segment)
+    if segment[:1] == '-' and segment[1:].isdigit():
+        return int(segment)
+    return _NO_MATCH
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _convert_float(segment):
+    if _FLOAT.fullmatch(segment):
+        return float(segment)
+    return _NO_MATCH
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _convert_uuid(segment):
+    try:
+        return uuid.UUID(segment)
+    except ValueError:
+        return _NO_MATCH
+
+
+# -- the "path" converter is special, it consumes all remaining segments, so it is not listed here.
+CONVERTERS = {
+    'str': _convert_str,
+    'int': _convert_int,
+    'float': _convert_float,
+    'uuid': _convert_uuid,
+}
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def register_converter(key, fn):
+    # type: (str, callable) -> None
+    """
+    Register a path parameter converter, making it usable in resource paths as "{name:key}".
+
+    :param key: the converter name to use in resource paths.
+    :type key: str
+
+    :param fn: callable taking the raw path segment, returning the converted value. Raise ValueError to reject it.
+    :type fn: callable
+    """
+    def converter(segment):
+        try:
+            return fn(segment)
+        except ValueError:
+            return _NO_MATCH
+
+    CONVERTERS[key] = converter
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def is_template(path):
+    # type: (str) -> bool
+    """
+    :return: True if the given resource path contains path parameters, like "/users/{id:int}".
+    :rtype: bool
+    """
+    return '{' in path
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _RouteNode(object):
+
+    __slots__ = ('static', 'params', 'catch_all', 'value')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self):
+        self.static = dict()
+        self.params = list()
+        self.catch_all = None
+        self.value = None
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ResourceRouter(object):
+    """
+    Segment-level radix tree mapping resource paths to values.
+
+    Paths are split on "/", and every segment is either static ("users") or a typed parameter ("{id:int}"). Static
+    segments are resolved through a dict lookup on each node, so matching a path costs one lookup per path segment, no
+    matter how many routes are registered. Parameter segments are only tried when no static segment matches, and are
+    tried in registration order. A "{name:path}" parameter may be used as the last segment to capture the remainder of
+    the path, slashes included.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self):
+        self.root = _RouteNode()
+
+        # -- the registered paths, in registration order.
+        self.paths = list()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def _parse_segment(cls, segment):
+        # type: (str) -> tuple
+        if not (segment.startswith('{') and segment.endswith('}')):
+            return None, None
+
+        name, _, converter = segment[1:-1].partition(':')
+        converter = converter or 'str'
+
+        if not name.isidentifier():
+            raise ValueError('Path parameter name "%s" is not a valid identifier!' % name)
+
+        if converter != 'path' and converter not in CONVERTERS:
+            raise ValueError('Path parameter converter "%s" is not recognized!' % converter)
+
+        return name, converter
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def add(self, path, value):
+        # type: (str, object) -> None
+        """
+        Register a value at the given path.
+
+        :param path: the path to register, for example "/users/{id:int}/posts"
+        :type path: str
+
+        :param value: the value to return when this path is matched.
+        :type value: object
+        """
+        node = self.root
+        segments = path.split('/')[1:]
+
+        for index, segment in enumerate(segments):
+            name, converter = self._parse_segment(segment)
+
+            if name is None:
+                node = node.static.setdefault(segment, _RouteNode())
+                continue
+
+            if converter == 'path':
+                if index != len(segments) - 1:
+                    raise ValueError('A "path" parameter can only be used as the last segment of %s' % path)
+                if node.catch_all is None:
+                    node.catch_all = (name, _RouteNode())
+                node = node.catch_all[1]
+                continue
+
+            for param_name, param_converter, child in node.params:
+                if param_name == name and param_converter is CONVERTERS[converter]:
+                    node = child
+                    break
+            else:
+                child = _RouteNode()
+                node.params.append((name, CONVERTERS[converter], child))
+                node = child
+
+        node.value = value
+
+        if path not in self.paths:
+            self.paths.append(path)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def match(self, path):
+        # type: (str) -> tuple
+        """
+        Find the value registered for the given path.
+
+        :param path: the requested path, for example "/users/42/posts"
+        :type path: str
+
+        :return: the registered value and a dict of converted path parameters, or (None, None) if nothing matched.
+        :rtype: tuple(object, dict)
+        """
+        params = dict()
+        value = self._match(self.root, path.split('/')[1:], 0, params)
+        if value is None:
+            return None, None
+        return value, params
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _match(self, node, segments, index, params):
+        if index == len(segments):
+            return node.value
+
+        segment = segments[index]
+
+        child = node.static.get(segment)
+        if child is not None:
+            value = self._match(child, segments, index + 1, params)
+            if value is not None:
+                return value
+
+        for name, converter, child in node.params:
+            converted = converter(segment)
+            if converted is _NO_MATCH:
+                continue
+
+            params[name] = converted
+            value = self._match(child, segments, index + 1, params)
+            if value is not None:
+                return value
+            del params[name]
+
+        if node.catch_all is not None:
+            name, child = node.catch_all
+            if child.value is not None:
+                params[name] = '/'.join(segments[index:])
+                return child.value
+
+        return None
@@ -0,0 +1,408 @@
+import re
+import json
+import asyncio
+import threading
+import functools
+import itertools
+import collections
+
+
+# -- comment frame sent when a stream has been idle, keeps proxies and clients from timing the connection out.
+HEARTBEAT = b': heartbeat\n\n'
+
+# -- the line endings event streams allow, a lone CR ends a line too. Unlike str.splitlines, nothing else does.
+_LINE_BREAK = re.compile('\r\n|\r|\n')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def encode_event(data, event=None, id=None, retry=None):
+    # type: (object, str, object, int) -> bytes
+    """
+    Encode a single Server-Sent Event. Strings are sent as they are, anything else as JSON. Multi-line data is split
+    over several "data" fields, which the client joins back together. The event type and id can't be split like that,
+    so a line break in either raises a ValueError, rather than letting it inject fields or events of its own.
+
+    :param data: the event data.
+    :type data: object
+
+    :param event: the event type, "message" on the client if not given.
+    :type event: str
+
+    :param id: the event id, which the client sends back as Last-Event-ID when it reconnects.
+    :type id: object
+
+    :param retry: how long the client should wait before reconnecting, in milliseconds.
+    :type retry: int
+
+    :return: the encoded event, including the blank line that ends it.
+    :rtype: bytes
+    """
+    if not isinstance(data, str):
+        data = json.dumps(data)
+
+    lines = list()
+    for name, value in (('event', event), ('id', id)):
+        if value is None:
+            continue
+        value = str(value)
+        if '\n' in value or '\r' in value:
+            raise ValueError('Event %s must not contain line breaks: %r' % (name, value))
+        lines.append('%s: %s' % (name, value))
+    if retry is not None:
+        lines.append('retry: %d' % retry)
+
+    # -- most data has no CRs at all, and splitting it on LFs alone is a lot cheaper than using the regex.
+    data_lines = _LINE_BREAK.split(data) if '\r' in data else data.split('\n')
+    lines.extend('data: %s' % line for line in data_lines)
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class Event(object):
+    """
+    A published event. It is encoded once, when it is published, and the same bytes are sent to every subscriber.
+    """
+
+    __slots__ = ('id', 'event', 'data', 'encoded')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, data, event=None, id=None):
+        # type: (object, str, object) -> None
+        self.id = id
+        self.event = event
+        self.data = data
+        self.encoded = encode_event(data, event, id)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class EventStream(object):
+    """
+    Base of all streams the HTTP handlers send as a `text/event-stream` response. Every item is flushed to the client
+    as soon as it is produced, rather than being coalesced with the next ones.
+
+    The handlers call `resume` with the Last-Event-ID header of the request, if any, before iterating the stream.
+    """
+
+    headers = {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        # -- stop reverse proxies like nginx from buffering the stream.
+        'X-Accel-Buffering': 'no',
+    }
+
+    flush_items = True
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __iter__(self):
+        return self
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __next__(self):
+        raise StopIteration
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def resume(self, last_event_id):
+        # type: (str) -> None
+        pass
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class GeneratorEventStream(EventStream):
+    """
+    Sends the items of a generator as events. Items can be Events, bytes (sent as they are), or data for a plain event.
+    Yielding None sends a heartbeat, which is how a generator that waits for something can keep the connection alive.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, items):
+        # type: (iter) -> None
+        self.items = iter(items)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __next__(self):
+        item = next(self.items)
+
+        if item is None:
+            return HEARTBEAT
+        if isinstance(item, Event):
+            return item.encoded
+        if isinstance(item, bytes):
+            return item
+        return encode_event(item)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        close = getattr(self.items, 'close', None)
+        if close is not None:
+            close()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def event_stream(fn):
+    # type: (callable) -> callable
+    """
+    Decorator turning a resource that returns a generator into one that responds with a stream of Server-Sent Events,
+    see GeneratorEventStream. Place it below the resource decorator:
+
+        @get('/progress')
+        @event_stream
+        def progress(self):
+            for step in range(10):
+                yield {'step': step}
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return GeneratorEventStream(fn(*args, **kwargs))
+    return wrapper
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class EventSource(object):
+    """
+    Fans out published events to any number of subscribed clients.
+
+    Events are encoded once, when they are published, and kept in a ring of the last `replay_size` events that all
+    subscribers read from, so neither the encoding nor the memory used for an event grows with the number of clients.
+    Every event gets an increasing id; a client reconnecting with a Last-Event-ID is sent the events it missed, as far
+    as they are still in the ring. A subscriber that falls behind by more than the ring skips the events it missed.
+
+    Subscriptions can be returned from a resource as they are, and work with both the threaded and the asyncio handler;
+    the asyncio handler serves them without tying up a worker thread per client.
+    """
+
+    DEFAULT_REPLAY_SIZE = 256
+    DEFAULT_HEARTBEAT = 15.0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, replay_size=DEFAULT_REPLAY_SIZE, heartbeat=DEFAULT_HEARTBEAT, retry=None):
+        # type: (int, float, int) -> None
+        """
+        :param replay_size: the number of most recent events kept for subscribers to catch up on.
+        :type replay_size: int
+
+        :param heartbeat: send a heartbeat after this many seconds without events.
+        :type heartbeat: float
+
+        :param retry: reconnection delay to tell clients, in milliseconds, None to leave it to the client.
+        :type retry: int
+        """
+        self.heartbeat = heartbeat
+        self.retry = retry
+
+        self.events = collections.deque(maxlen=replay_size)
+        self.last_id = 0
+        self.closed = False
+
+        self.subscriptions = set()
+        self._async_waiters = dict()
+        self._condition = threading.Condition()
+
+        self.stats = collections.Counter()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def publish(self, data, event=None):
+        # type: (object, str) -> Event
+        """
+        Publish an event to every subscriber.
+
+        :param data: the event data, a string or anything that can be encoded as JSON.
+        :type data: object
+
+        :param event: the event type.
+        :type event: str
+
+        :return: the published event.
+        :rtype: Event
+        """
+        with self._condition:
+            if self.closed:
+                raise RuntimeError('Event source is closed!')
+
+            self.last_id += 1
+            result = Event(data, event, self.last_id)
+            self.events.append(result)
+            self.stats['published'] += 1
+
+            self._notify()
+
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _notify(self):
+        # -- must be called with the condition held.
+        self._condition.notify_all()
+        for loop, waiter in list(self._async_waiters.values()):
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:
+                # -- the loop of this subscriber is closed, it won't be waiting anymore.
+                pass
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def subscribe(self, heartbeat=None):
+        # type: (float) -> Subscription
+        """
+        Subscribe to the events published from now on, see Subscription.
+
+        :param heartbeat: seconds without events after which to send a heartbeat, defaults to that of the source.
+        :type heartbeat: float
+
+        :return: the subscription.
+        :rtype: Subscription
+        """
+        return Subscription(self, self.heartbeat if heartbeat is None else heartbeat)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _pending(self, subscription):
+        # type: (Subscription) -> bytes
+        # -- must be called with the condition held.
+        if subscription.position >= self.last_id:
+            return b''
+
+        oldest = self.last_id - len(self.events) + 1
+        if subscription.position < oldest - 1:
+            self.stats['skipped'] += oldest - 1 - subscription.position
+            subscription.position = oldest - 1
+
+        start = subscription.position - oldest + 1
+        subscription.position = self.last_id
+
+        # -- a subscriber that is behind gets everything it missed in a single write.
+        return b''.join(event.encoded for event in itertools.islice(self.events, start, None))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        """
+        Close the source, ending the streams of all subscribers once they have been sent the events published so far.
+        """
+        with self._condition:
+            self.closed = True
+            self._notify()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def as_dict(self):
+        # type: () -> dict
+        with self._condition:
+            result = dict(self.stats)
+            result['subscribers'] = len(self.subscriptions)
+            result['last_id'] = self.last_id
+            result['buffered'] = len(self.events)
+        return result
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class Subscription(EventStream):
+    """
+    The stream of events of an EventSource sent to a single client. Iterating it blocks until there is an event or a
+    heartbeat to send; iterating it asynchronously waits on the event loop instead.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, source, heartbeat):
+        # type: (EventSource, float) -> None
+        self.source = source
+        self.heartbeat = heartbeat
+        self.closed = False
+
+        self._started = False
+
+        with source._condition:
+            self.position = source.last_id
+            source.subscriptions.add(self)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def resume(self, last_event_id):
+        # type: (str) -> None
+        """
+        Start after the event with the given id rather than with the next event published, replaying whatever the
+        source still has of the events published since.
+        """
+        try:
+            last_event_id = int(last_event_id)
+        except (TypeError, ValueError):
+            return
+
+        with self.source._condition:
+            # -- an id from the future is from before a restart of the server, those events are gone.
+            if 0 <= last_event_id <= self.source.last_id:
+                self.position = last_event_id
+                self.source.stats['resumed'] += 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _start(self):
+        # type: () -> bytes
+        self._started = True
+        if self.source.retry is None:
+            return b''
+        return b'retry: %d\n\n' % self.source.retry
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __next__(self):
+        # type: () -> bytes
+        prefix = b'' if self._started else self._start()
+        source = self.source
+
+        with source._condition:
+            while True:
+                pending = source._pending(self)
+                if pending:
+                    return prefix + pending
+
+                if self.closed or source.closed:
+                    raise StopIteration
+
+                if not source._condition.wait(self.heartbeat):
+                    return prefix + HEARTBEAT
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __aiter__(self):
+        return self
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def __anext__(self):
+        # type: () -> bytes
+        prefix = b'' if self._started else self._start()
+        source = self.source
+
+        waiter = asyncio.Event()
+        source_waiters = source._async_waiters
+
+        with source._condition:
+            source_waiters[self] = asyncio.get_running_loop(), waiter
+
+        try:
+            while True:
+                with source._condition:
+                    pending = source._pending(self)
+                    if pending:
+                        return prefix + pending
+
+                    if self.closed or source.closed:
+                        raise StopAsyncIteration
+
+                    # -- anything published from here on sets the waiter again, through the loop.
+                    waiter.clear()
+
+                try:
+                    await asyncio.wait_for(waiter.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    return prefix + HEARTBEAT
+
+        finally:
+            with source._condition:
+                source_waiters.pop(self, None)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        with self.source._condition:
+            self.closed = True
+            self.source.subscriptions.discard(self)
+            self.source._async_waiters.pop(self, None)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    async def aclose(self):
+        self.close()
@@ -0,0 +1,313 @@
+import os
+import stat
+import threading
+import mimetypes
+import collections
+import urllib.parse
+
+from .conditional import make_etag, format_http_date, parse_http_date, is_not_modified
+from .header_writer import HeaderBlock
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class RangeNotSatisfiable(ValueError):
+    """
+    Raised when a Range header asks for bytes beyond the end of the file.
+    """
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def parse_range(value, size):
+    # type: (str, int) -> tuple
+    """
+    Parse the value of a Range header for a file of the given size. Only single byte ranges are supported; as
+    allowed by RFC 7233, anything else is ignored and answered with the full file.
+
+    :param value: the Range header, like "bytes=0-99", "bytes=100-" or "bytes=-100".
+    :type value: str
+
+    :param size: the size of the file in bytes.
+    :type size: int
+
+    :return: the first and last byte of the range, inclusive, or None if the header should be ignored. Raises a
+        RangeNotSatisfiable error if the range lies entirely past the end of the file.
+    :rtype: tuple(int, int)
+    """
+    unit, _, ranges = value.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in ranges:
+        return None
+
+    first, separator, last = ranges.strip().partition('-')
+    if not separator:
+        return None
+
+    try:
+        first = int(first) if first else None
+        last = int(last) if last else None
+    except ValueError:
+        return None
+
+    # -- "bytes=-100" asks for the last 100 bytes.
+    if first is None:
+        if last is None:
+            return None
+        if last <= 0 or not size:
+            raise RangeNotSatisfiable(value)
+        return max(0, size - last), size - 1
+
+    if last is None:
+        last = size - 1
+
+    if first < 0:
+        return None
+
+    if first >= size:
+        raise RangeNotSatisfiable(value)
+
+    if last < first:
+        return None
+
+    return first, min(last, size - 1)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class StaticFile(object):
+    """
+    A file served by StaticFiles, as returned by its resource. The handler sends it straight from `data` if the file
+    is small enough to be cached, or from disk with sendfile otherwise, without going through the marshaller.
+    """
+
+    __slots__ = ('path', 'size', 'mtime', 'mtime_ns', 'etag', 'headers', 'header_block', 'data')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, path, st, headers, data=None):
+        # type: (str, os.stat_result, dict, bytes) -> None
+        self.path = path
+        self.size = st.st_size
+        self.mtime = st.st_mtime
+        self.mtime_ns = st.st_mtime_ns
+        self.etag = make_etag('%x-%x' % (st.st_mtime_ns, st.st_size))
+        self.headers = headers
+        self.data = data
+
+        self.headers['ETag'] = self.etag
+        self.headers['Last-Modified'] = format_http_date(self.mtime)
+        self.header_block = HeaderBlock(self.headers)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def is_current(self, st):
+        # type: (os.stat_result) -> bool
+        return st.st_mtime_ns == self.mtime_ns and st.st_size == self.size
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _if_range_matches(self, if_range):
+        # type: (str) -> bool
+        if if_range is None:
+            return True
+
+        # -- If-Range requires a strong comparison, weak tags never match.
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return if_range.strip() == self.etag
+
+        since = parse_http_date(if_range)
+        return since is not None and int(self.mtime) <= since
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def evaluate(self, header_data):
+        # type: (dict) -> tuple
+        """
+        Work out how to answer a request for this file, from its conditional and Range headers.
+
+        :param header_data: the request headers.
+        :type header_data: dict
+
+        :return: the status code (200, 206, 304 or 416), and the offset and number of bytes of the file to send.
+        :rtype: tuple(int, int, int)
+        """
+        if is_not_modified(header_data, self.etag, self.mtime):
+            return 304, 0, 0
+
+        value = header_data.get('Range')
+        if not value or not self._if_range_matches(header_data.get('If-Range')):
+            return 200, 0, self.size
+
+        try:
+            byte_range = parse_range(value, self.size)
+        except RangeNotSatisfiable:
+            return 416, 0, 0
+
+        if byte_range is None:
+            return 200, 0, self.size
+
+        first, last = byte_range
+        return 206, first, last - first + 1
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class StaticFiles(object):
+    """
+    Serves the files in a directory.
+
+    Every file that is requested gets an entry in an LRU cache, holding its validators and the headers to respond with,
+    computed once. The contents of files of at most `max_file_size` bytes are cached too, so they are sent without
+    touching the disk; larger files are sent with sendfile. Entries are checked against the file's modification time
+    and size on every request, so changed files are picked up straight away.
+
+    Cached contents are copies rather than memory maps of the files: reading a mapping of a file that was truncated in
+    the meantime, by an editor saving it for example, would kill the process with a SIGBUS.
+
+    At most `max_entries` files are cached, whose contents take up at most `max_bytes`.
+    """
+
+    DEFAULT_MAX_FILE_SIZE = 256 * 1024
+    DEFAULT_MAX_ENTRIES = 1024
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            root,
+            index='index.html',
+            max_age=3600,
+            max_file_size=DEFAULT_MAX_FILE_SIZE,
+            max_entries=DEFAULT_MAX_ENTRIES,
+            max_bytes=DEFAULT_MAX_BYTES,
+    ):
+        # type: (str, str, int, int, int, int) -> None
+        """
+        :param root: the directory to serve the files of.
+        :type root: str
+
+        :param index: the file to serve for requests of a directory, None to not serve directories at all.
+        :type index: str
+
+        :param max_age: how long clients may use the files without checking with the server, in seconds.
+        :type max_age: int
+        """
+        self.root = os.path.realpath(root)
+        self.index = index
+        self.max_age = max_age
+        self.max_file_size = max_file_size
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self.total_bytes = 0
+        self.stats = collections.Counter()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def resolve(self, path):
+        # type: (str) -> str
+        """
+        Get the absolute path of a file to serve, raising FileNotFoundError for files outside of the root directory.
+
+        :param path: the path of the file relative to the root directory, as requested, still percent-encoded.
+        :type path: str
+
+        :return: the absolute path.
+        :rtype: str
+        """
+        # -- decoded before anything is checked, so "%2e%2e" is refused just like "..".
+        path = urllib.parse.unquote(path)
+
+        parts = [part for part in path.replace('\\', '/').split('/') if part and part != '.']
+        if '..' in parts or any('\0' in part for part in parts):
+            raise FileNotFoundError(path)
+
+        result = os.path.realpath(os.path.join(self.root, *parts))
+
+        # -- symbolic links may still lead outside of the root.
+        if result != self.root and not result.startswith(self.root + os.sep):
+            raise FileNotFoundError(path)
+
+        if self.index and os.path.isdir(result):
+            result = os.path.join(result, self.index)
+
+        return result
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _load(self, path):
+        # type: (str) -> StaticFile
+        with open(path, 'rb') as fp:
+            # -- stat the opened file, so the entry describes exactly the contents we map.
+            st = os.fstat(fp.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                raise FileNotFoundError(path)
+
+            data = None
+            if st.st_size <= self.max_file_size:
+                data = fp.read(st.st_size)
+
+                # -- the file changed since we stat'ed it, leave it to sendfile, which copes with that.
+                if len(data) != st.st_size:
+                    data = None
+
+        headers = collections.OrderedDict()
+        headers['Content-Type'] = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        headers['Accept-Ranges'] = 'bytes'
+        headers['Cache-Control'] = 'public, max-age=%d' % self.max_age
+
+        return StaticFile(path, st, headers, data)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def open(self, path):
+        # type: (str) -> StaticFile
+        """
+        Get a file to serve, from the cache if it hasn't changed since it was cached.
+
+        :param path: the path of the file relative to the root directory, as requested.
+        :type path: str
+
+        :return: the file. Raises FileNotFoundError if there is no such file to serve.
+        :rtype: StaticFile
+        """
+        path = self.resolve(path)
+
+        try:
+            st = os.stat(path)
+        except (NotADirectoryError, PermissionError):
+            raise FileNotFoundError(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.is_current(st):
+                self._entries.move_to_end(path)
+                self.stats['hits'] += 1
+                return entry
+
+        entry = self._load(path)
+
+        with self._lock:
+            self.stats['misses'] += 1
+            self._store(path, entry)
+
+        return entry
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _store(self, path, entry):
+        # type: (str, StaticFile) -> None
+        previous = self._entries.pop(path, None)
+        if previous is not None and previous.data is not None:
+            self.total_bytes -= previous.size
+
+        self._entries[path] = entry
+        if entry.data is not None:
+            self.total_bytes += entry.size
+
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            if evicted.data is not None:
+                self.total_bytes -= evicted.size
+            self.stats['evictions'] += 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def as_dict(self):
+        # type: () -> dict
+        with self._lock:
+            result = dict(self.stats)
+            result['entries'] = len(self._entries)
+            result['bytes'] = self.total_bytes
+        return result
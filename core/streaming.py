@@ -0,0 +1,113 @@
+import json
+import types
+import collections.abc
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def is_stream(value):
+    # type: (object) -> bool
+    """
+    Whether a resource result should be streamed to the client rather than marshalled as a single value.
+
+    Generators and other iterators are streamed. Strings, bytes and containers are iterable too, but are complete
+    values, so they are not considered streams.
+
+    :param value: the result of a resource call.
+    :type value: object
+
+    :return: True if the value should be streamed.
+    :rtype: bool
+    """
+    if isinstance(value, types.GeneratorType):
+        return True
+    if isinstance(value, (str, bytes, bytearray, memoryview, dict, list, tuple)):
+        return False
+    return isinstance(value, collections.abc.Iterator)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def is_async_stream(value):
+    # type: (object) -> bool
+    """
+    Whether a resource result is an asynchronous generator or iterator, which is streamed by the AsyncHTTPHandler.
+    """
+    return isinstance(value, collections.abc.AsyncIterator)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def encode_stream_item(item, encoding='utf-8'):
+    # type: (object, str) -> bytes
+    """
+    Encode a single item yielded by a streaming resource. Bytes are sent as-is and strings are encoded; anything else
+    is sent as a line of JSON, so structured streams arrive as newline-delimited JSON.
+
+    :param item: the item to encode.
+    :type item: object
+
+    :param encoding: the encoding to use for strings.
+    :type encoding: str
+
+    :return: the encoded item.
+    :rtype: bytes
+    """
+    if isinstance(item, (bytes, bytearray, memoryview)):
+        return bytes(item)
+    if isinstance(item, str):
+        return item.encode(encoding)
+    return (json.dumps(item) + '\n').encode(encoding)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ChunkedWriter(object):
+    """
+    Writes a body to a socket using chunked transfer encoding.
+
+    Small writes are coalesced into a buffer that is flushed as a single chunk once it reaches `chunk_size` bytes, so
+    a stream of many small items doesn't turn into a flood of tiny chunks. The buffer never grows beyond
+    `chunk_size` plus the size of a single write. Every flush is a blocking `sendall`, so when the client reads slower
+    than the resource produces, the socket's send buffer fills up and the producer simply is not advanced until there
+    is room again.
+
+    With `chunked` set to False the body is written as-is instead, which is how streams are sent to HTTP/1.0 clients;
+    the connection has to be closed afterwards to mark the end of the body.
+    """
+
+    DEFAULT_CHUNK_SIZE = 16384
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, connection, chunk_size=DEFAULT_CHUNK_SIZE, chunked=True):
+        # type: (socket.socket, int, bool) -> None
+        self.connection = connection
+        self.chunk_size = chunk_size
+        self.chunked = chunked
+        self.buffer = bytearray()
+        self.bytes_sent = 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def write(self, data):
+        # type: (bytes) -> None
+        if not data:
+            return
+
+        self.buffer += data
+        if len(self.buffer) >= self.chunk_size:
+            self.flush()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def flush(self):
+        if not self.buffer:
+            return
+
+        if self.chunked:
+            self.connection.sendall(b'%x\r\n%s\r\n' % (len(self.buffer), self.buffer))
+        else:
+            self.connection.sendall(self.buffer)
+
+        self.bytes_sent += len(self.buffer)
+        self.buffer = bytearray()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        self.flush()
+        if self.chunked:
+            self.connection.sendall(b'0\r\n\r\n')
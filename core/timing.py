@@ -0,0 +1,322 @@
+import os
+import re
+import sys
+import time
+import logging
+import cProfile
+import threading
+import collections
+
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class RequestTimer(object):
+    """
+    Times the stages of a single request. Every `mark` attributes the time since the previous one to a stage, so
+    timing a request costs a clock read per stage and nothing else. Stages marked more than once add up.
+    """
+
+    __slots__ = ('started', 'stages', '_last')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self):
+        self.started = self._last = time.perf_counter()
+        self.stages = collections.OrderedDict()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def mark(self, stage):
+        # type: (str) -> None
+        """
+        End a stage.
+
+        :param stage: the name of the stage that just ended, a token like "resource".
+        :type stage: str
+        """
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        self._last = now
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def elapsed(self):
+        # type: () -> float
+        return time.perf_counter() - self.started
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def header_value(self):
+        # type: () -> str
+        """
+        :return: the stages as a Server-Timing header value, in milliseconds, followed by the total so far.
+        :rtype: str
+        """
+        parts = ['%s;dur=%.3f' % (stage, duration * 1e3) for stage, duration in self.stages.items()]
+        parts.append('total;dur=%.3f' % (self.elapsed() * 1e3))
+        return ', '.join(parts)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _NullTimer(object):
+    """
+    Stands in for a RequestTimer when requests aren't timed, so the code marking stages doesn't have to check.
+    """
+
+    __slots__ = ()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def mark(self, stage):
+        pass
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __bool__(self):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ProfileRing(object):
+    """
+    A directory holding the last `max_files` profiles written to it. Writing a profile deletes the oldest ones beyond
+    that, so a server that is slow for a long time can't fill up the disk.
+    """
+
+    DEFAULT_MAX_FILES = 50
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, directory, max_files=DEFAULT_MAX_FILES):
+        # type: (str, int) -> None
+        self.directory = directory
+        self.max_files = max_files
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        self._files = collections.deque(sorted(
+            os.path.join(directory, name) for name in os.listdir(directory) if name[:6].isdigit()
+        ))
+
+        last = os.path.basename(self._files[-1]) if self._files else '0'
+        self._sequence = int(last[:6]) if last[:6].isdigit() else 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def path(self, label, extension):
+        # type: (str, str) -> str
+        """
+        Reserve the path of the next profile, deleting the oldest profiles if the ring is full.
+
+        :param label: describes the request, like "GET /users/{id:int} 1530ms", made safe for a file name.
+        :type label: str
+
+        :param extension: the file extension, like ".prof".
+        :type extension: str
+
+        :return: the path to write the profile to.
+        :rtype: str
+        """
+        label = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_')[:80]
+
+        with self._lock:
+            # -- six digits, wrapping around long before they run out, so the files sort in the order they were written.
+            self._sequence = self._sequence % 999999 + 1
+            path = os.path.join(self.directory, '%06d_%s%s' % (self._sequence, label, extension))
+            self._files.append(path)
+
+            while len(self._files) > self.max_files:
+                oldest = self._files.popleft()
+                try:
+                    os.remove(oldest)
+                except OSError:
+                    pass
+
+        return path
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _Sampler(threading.Thread):
+    """
+    Samples the stacks of the threads serving profiled requests every `interval` seconds.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, interval):
+        # type: (float) -> None
+        super(_Sampler, self).__init__(name='clacks_web-sampler', daemon=True)
+        self.interval = interval
+
+        # -- thread id -> Counter of stacks.
+        self.samples = dict()
+        self.lock = threading.Lock()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+
+            with self.lock:
+                if not self.samples:
+                    continue
+
+                frames = sys._current_frames()
+                for thread_id, stacks in self.samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[_stack(frame)] += 1
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _stack(frame):
+    # type: (object) -> str
+    result = list()
+    while frame is not None:
+        code = frame.f_code
+        result.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), frame.f_lineno))
+        frame = frame.f_back
+    return ';'.join(reversed(result))
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _Profile(object):
+
+    __slots__ = ('profiler', 'thread_id')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, profiler=None, thread_id=None):
+        self.profiler = profiler
+        self.thread_id = thread_id
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class SlowRequestProfiler(object):
+    """
+    Captures profiles of slow requests into a ProfileRing.
+
+    Whether a request is slow is only known once it is done, so the stacks of the threads serving requests are sampled
+    every `sample_interval` seconds, and the samples of requests that took longer than `threshold` seconds are written
+    as collapsed stacks (".txt", one "frame;frame;frame count" line per stack, as flame graph tools read them). The
+    samples of all other requests are thrown away.
+
+    Requests sent with the `debug_header` are profiled with cProfile instead, in full, whatever their duration; the
+    profile is written as ".prof", to be read with pstats. Set `debug_token` to only accept the header with that value.
+
+    Profiles are taken of the thread serving a request, which makes them meaningful for the threaded HTTPHandler only.
+    """
+
+    DEFAULT_SAMPLE_INTERVAL = 0.005
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(
+            self,
+            directory,
+            threshold=1.0,
+            max_profiles=ProfileRing.DEFAULT_MAX_FILES,
+            debug_header=None,
+            debug_token=None,
+            sample_interval=DEFAULT_SAMPLE_INTERVAL,
+    ):
+        # type: (str, float, int, str, str, float) -> None
+        self.ring = ProfileRing(directory, max_profiles)
+        self.threshold = threshold
+        self.debug_header = debug_header
+        self.debug_token = debug_token
+        self.sample_interval = sample_interval
+
+        self.stats = collections.Counter()
+
+        self._sampler = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _debug_requested(self, header_data):
+        # type: (dict) -> bool
+        if self.debug_header is None:
+            return False
+
+        value = header_data.get(self.debug_header)
+        if value is None:
+            return False
+
+        return self.debug_token is None or value == self.debug_token
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _get_sampler(self):
+        # type: () -> _Sampler
+        if self._sampler is None:
+            with self._lock:
+                if self._sampler is None:
+                    sampler = _Sampler(self.sample_interval)
+                    sampler.start()
+                    self._sampler = sampler
+        return self._sampler
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def begin(self, header_data):
+        # type: (dict) -> _Profile
+        """
+        Start profiling the request the current thread is about to serve.
+
+        :return: the profile to pass to `end`, None if this request isn't profiled.
+        :rtype: _Profile
+        """
+        if self._debug_requested(header_data):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                return _Profile(profiler=profiler)
+            except ValueError:
+                # -- only one cProfile can run at a time on some versions of Python, sample this one instead.
+                self.stats['profiler_busy'] += 1
+
+        if self.threshold is None:
+            return None
+
+        sampler = self._get_sampler()
+        thread_id = threading.get_ident()
+        with sampler.lock:
+            sampler.samples[thread_id] = collections.Counter()
+        return _Profile(thread_id=thread_id)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def end(self, profile, label, duration):
+        # type: (_Profile, str, float) -> str
+        """
+        Stop profiling a request, and write its profile if it was slow or asked for one.
+
+        :param profile: the profile returned by `begin`.
+        :type profile: _Profile
+
+        :param label: describes the request, like "GET /users/{id:int} 500".
+        :type label: str
+
+        :param duration: how long the request took, in seconds.
+        :type duration: float
+
+        :return: the path of the written profile, None if none was written.
+        :rtype: str
+        """
+        label = '%s %dms' % (label, duration * 1e3)
+
+        if profile.profiler is not None:
+            profile.profiler.disable()
+            path = self.ring.path(label, '.prof')
+            profile.profiler.dump_stats(path)
+            self.stats['profiled'] += 1
+            return path
+
+        sampler = self._sampler
+        with sampler.lock:
+            stacks = sampler.samples.pop(profile.thread_id, None)
+
+        if not stacks or duration < self.threshold:
+            return None
+
+        path = self.ring.path(label, '.txt')
+        with open(path, 'w') as fh:
+            for stack, count in stacks.most_common():
+                fh.write('%s %d\n' % (stack, count))
+
+        self.stats['sampled'] += 1
+        logger.warning('Slow request %s, profile written to %s' % (label, path))
+        return path
@@ -0,0 +1,433 @@
+import os
+import stat
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import collections
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .multipart import sanitize_filename
+
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class StoredUpload(object):
+    """
+    Upload being written into an UploadStore. Data is hashed as it is written, so committing it to the store never
+    requires reading the file back.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, store, transaction_id, path):
+        # type: (UploadStore, str, str) -> None
+        self.store = store
+        self.transaction_id = transaction_id
+        self.path = path
+        self.temp_path = os.path.join(store.incoming_dir, uuid.uuid4().hex)
+        self.fp = open(self.temp_path, 'w+b')
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def write(self, data):
+        # type: (bytes) -> None
+        self.fp.write(data)
+        self.hash.update(data)
+        self.size += len(data)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def commit(self):
+        # type: () -> str
+        self.fp.close()
+        return self.store.commit(self.temp_path, self.hash.hexdigest(), self.size, self.transaction_id, self.path)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def discard(self):
+        self.fp.close()
+        os.unlink(self.temp_path)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class UploadStore(object):
+    """
+    Managed on-disk store for uploaded files.
+
+    Every transaction gets its own directory, in which its uploads appear under their original file names. The data
+    itself is stored once per unique content in a content-addressed object directory, and linked into the transaction
+    directories, so identical uploads only take up disk space once.
+
+    Releasing a transaction is a single directory rename into a trash directory, no matter how many files it holds;
+    the actual deletion is left to the reaper. The reaper runs in a background thread once the store is started, and:
+
+    - releases transactions older than `ttl` seconds that were never released explicitly
+    - evicts objects that have not been uploaded again for `ttl` seconds
+    - evicts the least recently uploaded objects until the store is back under its byte `quota`
+    - empties the trash
+
+    Files handed out to transactions are hard links, so evicting an object never pulls data out from under a
+    transaction that is still using it. On file systems without hard links, transactions get a copy instead, which
+    counts towards the quota until the transaction is released. As a hard link shares its data with every other
+    transaction that uploaded the same content, uploads are read-only and must not be modified; copy them first.
+
+    A store is used by a single process: its root is locked for as long as the store exists, and creating a second
+    store on the same root raises an UploadStoreLockedError. Without a root, every process gets its own directory in
+    the system temp directory.
+    """
+
+    DEFAULT_TTL = 3600
+    DEFAULT_QUOTA = 10 * 1024 ** 3
+    DEFAULT_REAP_INTERVAL = 60
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, root=None, ttl=DEFAULT_TTL, quota=DEFAULT_QUOTA, reap_interval=DEFAULT_REAP_INTERVAL):
+        # type: (str, float, int, float) -> None
+        self.root = root or os.path.join(DEFAULT_ROOT, str(os.getpid()))
+        self.ttl = ttl
+        self.quota = quota
+        self.reap_interval = reap_interval
+
+        self.objects_dir = os.path.join(self.root, 'objects')
+        self.transactions_dir = os.path.join(self.root, 'transactions')
+        self.incoming_dir = os.path.join(self.root, 'incoming')
+        self.trash_dir = os.path.join(self.root, 'trash')
+
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root)
+
+        # -- held for the lifetime of the store, nobody else writes to, cleans up or reaps this root meanwhile.
+        self._lock_file = _lock_root(self.root)
+        if self._lock_file is False:
+            raise UploadStoreLockedError('Upload store %s is in use by another process!' % self.root)
+
+        for path in (self.objects_dir, self.transactions_dir, self.incoming_dir, self.trash_dir):
+            if not os.path.isdir(path):
+                os.makedirs(path)
+
+        self._lock = threading.Lock()
+
+        # -- digest -> (size, last upload time), in least recently uploaded order.
+        self._objects = collections.OrderedDict()
+        self._transactions = dict()
+        self.total_size = 0
+
+        # -- transaction id -> bytes of the copies made for it, where hard links weren't supported.
+        self._copied = collections.Counter()
+
+        self.stats = collections.Counter()
+
+        self._reaper = None
+        self._stop = threading.Event()
+
+        self._load()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _load(self):
+        # -- the root is locked, so uploads still in here were being written by a process that died, and can never be
+        # -- committed.
+        for entry in os.scandir(self.incoming_dir):
+            os.unlink(entry.path)
+
+        objects = list()
+        for prefix in os.scandir(self.objects_dir):
+            for entry in os.scandir(prefix.path):
+                st = entry.stat()
+                objects.append((st.st_mtime, entry.name, st.st_size))
+
+        for mtime, digest, size in sorted(objects):
+            self._objects[digest] = (size, mtime)
+            self.total_size += size
+
+        # -- transactions left over from a previous process are expired by the reaper like any other.
+        for entry in os.scandir(self.transactions_dir):
+            self._transactions[entry.name] = entry.stat().st_mtime
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def object_path(self, digest):
+        # type: (str) -> str
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def transaction_dir(self, transaction_id):
+        # type: (str) -> str
+        """
+        Get the directory holding the uploads of the given transaction, creating it if needed.
+
+        :param transaction_id: the transaction id.
+        :type transaction_id: str
+
+        :return: the transaction directory.
+        :rtype: str
+        """
+        path = os.path.join(self.transactions_dir, transaction_id)
+
+        with self._lock:
+            if transaction_id not in self._transactions:
+                if not os.path.isdir(path):
+                    os.makedirs(path)
+                self._transactions[transaction_id] = time.time()
+
+        return path
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def has_transaction(self, transaction_id):
+        # type: (str) -> bool
+        return transaction_id in self._transactions
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def open_upload(self, transaction_id, filename):
+        # type: (str, str) -> StoredUpload
+        """
+        Start a new upload for the given transaction.
+
+        :param transaction_id: the transaction the upload belongs to.
+        :type transaction_id: str
+
+        :param filename: the name the file should have in the transaction directory.
+        :type filename: str
+
+        :return: the upload to write to. Committing it returns the path of the file in the transaction directory.
+        :rtype: StoredUpload
+        """
+        path = os.path.join(self.transaction_dir(transaction_id), sanitize_filename(filename))
+        return StoredUpload(self, transaction_id, path)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def commit(self, temp_path, digest, size, transaction_id, path):
+        # type: (str, str, int, str, str) -> str
+        object_path = self.object_path(digest)
+
+        with self._lock:
+            if digest in self._objects:
+                os.unlink(temp_path)
+                self._objects.move_to_end(digest)
+                self.stats['deduplicated'] += 1
+                self.stats['deduplicated_bytes'] += size
+
+            else:
+                if not os.path.isdir(os.path.dirname(object_path)):
+                    os.makedirs(os.path.dirname(object_path))
+                os.replace(temp_path, object_path)
+
+                # -- objects are shared by every transaction that uploaded the same content.
+                os.chmod(object_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                self.total_size += size
+                self.stats['stored'] += 1
+
+            self._objects[digest] = (size, time.time())
+
+            if os.path.lexists(path):
+                os.unlink(path)
+
+            try:
+                os.link(object_path, path)
+            except OSError:
+                # -- not every file system supports hard links, in which case the transaction gets its own copy.
+                shutil.copyfile(object_path, path)
+                self._copied[transaction_id] += size
+                self.total_size += size
+                self.stats['copied'] += 1
+                self.stats['copied_bytes'] += size
+
+        if self.quota and self.total_size > self.quota:
+            self._evict(time.time())
+
+        return path
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def release(self, transaction_id):
+        # type: (str) -> bool
+        """
+        Release all uploads of the given transaction. This is a single rename, regardless of the number of files; the
+        files are deleted in the background by the reaper.
+
+        :param transaction_id: the transaction to release.
+        :type transaction_id: str
+
+        :return: True if the transaction existed.
+        :rtype: bool
+        """
+        with self._lock:
+            if self._transactions.pop(transaction_id, None) is None:
+                return False
+            self.total_size -= self._copied.pop(transaction_id, 0)
+
+        try:
+            os.rename(
+                os.path.join(self.transactions_dir, transaction_id),
+                os.path.join(self.trash_dir, uuid.uuid4().hex),
+            )
+        except OSError:
+            return False
+
+        self.stats['released'] += 1
+        return True
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _evict(self, now):
+        while True:
+            with self._lock:
+                if not self._objects:
+                    return
+
+                digest, (size, last_upload) = next(iter(self._objects.items()))
+
+                expired = self.ttl and now - last_upload > self.ttl
+                over_quota = self.quota and self.total_size > self.quota
+
+                if not (expired or over_quota):
+                    return
+
+                del self._objects[digest]
+                self.total_size -= size
+                self.stats['evicted'] += 1
+                self.stats['evicted_bytes'] += size
+
+                # -- unlinked under the lock, so a commit of the same content can't link to the object, or store it
+                # -- again, in between it being forgotten and deleted.
+                try:
+                    os.unlink(self.object_path(digest))
+                except OSError:
+                    pass
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def reap(self, now=None):
+        # type: (float) -> None
+        """
+        Run a single reaper pass: expire transactions, evict objects and empty the trash.
+
+        :param now: the current time, defaults to time.time()
+        :type now: float
+        """
+        now = time.time() if now is None else now
+
+        if self.ttl:
+            with self._lock:
+                expired = list(k for k, created in self._transactions.items() if now - created > self.ttl)
+            for transaction_id in expired:
+                if self.release(transaction_id):
+                    self.stats['expired'] += 1
+
+        self._evict(now)
+
+        for entry in os.scandir(self.trash_dir):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _run(self):
+        while not self._stop.wait(self.reap_interval):
+            try:
+                self.reap()
+            except Exception:
+                logger.exception('Upload store reaper pass failed!')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def start(self):
+        """
+        Start the background reaper thread.
+        """
+        if self._reaper is not None:
+            return
+        self._stop.clear()
+        self._reaper = threading.Thread(target=self._run, name='ClacksUploadStoreReaper', daemon=True)
+        self._reaper.start()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def stop(self):
+        """
+        Stop the background reaper thread.
+        """
+        if self._reaper is None:
+            return
+        self._stop.set()
+        self._reaper.join()
+        self._reaper = None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def close(self):
+        """
+        Stop the reaper and unlock the root, after which the store can no longer be used.
+        """
+        self.stop()
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class UploadStoreLockedError(RuntimeError):
+    pass
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _lock_root(root):
+    # type: (str) -> object
+    """
+    Take the exclusive lock of a store root, which is released when the returned file is closed, or when the process
+    holding it dies.
+
+    :return: the open lock file, False if another process holds the lock, or None where file locks aren't supported.
+    :rtype: file or bool
+    """
+    if fcntl is None:
+        return None
+
+    fp = open(os.path.join(root, '.lock'), 'a')
+    try:
+        fcntl.flock(fp, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        fp.close()
+        return False
+    return fp
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def _remove_orphaned_roots(parent):
+    # type: (str) -> None
+    # -- roots of processes that are gone, which nobody can lock anymore, rather than those that are merely idle.
+    if fcntl is None or not os.path.isdir(parent):
+        return
+
+    for entry in os.scandir(parent):
+        if not entry.is_dir() or entry.name == str(os.getpid()):
+            continue
+
+        lock_file = _lock_root(entry.path)
+        if lock_file:
+            try:
+                shutil.rmtree(entry.path, ignore_errors=True)
+            finally:
+                lock_file.close()
+
+
+DEFAULT_ROOT = os.path.join(tempfile.gettempdir(), 'ClacksUploadStore')
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def get_default_upload_store():
+    # type: () -> UploadStore
+    """
+    Get the process-wide default upload store, rooted in a directory of its own in the system temp directory, creating
+    and starting it if needed. Forked processes, like pre-fork workers, get a store of their own.
+    """
+    global _default_store
+
+    with _default_store_lock:
+        if _default_store is None or not _default_store.root.endswith(os.sep + str(os.getpid())):
+            _remove_orphaned_roots(DEFAULT_ROOT)
+            _default_store = UploadStore()
+            _default_store.start()
+
+    return _default_store
@@ -1,8 +1,11 @@
 import clacks
+import functools
 
 from clacks_web import HTTPHandler
 from clacks_web import HeaderKwargAdapter
 from clacks_web import CORSHeaderAdapter
+from clacks_web import MessagePackMarshaller
+from clacks_web.core.prefork import PreforkServer
 
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -22,8 +25,32 @@ def simple_rest_api_from_server(server, host, port):
     server.register_interface_by_key('cmd_utils')
     server.register_interface_by_key('web_core')
     server.register_interface_by_key('rest_basic')
+    server.register_interface_by_key('metrics')
 
-    # -- give the user a single handler to work with, but don't start the server yet.
-    server.register_handler(host, port, HTTPHandler(clacks.JSONMarshaller()))
+    # -- give the user a single handler to work with, but don't start the server yet. It speaks JSON, and MessagePack to
+    # -- clients that ask for it.
+    handler = HTTPHandler(clacks.JSONMarshaller(), marshallers=[MessagePackMarshaller()])
+    server.register_handler(host, port, handler)
 
     return server
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def simple_rest_api_prefork(identifier, host, port, workers=PreforkServer.DEFAULT_WORKERS, **kwargs):
+    """
+    Build a simple REST API that is served by `workers` processes sharing the same port, see PreforkServer. Every
+    worker builds its own server with simple_rest_api. Start it with `serve_forever`.
+    """
+    # -- clacks binds handlers as they are registered, the workers' own handlers get a throwaway port, which is never
+    # -- listened on; connections come in through the shared port instead.
+    factory = functools.partial(simple_rest_api, identifier, host, 0)
+    return PreforkServer(factory, host, port, workers=workers, **kwargs)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def simple_rest_api_prefork_from_server(server, host, port, workers=PreforkServer.DEFAULT_WORKERS, **kwargs):
+    """
+    Like simple_rest_api_prefork, but every worker sets up its own copy of the given server, as it was when forked.
+    """
+    factory = functools.partial(simple_rest_api_from_server, server, host, 0)
+    return PreforkServer(factory, host, port, workers=workers, **kwargs)
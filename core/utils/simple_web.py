@@ -12,6 +12,7 @@ spec = {
         'profiling',
         'web_core',
         'website_basic',
+        'static_files',
     ],
     'handlers': [],
     'adapters': [
@@ -0,0 +1,141 @@
+import socket
+import unittest
+
+from clacks_web.core.admission import AdmissionController, TokenBucket
+from clacks_web.core.http_connection import HTTPConnection
+from clacks_web.core.adapters.admission_adapter import AdmissionControlAdapter
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestAdmissionController(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=2, burst=3)
+        now = bucket.updated
+
+        assert [bucket.take(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.take(now) == 0.5
+        assert bucket.take(now + 0.5) == 0.0
+        assert bucket.take(now + 10) == 0.0
+        assert bucket.tokens == 2.0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_client_rate(self):
+        controller = AdmissionController(rate=0.1, burst=2)
+
+        for _ in range(2):
+            controller.admit('10.0.0.1', 'GET', '/users').release()
+
+        rejected = controller.admit('10.0.0.1', 'GET', '/users')
+        assert not rejected.admitted
+        assert (rejected.code, rejected.retry_after) == (429, 10)
+
+        # -- other clients have buckets of their own.
+        assert controller.admit('10.0.0.2', 'GET', '/users').admitted
+        assert controller.stats['rate_limited'] == 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_max_clients(self):
+        controller = AdmissionController(rate=0.1, burst=1, max_clients=2)
+
+        for client in ('a', 'b', 'c'):
+            controller.admit(client, 'GET', '/').release()
+
+        # -- the least recently seen client was forgotten, along with its empty bucket.
+        assert controller.admit('a', 'GET', '/').admitted
+        assert not controller.admit('c', 'GET', '/').admitted
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_in_flight(self):
+        controller = AdmissionController(max_in_flight=2, retry_after=3)
+
+        first = controller.admit('a', 'GET', '/')
+        second = controller.admit('b', 'GET', '/')
+
+        rejected = controller.admit('c', 'GET', '/')
+        assert (rejected.code, rejected.retry_after) == (503, 3)
+
+        first.release()
+        first.release()
+        rejected.release()
+        assert controller.in_flight == 1
+
+        assert controller.admit('c', 'GET', '/').admitted
+        second.release()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_queue_depth(self):
+        controller = AdmissionController(max_queue_depth=4)
+
+        assert controller.admit('a', 'GET', '/', queue_depth=4).admitted
+        assert controller.admit('a', 'GET', '/', queue_depth=5).code == 503
+        assert controller.stats['queue_full'] == 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_route_limits(self):
+        controller = AdmissionController()
+        controller.limit_route('/reports/{id:int}', rate=1, burst=1)
+        controller.limit_route('/users', rate=1, burst=1, method='POST')
+
+        assert controller.admit('a', 'GET', '/reports/1').admitted
+        assert controller.admit('b', 'GET', '/reports/2').code == 503
+
+        assert controller.admit('a', 'POST', '/users').admitted
+        assert controller.admit('a', 'POST', '/users').code == 503
+        assert controller.admit('a', 'GET', '/users').admitted
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_route_rejection_refunds_client(self):
+        controller = AdmissionController(rate=0.1, burst=1)
+        controller.limit_route('/reports', rate=0.1, burst=1)
+
+        controller.admit('a', 'GET', '/reports').release()
+
+        # -- a client turned away because the route is busy still has its token for other routes.
+        assert controller.admit('b', 'GET', '/reports').code == 503
+        assert controller.admit('b', 'GET', '/users').admitted
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_client_header(self):
+        address, line = ('10.0.0.9', 1), 'GET / HTTP/1.1'
+        adapter = AdmissionControlAdapter(rate=0.1, burst=1, client_header='X-Forwarded-For')
+
+        # -- the entries the client prepends itself don't get it a fresh rate limit.
+        assert adapter.admit(address, line, {'X-Forwarded-For': '1.1.1.1, 10.0.0.1'}).admitted
+        assert adapter.admit(address, line, {'X-Forwarded-For': '2.2.2.2, 10.0.0.1'}).code == 429
+        assert adapter.admit(address, line, {'X-Forwarded-For': '10.0.0.2'}).admitted
+
+        adapter = AdmissionControlAdapter(rate=0.1, burst=1, client_header='X-Forwarded-For', trusted_proxies=2)
+        assert adapter.admit(address, line, {'X-Forwarded-For': '1.1.1.1, 10.0.0.1, 10.1.0.1'}).admitted
+        assert adapter.admit(address, line, {'X-Forwarded-For': '10.0.0.1, 10.1.0.2'}).code == 429
+
+        # -- without the header, the address of the connection is used.
+        assert adapter.admit(address, line, dict()).admitted
+        assert adapter.admit(address, line, dict()).code == 429
+
+        with self.assertRaises(ValueError):
+            AdmissionControlAdapter(client_header='X-Forwarded-For', trusted_proxies=0)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_rejected_body_is_not_read(self):
+        controller = AdmissionController(max_in_flight=1)
+        server, client = socket.socketpair()
+
+        def admit(request_line, headers):
+            return controller.admit('a', *request_line.split(' ')[:2])
+
+        client.sendall(b'POST /upload HTTP/1.1\r\nContent-Length: 1000000\r\n\r\n' + b'x' * 1000)
+        client.sendall(b'x' * 1000)
+
+        connection = HTTPConnection(server, idle_timeout=1.0, admit=admit)
+
+        busy = controller.admit('b', 'GET', '/')
+        request = connection.read_request()
+        assert request.body is None
+        assert request.admission.code == 503
+        busy.release()
+
+        connection.close()
+        client.close()
+        server.close()
@@ -0,0 +1,96 @@
+import socket
+import asyncio
+import unittest
+
+from clacks_web.core.http_connection import HTTPConnectionError
+from clacks_web.core.async_http_connection import AsyncHTTPConnection
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestAsyncHTTPConnection(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def run_connection(self, data, fn, **kwargs):
+        server, client = socket.socketpair()
+        client.sendall(data)
+        client.shutdown(socket.SHUT_WR)
+
+        async def run():
+            reader, writer = await asyncio.open_connection(sock=server)
+            connection = AsyncHTTPConnection(reader, writer, idle_timeout=1.0, **kwargs)
+            try:
+                return await fn(connection)
+            finally:
+                connection.close()
+
+        try:
+            return asyncio.run(run())
+        finally:
+            client.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_pipelined_requests(self):
+        async def read_all(connection):
+            return [request async for request in connection], connection.stats.as_dict()
+
+        requests, stats = self.run_connection(
+            b'POST /users HTTP/1.1\r\nContent-Length: 13\r\n\r\n{"name": "a"}'
+            b'GET /users/1 HTTP/1.1\r\n\r\n'
+            b'POST /users HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n4\r\nabcd\r\n2\r\nef\r\n0\r\n\r\n',
+            read_all,
+        )
+
+        assert [r.request_line for r in requests] == [
+            'POST /users HTTP/1.1',
+            'GET /users/1 HTTP/1.1',
+            'POST /users HTTP/1.1',
+        ]
+        assert [r.body for r in requests] == [b'{"name": "a"}', b'', b'abcdef']
+        assert [r.pipelined for r in requests] == [False, True, True]
+        assert stats['reused_requests'] == 2
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_streamed_body(self):
+        async def read_streamed(connection):
+            first = await connection.read_request_async()
+            chunk = await first.body.__anext__()
+
+            # -- the rest of the first body is skipped to get to the second request.
+            second = await connection.read_request_async()
+            return chunk, b''.join([data async for data in second.body])
+
+        first, second = self.run_connection(
+            b'POST /upload HTTP/1.1\r\nContent-Length: 10\r\n\r\n0123456789'
+            b'POST /upload HTTP/1.1\r\nContent-Length: 4\r\n\r\nabcd',
+            read_streamed,
+            stream_body=lambda headers: True,
+        )
+
+        assert first == b'0123456789'
+        assert second == b'abcd'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_sendall(self):
+        server, client = socket.socketpair()
+
+        async def run():
+            reader, writer = await asyncio.open_connection(sock=server)
+            connection = AsyncHTTPConnection(reader, writer)
+            connection.sendall(b'HTTP/1.1 200 OK\r\n\r\n')
+            await connection.drain()
+            connection.close()
+            await writer.wait_closed()
+
+        asyncio.run(run())
+        assert client.recv(1024) == b'HTTP/1.1 200 OK\r\n\r\n'
+        client.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_strict_framing(self):
+        async def read(connection):
+            with self.assertRaises(HTTPConnectionError):
+                await connection.read_request_async()
+
+        self.run_connection(b'POST /users HTTP/1.1\r\nContent-Length: +5\r\n\r\nabcde', read)
+        self.run_connection(b'POST /users HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n 4\r\nabcd\r\n0\r\n\r\n', read)
+        self.run_connection(b'POST /users HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n4\r\nabcd0\r\n\r\n', read)
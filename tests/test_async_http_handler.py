@@ -0,0 +1,91 @@
+import time
+import clacks
+import asyncio
+import requests
+import unittest
+import threading
+import clacks_web
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class AsyncTestInterface(clacks.ServerInterface):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @clacks_web.get('/coroutine')
+    async def coroutine(self, **kwargs):
+        await asyncio.sleep(0.01)
+        return 'awaited'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @clacks_web.get('/async_stream')
+    async def async_stream(self, **kwargs):
+        for index in range(3):
+            await asyncio.sleep(0)
+            yield 'item %d\n' % index
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @clacks_web.get('/worker')
+    def worker(self, **kwargs):
+        time.sleep(0.2)
+        return threading.current_thread().name
+
+
+clacks.register_server_interface_type('async_test', AsyncTestInterface)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestAsyncHTTPHandler(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def setUpClass(cls):
+        cls.server = clacks_web.simple_rest_api(identifier='testing', host='localhost', port=6010)
+        cls.server.register_interface_by_key(interface_type='async_test')
+
+        cls.handler = clacks_web.AsyncHTTPHandler(clacks.JSONMarshaller(), max_workers=2)
+        cls.server.register_handler('localhost', 6011, cls.handler)
+        cls.server.start(blocking=False)
+
+        time.sleep(1)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.end()
+        cls.handler.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_async_resource(self):
+        response = requests.get('http://localhost:6011/coroutine')
+        response.raise_for_status()
+
+        assert response.json()['response'] == 'awaited'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_async_stream(self):
+        response = requests.get('http://localhost:6011/async_stream')
+        response.raise_for_status()
+
+        assert response.headers['Transfer-Encoding'] == 'chunked'
+        assert response.text == 'item 0\nitem 1\nitem 2\n'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_bounded_executor(self):
+        results = list()
+
+        def get():
+            results.append(requests.get('http://localhost:6011/worker').json()['response'])
+
+        threads = [threading.Thread(target=get) for _ in range(4)]
+
+        started = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # -- four requests share two workers, so they are digested two at a time.
+        assert time.time() - started >= 0.4
+        assert len(results) == 4
+        assert len(set(results)) <= 2
+        assert all(name.startswith('ClacksAsyncHTTPWorker') for name in results)
@@ -0,0 +1,75 @@
+import time
+import threading
+import unittest
+
+from clacks_web.core.batch import BatchRunner, BatchError
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestBatchRunner(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.runner = BatchRunner(max_operations=10, max_concurrency=4)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def dispatch(cls, operation):
+        path = operation['path']
+        if path == '/missing':
+            raise BatchError(404, 'Not found')
+        if path == '/broken':
+            raise ValueError('broken')
+        return dict(path=path, **operation.get('kwargs', dict()))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_statuses(self):
+        results = self.runner.run(
+            [{'path': '/a', 'kwargs': {'id': 1}}, {'path': '/missing'}, {'method': 'GET', 'path': '/broken'}],
+            self.dispatch,
+        )
+
+        assert results == [
+            dict(status=200, response=dict(path='/a', id=1)),
+            dict(status=404, error='Not found'),
+            dict(status=500, error='broken'),
+        ]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_parallel(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def dispatch(operation):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return operation['path']
+
+        operations = [{'path': '/%s' % i} for i in range(8)]
+
+        start = time.time()
+        results = self.runner.run(operations, dispatch, parallel=True, max_concurrency=2)
+
+        # -- results come back in order, with no more than two running at the same time.
+        assert [r['response'] for r in results] == ['/%s' % i for i in range(8)]
+        assert running[1] == 2
+        assert time.time() - start < 0.4
+
+        # -- the runner's own cap can't be exceeded.
+        self.runner.run(operations, dispatch, parallel=True, max_concurrency=100)
+        assert running[1] <= 4
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_validate(self):
+        for operations in ({'path': '/'}, [{'path': '/'}] * 11, [{'method': 'GET'}], [{'path': '/', 'kwargs': []}]):
+            with self.assertRaises(ValueError):
+                self.runner.run(operations, self.dispatch)
+
+        # -- options that weren't converted by a binder are refused, rather than "false" running the batch in parallel.
+        for options in ({'parallel': 'false'}, {'max_concurrency': '2'}, {'max_concurrency': -1}):
+            with self.assertRaises(ValueError):
+                self.runner.run([{'path': '/'}], self.dispatch, **options)
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from clacks_web.benchmarks.runner import Result, compare, save_baseline, load_baseline
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestBenchmarkRunner(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_compare(self):
+        baseline = {
+            'stages/parse/api': Result(10.0, 'us'),
+            'stages/route/static': Result(1.0, 'us'),
+            'loopback/keep_alive/throughput': Result(1000.0, 'req/s', higher_is_better=True),
+            'loopback/keep_alive/errors': Result(0, 'requests'),
+        }
+        results = {
+            'stages/parse/api': Result(12.0, 'us'),
+            'stages/route/static': Result(0.5, 'us'),
+            'loopback/keep_alive/throughput': Result(950.0, 'req/s', higher_is_better=True),
+            'loopback/keep_alive/errors': Result(3, 'requests'),
+            'stages/encode/json': Result(80.0, 'us'),
+        }
+
+        statuses = dict((row[0], row[-1]) for row in compare(results, baseline))
+        assert statuses == {
+            'stages/parse/api': 'regression',
+            'stages/route/static': 'improved',
+            'loopback/keep_alive/throughput': 'ok',
+            'loopback/keep_alive/errors': 'regression',
+            'stages/encode/json': 'new',
+        }
+
+        statuses = dict((row[0], row[-1]) for row in compare(results, baseline, tolerance=0.25))
+        assert statuses['stages/parse/api'] == 'ok'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_save_merges(self):
+        path = os.path.join(self.root, 'baselines', 'local.json')
+
+        save_baseline(path, {'a/x': Result(1.0, 'us'), 'b/y': Result(5.0, 'req/s', higher_is_better=True)})
+        save_baseline(path, {'a/x': Result(2.0, 'us')})
+
+        baseline = load_baseline(path)
+        assert baseline['a/x'].value == 2.0
+        assert baseline['b/y'].value == 5.0
+        assert baseline['b/y'].higher_is_better
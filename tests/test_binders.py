@@ -0,0 +1,66 @@
+import typing
+import unittest
+
+from clacks_web.core.binders import compile_binder, ArgumentError
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _Resources(object):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def search(self, query: str, page: int = 1, ratio=0.5, exact=False, tags: typing.List[int] = None,
+               limit: typing.Optional[int] = None, filters: dict = None):
+        return locals()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def anything(self, name, **kwargs):
+        return name, kwargs
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestBinders(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_coercion(self):
+        bind = compile_binder(_Resources.search)
+
+        kwargs = bind({
+            'query': 'lamp', 'page': '3', 'ratio': '0.25', 'exact': 'true', 'tags': '1,2,3', 'limit': '10',
+            'filters': '{"color": "red"}',
+        })
+        assert kwargs == {
+            'query': 'lamp', 'page': 3, 'ratio': 0.25, 'exact': True, 'tags': [1, 2, 3], 'limit': 10,
+            'filters': {'color': 'red'},
+        }
+
+        # -- values that already have the right type, as sent in JSON bodies, are left alone.
+        assert bind({'query': 'lamp', 'page': 2, 'tags': [4], 'limit': None}) == {
+            'query': 'lamp', 'page': 2, 'tags': [4], 'limit': None,
+        }
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_validation(self):
+        bind = compile_binder(_Resources.search)
+
+        for kwargs in (
+            {},
+            {'query': 'lamp', 'page': 'three'},
+            {'query': 'lamp', 'exact': 'maybe'},
+            {'query': 'lamp', 'tags': '1,x'},
+            {'query': 'lamp', 'unknown': 1},
+            {'query': 5},
+        ):
+            with self.assertRaises(ArgumentError, msg=str(kwargs)):
+                bind(kwargs)
+
+        with self.assertRaises(ArgumentError) as context:
+            bind({'query': 'lamp', 'page': 'three'})
+        assert 'page' in str(context.exception) and 'int' in str(context.exception)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_var_kwargs(self):
+        bind = compile_binder(_Resources.anything)
+        assert bind({'name': 1, 'other': '2'}) == {'name': 1, 'other': '2'}
+
+        with self.assertRaises(ArgumentError):
+            bind({'other': '2'})
@@ -0,0 +1,106 @@
+import zlib
+import gzip
+import json
+import unittest
+
+from clacks_web.core.compression import CompressionCache, compress, negotiate_encoding, parse_accept_encoding
+from clacks_web.core.adapters.compression_adapter import CompressionAdapter
+
+
+BODY = json.dumps([{'id': i, 'name': 'asset_%s' % i, 'tags': ['prop', 'env']} for i in range(500)]).encode('utf-8')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _Response(object):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, header_data, content_encoding):
+        self.payload = {'response': None, 'header_data': header_data}
+        self.content_encoding = content_encoding
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @property
+    def header_data(self):
+        return self.payload['header_data']
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestCompression(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_parse_accept_encoding(self):
+        assert parse_accept_encoding('gzip, deflate;q=0.5, br;q=abc') == {'gzip': 1.0, 'deflate': 0.5, 'br': 0.0}
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_negotiate_encoding(self):
+        assert negotiate_encoding('gzip, deflate') == 'gzip'
+        assert negotiate_encoding('gzip;q=0.2, deflate') == 'deflate'
+        assert negotiate_encoding('*') == 'gzip'
+        assert negotiate_encoding('*, gzip;q=0') == 'deflate'
+        assert negotiate_encoding('identity') is None
+        assert negotiate_encoding('') is None
+
+        # -- media types are not content codings.
+        assert negotiate_encoding('text/json') is None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_compress(self):
+        assert gzip.decompress(compress(BODY, 'gzip')) == BODY
+        assert zlib.decompress(compress(BODY, 'deflate')) == BODY
+        assert len(compress(BODY, 'gzip')) < len(BODY) / 4
+
+        # -- no timestamps, the same body always compresses to the same bytes.
+        assert compress(BODY, 'gzip') == compress(BODY, 'gzip')
+
+        with self.assertRaises(ValueError):
+            compress(BODY, 'br')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_cache(self):
+        cache = CompressionCache(max_entries=2)
+
+        first = cache.compress(BODY, 'gzip')
+        assert cache.compress(BODY, 'gzip') is first
+        assert cache.stats['hits'] == 1
+        assert cache.stats['misses'] == 1
+
+        cache.compress(BODY, 'deflate')
+        cache.compress(BODY + b' ', 'gzip')
+
+        assert len(cache) == 2
+        assert cache.stats['evictions'] == 1
+        assert cache.size == sum(len(c) for c in cache._entries.values())
+
+        # -- entries larger than the byte budget are never cached.
+        cache = CompressionCache(max_bytes=len(compress(BODY, 'gzip')) - 1)
+        cache.compress(BODY, 'gzip')
+        assert len(cache) == 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_vary(self):
+        adapter = CompressionAdapter()
+
+        for vary, expected in (
+                (None, 'Accept-Encoding'),
+                ('Accept', 'Accept, Accept-Encoding'),
+                ('accept-encoding', 'accept-encoding'),
+        ):
+            # -- a Vary set by anything else is added to, not replaced, also when the body is sent as-is.
+            for encoding in ('gzip', None):
+                response = _Response({'Vary': vary} if vary else dict(), encoding)
+                adapter.handler_encode_body(None, None, None, 'id', response, BODY)
+                assert response.header_data['Vary'] == expected
+
+        # -- bodies too small to be compressed don't depend on the request's Accept-Encoding.
+        response = _Response(dict(), 'gzip')
+        assert adapter.handler_encode_body(None, None, None, 'id', response, b'{}') == b'{}'
+        assert 'Vary' not in response.header_data
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_etag(self):
+        adapter = CompressionAdapter()
+
+        for encoding, etag, expected in (('gzip', '"1"', 'W/"1"'), ('gzip', 'W/"1"', 'W/"1"'), (None, '"1"', '"1"')):
+            response = _Response({'ETag': etag}, encoding)
+            adapter.handler_encode_body(None, None, None, 'id', response, BODY)
+            assert response.header_data['ETag'] == expected
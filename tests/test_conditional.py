@@ -0,0 +1,80 @@
+import datetime
+import unittest
+
+from clacks_web.core.conditional import (
+    NotModified,
+    make_etag,
+    hash_etag,
+    etag_matches,
+    format_http_date,
+    is_not_modified,
+    resource_validators,
+)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class Assets(object):
+
+    revision = 7
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def asset_version(self, id):
+        return '%s-%s' % (id, self.revision)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def get_asset(self, id):
+        raise AssertionError('Resource should not be called to compute its validators!')
+
+    get_asset.version = asset_version
+    get_asset.last_modified = lambda self, id: datetime.datetime(2020, 1, 1)
+    get_asset.etag = 'weak'
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestConditional(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_etags(self):
+        assert make_etag(42) == '"42"'
+        assert make_etag('a"b', weak=True) == 'W/"ab"'
+        assert hash_etag(b'body') == hash_etag(b'body') != hash_etag(b'other')
+
+        assert etag_matches('"1", "2"', '"2"')
+        assert etag_matches('W/"2"', '"2"')
+        assert etag_matches('"2"', 'W/"2"')
+        assert etag_matches('*', '"2"')
+        assert not etag_matches('"1"', '"2"')
+        assert not etag_matches(None, '"2"')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_is_not_modified(self):
+        modified = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc).timestamp()
+
+        assert is_not_modified({'If-None-Match': '"1"'}, etag='"1"')
+        assert not is_not_modified({'If-None-Match': '"1"'}, etag='"2"')
+
+        assert is_not_modified({'If-Modified-Since': format_http_date(modified)}, last_modified=modified + 0.5)
+        assert not is_not_modified({'If-Modified-Since': format_http_date(modified)}, last_modified=modified + 1)
+        assert not is_not_modified({'If-Modified-Since': 'garbage'}, last_modified=modified)
+
+        # -- If-None-Match takes precedence over If-Modified-Since.
+        headers = {'If-None-Match': '"1"', 'If-Modified-Since': format_http_date(modified)}
+        assert not is_not_modified(headers, etag='"2"', last_modified=modified)
+
+        assert not is_not_modified(dict())
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_resource_validators(self):
+        assets = Assets()
+
+        etag, last_modified = resource_validators(assets.get_asset, {'id': 3})
+        assert etag == 'W/"3-7"'
+        assert last_modified == datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc).timestamp()
+
+        assert resource_validators(lambda: None, dict()) == (None, None)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_not_modified(self):
+        result = NotModified('"1"', 0.0)
+        assert result == ''
+        assert result.etag == '"1"'
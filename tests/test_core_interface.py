@@ -0,0 +1,104 @@
+import os
+import clacks
+import unittest
+import threading
+
+import clacks_web
+from clacks_web.core.timing import RequestTimer
+from clacks_web.core.interfaces.core_interface import ClacksCoreWebAPIInterface
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class ExecutorTestInterface(clacks.ServerInterface):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @clacks_web.get('/thread', executor='thread')
+    def thread(self, value: int = 0):
+        return threading.current_thread().name, value + 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    @clacks_web.get('/process', executor='process')
+    def process(value: int = 0):
+        return os.getpid(), value * 2
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @clacks_web.get('/bound_process', executor='process')
+    def bound_process(self):
+        return os.getpid()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestResourceExecutors(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.interface = ClacksCoreWebAPIInterface()
+        self.interface.get_resources_from_object(ExecutorTestInterface())
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def call(self, path, **kwargs):
+        timer = RequestTimer()
+        future, code = self.interface._method('GET', _header_data={'path': path, '_timer': timer}, **kwargs)
+
+        assert code == clacks.ReturnCodes.OK
+        assert 'resource' in timer.stages
+        return future
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_thread(self):
+        name, value = self.call('/thread', value='41').result(5)
+
+        assert name != threading.current_thread().name
+        assert value == 42
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_process(self):
+        pid, value = self.call('/process', value='21').result(30)
+
+        assert pid != os.getpid()
+        assert value == 42
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_bound_process(self):
+        # -- the bound method itself is submitted, so the executor can tell it can't be sent to another process.
+        with self.assertRaises(TypeError):
+            self.call('/bound_process').result(5)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_binder(self):
+        # -- binders are compiled when the resources are registered, so arguments are checked before anything runs.
+        with self.assertRaises(clacks.errors.ClacksBadCommandArgsError):
+            self.call('/thread', value='forty-one')
+
+        with self.assertRaises(clacks.errors.ClacksBadCommandArgsError):
+            self.call('/thread', unknown='1')
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestBatch(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.interface = ClacksCoreWebAPIInterface()
+        self.interface.get_resources_from_object(self.interface)
+        self.interface.get_resources_from_object(ExecutorTestInterface())
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_batch(self):
+        operations = [
+            {'path': '/thread', 'kwargs': {'value': '1'}},
+            {'method': 'POST', 'path': '/_batch', 'kwargs': {'operations': [{'path': '/thread'}]}},
+        ]
+
+        # -- options sent as strings are converted by the binder of the batch resource.
+        for parallel in ('false', 'true'):
+            results, code = self.interface._method(
+                'POST', _header_data={'path': '/_batch'}, operations=operations, parallel=parallel, max_concurrency='2',
+            )
+
+            assert results[0]['status'] == 200
+            assert results[0]['response'][1] == 2
+
+            # -- the batch resource is recognized by what was registered, not by how it happens to be wrapped.
+            assert results[1] == {'status': 400, 'error': 'Batches can not be nested!'}
@@ -0,0 +1,86 @@
+import socket
+import clacks
+import unittest
+
+import clacks_web
+from clacks_web.core.interfaces.core_interface import ClacksCoreWebAPIInterface
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _Server(object):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self, interface, adapters):
+        self.interfaces = {'web_core': interface}
+        self.adapters = adapters
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestCORSPreflight(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def create_interface(self):
+        def fail(**_):
+            raise AssertionError('Preflights must not call resources!')
+
+        interface = ClacksCoreWebAPIInterface()
+        interface.register_resource('GET', '/users/{id:int}', fail)
+        interface.register_resource('PUT', '/users/{id:int}', fail)
+        interface.register_resource('GET', '/users/me', fail)
+        interface.register_resource('POST', '/users', fail)
+        return interface
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_allowed_methods(self):
+        interface = self.create_interface()
+
+        assert interface.allowed_methods('/users/42') == ('/users/{id:int}', {'GET', 'PUT'})
+        assert interface.allowed_methods('/users/me') == ('/users/me', {'GET'})
+        assert interface.allowed_methods('/users') == ('/users', {'POST'})
+        assert interface.allowed_methods('/nope') == (None, None)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def preflight(self, adapters, path):
+        handler = clacks_web.HTTPHandler(clacks.JSONMarshaller())
+        handler.server = _Server(self.create_interface(), adapters)
+
+        header_data = handler._build_question_header('OPTIONS %s HTTP/1.1' % path, {
+            'Origin': 'https://example.com',
+            'Access-Control-Request-Method': 'PUT',
+            'Access-Control-Request-Headers': 'Authorization, Content-Type',
+        })
+        assert handler.is_preflight(header_data)
+
+        server, client = socket.socketpair()
+        status = handler.respond_preflight(server, header_data, keep_alive=True)
+        server.close()
+
+        head = client.recv(65536).decode('latin-1')
+        client.close()
+
+        lines = head.split('\r\n')
+        return status, lines[0], dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_preflight(self):
+        status, status_line, headers = self.preflight({'cors': clacks_web.CORSHeaderAdapter(max_age=600)}, '/users/1')
+
+        assert status == 204
+        assert status_line == 'HTTP/1.1 204 No Content'
+        assert headers['Access-Control-Allow-Methods'] == 'GET, PUT'
+        assert headers['Access-Control-Allow-Headers'] == 'Authorization, Content-Type'
+        assert headers['Access-Control-Max-Age'] == '600'
+        assert headers['Connection'] == 'keep-alive'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_preflight_without_adapter(self):
+        status, _, headers = self.preflight(dict(), '/users/1')
+
+        assert status == 204
+        assert headers['Allow'] == 'GET, PUT, OPTIONS'
+        assert 'Access-Control-Allow-Origin' not in headers
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_preflight_not_found(self):
+        status, _, _ = self.preflight({'cors': clacks_web.CORSHeaderAdapter()}, '/nope')
+        assert status == 404
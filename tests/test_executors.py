@@ -0,0 +1,86 @@
+import os
+import time
+import threading
+import unittest
+
+from clacks_web.core.executors import (
+    ExecutorPools,
+    ResourceExecutor,
+    ResourceBusyError,
+    make_resource_executor,
+)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+def worker_pid(value):
+    return os.getpid(), value * 2
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestExecutors(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.pools = ExecutorPools(thread_workers=4, process_workers=1)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def tearDown(self):
+        self.pools.shutdown()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_concurrency_limit(self):
+        release = threading.Event()
+        executor = ResourceExecutor('thread', max_concurrency=1, max_queue=1, name='GET /slow', pools=self.pools)
+
+        first = executor.submit(release.wait, 5)
+        second = executor.submit(lambda: 'second')
+        third = executor.submit(lambda: 'third')
+
+        # -- one call running, one waiting for it, and no room for the third.
+        assert executor.running == 1
+        assert executor.queue_depth == 1
+        with self.assertRaises(ResourceBusyError):
+            third.result(1)
+
+        release.set()
+        assert first.result(5) is True
+        assert second.result(5) == 'second'
+
+        # -- the done callbacks may still be running.
+        time.sleep(0.05)
+        stats = executor.as_dict()
+        assert stats['running'] == 0
+        assert stats['queue_depth'] == 0
+        assert stats['completed'] == 2
+        assert stats['rejected'] == 1
+        assert stats['max_queue_depth'] == 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_failure(self):
+        executor = ResourceExecutor('thread', pools=self.pools)
+
+        with self.assertRaises(ZeroDivisionError):
+            executor.submit(lambda: 1 / 0).result(5)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_process(self):
+        executor = ResourceExecutor('process', pools=self.pools)
+
+        pid, value = executor.submit(worker_pid, 21).result(30)
+        assert pid != os.getpid()
+        assert value == 42
+
+        # -- methods bound to an instance can't be sent to another process.
+        with self.assertRaises(TypeError):
+            executor.submit(self.setUp).result(5)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_make_resource_executor(self):
+        assert make_resource_executor('inline') is None
+        assert make_resource_executor('thread').kind == 'thread'
+
+        with self.assertRaises(ValueError):
+            make_resource_executor('inline', max_concurrency=2)
+
+        with self.assertRaises(ValueError):
+            make_resource_executor('fiber')
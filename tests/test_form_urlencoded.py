@@ -0,0 +1,55 @@
+import unittest
+
+from clacks_web.core.form_urlencoded import FormDecoder, FormLimitError, fields_to_dict, decode_form
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestFormDecoder(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_decode(self):
+        result = decode_form(b'name=J%C3%BCrgen+M&tags=b&empty=&tags=a&&tags=b&flag&q=a%26b%3Dc\r\n')
+
+        assert list(result) == ['name', 'tags', 'empty', 'flag', 'q']
+        assert result['name'] == 'J\xfcrgen M'
+        assert result['tags'] == ['b', 'a', 'b']
+        assert result['empty'] == result['flag'] == ''
+        assert result['q'] == 'a&b=c'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_chunks(self):
+        body = b'first=J%C3%BCrgen&second=a%26b&third=%E2%9C%93+done&last=x'
+        expected = FormDecoder()
+        expected.feed(body)
+        expected = expected.close()
+
+        # -- fields, escapes and multi-byte characters split across any chunk boundary.
+        for size in range(1, len(body)):
+            decoder = FormDecoder()
+            for start in range(0, len(body), size):
+                decoder.feed(body[start:start + size])
+            assert decoder.close() == expected, size
+
+        assert expected[2] == ('third', '✓ done')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_limits(self):
+        with self.assertRaises(FormLimitError):
+            decode_form(b'&'.join([b'a=1'] * 11), max_fields=10)
+
+        with self.assertRaises(FormLimitError):
+            decode_form(b'a=1&b=' + b'x' * 20 + b'&c=3', max_field_size=16)
+
+        decoder = FormDecoder(max_field_size=16)
+        with self.assertRaises(FormLimitError):
+            for _ in range(10):
+                decoder.feed(b'xxxx')
+
+        decoder = FormDecoder(max_total_size=8)
+        decoder.feed(b'a=1&b=2')
+        with self.assertRaises(FormLimitError):
+            decoder.feed(b'&c=3')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_fields_to_dict(self):
+        assert fields_to_dict([('a', '1'), ('b', '2'), ('a', '3'), ('a', '1')]) == {'a': ['1', '3', '1'], 'b': '2'}
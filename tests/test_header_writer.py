@@ -0,0 +1,43 @@
+import unittest
+import collections
+
+from clacks_web.core.http_parser import parse_header_block
+from clacks_web.core.header_writer import ResponseHeaderWriter, HeaderBlock, date_header
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestHeaderWriter(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_write(self):
+        writer = ResponseHeaderWriter()
+        cors = HeaderBlock({'Access-Control-Allow-Origin': '*', 'Access-Control-Allow-Methods': '*'})
+
+        headers = collections.OrderedDict()
+        headers['Content-Length'] = 12
+        headers['Access-Control-Allow-Origin'] = 'https://example.com'
+        headers['X-Broken'] = 'value\r\n'
+
+        head = writer.write(200, 'OK', headers, [cors])
+
+        assert head.startswith(b'HTTP/1.1 200 OK\r\nDate: ')
+        assert head.endswith(b'X-Broken: value\r\n\r\n')
+        assert b'\n' not in head.replace(b'\r\n', b'')
+
+        start_line, parsed = parse_header_block(head)
+        assert start_line == 'HTTP/1.1 200 OK'
+        assert parsed['Content-Length'] == '12'
+        assert parsed['Access-Control-Allow-Methods'] == '*'
+
+        # -- headers the response sets itself win over those of a block, without being sent twice.
+        assert parsed.getall('Access-Control-Allow-Origin') == ['https://example.com']
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_date_header(self):
+        assert date_header(784111777.2) == b'Date: Sun, 06 Nov 1994 08:49:37 GMT\r\n'
+        assert date_header(784111777.9) is date_header(784111777.2)
+        assert date_header(784111778) == b'Date: Sun, 06 Nov 1994 08:49:38 GMT\r\n'
+
+        writer = ResponseHeaderWriter()
+        assert b'Date' not in writer.write(204, 'No Content', dict(), date=False)
+        assert writer.write(404, 'Not Found', {'Date': 'x'}).count(b'Date') == 1
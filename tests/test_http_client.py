@@ -0,0 +1,159 @@
+import json
+import time
+import socket
+import threading
+import unittest
+import http.server
+import urllib.parse
+
+from clacks_web.core.http_client import HTTPClientProxy, HTTPClientError, HTTPStatusError, PoolTimeoutError
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class _Handler(http.server.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def log_message(self, *_):
+        pass
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _respond(self, code, content):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+
+        if url.path == '/sleep':
+            time.sleep(float(query['seconds']))
+
+        if url.path == '/missing':
+            self._respond(404, {'errors': ['Not here!']})
+            return
+
+        self._respond(200, {'response': {'port': self.client_address[1], 'query': query}})
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def do_POST(self):
+        kwargs = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self._respond(200, {'response': kwargs['a'] + kwargs['b']})
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestHTTPClient(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('localhost', 0), _Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.port = self.server.server_address[1]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_call(self):
+        with HTTPClientProxy('localhost', self.port) as client:
+            assert client.get('/echo', x='1')['query'] == {'x': '1'}
+            assert client.post('/add', a=1, b=2) == 3
+
+            with self.assertRaises(HTTPStatusError) as context:
+                client.get('/missing')
+            assert context.exception.response.status == 404
+            assert 'Not here!' in str(context.exception)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_keep_alive_reuse(self):
+        with HTTPClientProxy('localhost', self.port, max_size=2) as client:
+            ports = {client.get('/')['port'] for _ in range(10)}
+
+            # -- calls made one after the other all go over the same connection.
+            assert len(ports) == 1
+            assert client.pool.as_dict()['connections_opened'] == 1
+            assert client.pool.as_dict()['reused'] == 9
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_concurrent_calls(self):
+        with HTTPClientProxy('localhost', self.port, max_size=4) as client:
+            start = time.time()
+            futures = client.map([('GET', '/sleep', {'seconds': 0.2})] * 8)
+            ports = {future.result()['port'] for future in futures}
+
+            # -- 8 calls over 4 connections take two rounds, and never open more than 4 connections.
+            assert time.time() - start < 1.0
+            assert len(ports) == 4
+            assert client.pool.size == 4
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_checkout_timeout(self):
+        with HTTPClientProxy('localhost', self.port, max_size=1, checkout_timeout=0.05) as client:
+            connection = client.pool.checkout()
+            with self.assertRaises(PoolTimeoutError):
+                client.get('/')
+            client.pool.checkin(connection)
+
+            client.get('/')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_stale_connection(self):
+        with HTTPClientProxy('localhost', self.port, max_size=1) as client:
+            client.get('/')
+
+            # -- the server going away closes the idle connection, which has to be noticed on the next checkout.
+            connection = client.pool._idle[-1]
+            connection.socket.shutdown(0)
+
+            client.get('/')
+            assert client.pool.as_dict()['unhealthy'] == 1
+
+            client.pool.max_idle_time = 0.0
+            time.sleep(0.01)
+            client.get('/')
+            assert client.pool.as_dict()['expired'] == 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_retry(self):
+        # -- a server answering a single request per connection, without saying so, closing it on the next request.
+        listener = socket.create_server(('localhost', 0))
+        received = list()
+
+        def serve():
+            while True:
+                try:
+                    connection, _ = listener.accept()
+                except OSError:
+                    return
+                with connection:
+                    for response in (b'HTTP/1.1 200 OK\r\nContent-Length: 17\r\n\r\n{"response": "a"}', None):
+                        data = connection.recv(65536)
+                        received.append(data.split(b' ', 1)[0])
+                        if response is not None:
+                            connection.sendall(response)
+
+        threading.Thread(target=serve, daemon=True).start()
+
+        with HTTPClientProxy('localhost', listener.getsockname()[1], max_size=1) as client:
+            client.get('/')
+
+            # -- idempotent requests are sent again on a new connection.
+            assert client.get('/') == 'a'
+            assert client.pool.as_dict()['retries'] == 1
+
+            # -- others are not, the server may have acted on them before closing the connection.
+            with self.assertRaises(HTTPClientError):
+                client.post('/', a=1)
+            assert client.pool.as_dict()['retries'] == 1
+
+        listener.close()
+        assert received == [b'GET', b'GET', b'GET', b'POST']
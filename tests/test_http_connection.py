@@ -0,0 +1,134 @@
+import socket
+import unittest
+
+from clacks_web.core.http_connection import HTTPConnection, HTTPConnectionError
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestHTTPConnection(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_pipelined_requests(self):
+        server, client = socket.socketpair()
+
+        client.sendall(
+            b'POST /users HTTP/1.1\r\nContent-Length: 13\r\n\r\n{"name": "a"}'
+            b'GET /users/1 HTTP/1.1\r\n\r\n'
+            b'POST /users HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n4\r\nabcd\r\n2\r\nef\r\n0\r\n\r\n'
+        )
+        client.shutdown(socket.SHUT_WR)
+
+        connection = HTTPConnection(server, idle_timeout=1.0)
+        requests = list(connection)
+        connection.close()
+
+        assert [r.request_line for r in requests] == [
+            'POST /users HTTP/1.1',
+            'GET /users/1 HTTP/1.1',
+            'POST /users HTTP/1.1',
+        ]
+        assert [r.body for r in requests] == [b'{"name": "a"}', b'', b'abcdef']
+        assert [r.pipelined for r in requests] == [False, True, True]
+
+        stats = connection.stats.as_dict()
+        assert stats['requests'] == 3
+        assert stats['reused_requests'] == 2
+        assert stats['open_connections'] == 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_max_requests(self):
+        server, client = socket.socketpair()
+        client.sendall(b'GET / HTTP/1.1\r\n\r\n' * 3)
+
+        connection = HTTPConnection(server, idle_timeout=1.0, max_requests=2)
+
+        first = connection.read_request()
+        assert connection.keep_alive(first.request_line, first.headers)
+
+        second = connection.read_request()
+        assert not connection.keep_alive(second.request_line, second.headers)
+        assert connection.read_request() is None
+
+        connection.close()
+        client.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_keep_alive_negotiation(self):
+        server, client = socket.socketpair()
+        connection = HTTPConnection(server)
+
+        assert connection.keep_alive('GET / HTTP/1.1', dict())
+        assert not connection.keep_alive('GET / HTTP/1.1', {'Connection': 'close'})
+        assert not connection.keep_alive('GET / HTTP/1.0', dict())
+        assert connection.keep_alive('GET / HTTP/1.0', {'Connection': 'Keep-Alive'})
+
+        connection.close()
+        client.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_idle_timeout(self):
+        server, client = socket.socketpair()
+        connection = HTTPConnection(server, idle_timeout=0.05)
+
+        assert connection.read_request() is None
+        assert connection.stats.as_dict()['idle_timeouts'] == 1
+
+        connection.close()
+        client.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_streamed_body(self):
+        server, client = socket.socketpair()
+        client.sendall(
+            b'POST /upload HTTP/1.1\r\nContent-Length: 10\r\n\r\n0123456789'
+            b'POST /upload HTTP/1.1\r\nContent-Length: 4\r\n\r\nabcd'
+        )
+        client.shutdown(socket.SHUT_WR)
+
+        connection = HTTPConnection(server, idle_timeout=1.0, stream_body=lambda headers: True)
+
+        # -- the first body iterator is never exhausted, the connection has to finish it to get to the next request.
+        first = connection.read_request()
+        assert next(first.body) == b'0123456789'
+
+        second = connection.read_request()
+        assert b''.join(second.body) == b'abcd'
+
+        connection.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_strict_framing(self):
+        bodies = (
+            b'Content-Length: -5\r\n\r\n',
+            b'Content-Length: +5\r\n\r\n',
+            b'Content-Length: 1_000\r\n\r\n',
+            b'Content-Length: 5, 5\r\n\r\nabcde',
+            b'Transfer-Encoding: chunked\r\n\r\n0x4\r\nabcd\r\n0\r\n\r\n',
+            b'Transfer-Encoding: chunked\r\n\r\n-4\r\nabcd\r\n0\r\n\r\n',
+            b'Transfer-Encoding: chunked\r\n\r\n4\r\nabcdXX0\r\n\r\n',
+            b'Transfer-Encoding: chunked\r\nContent-Length: 4\r\n\r\n0\r\n\r\n',
+            b'Transfer-Encoding: chunked, gzip\r\n\r\n0\r\n\r\n',
+        )
+
+        for body in bodies:
+            server, client = socket.socketpair()
+            client.sendall(b'POST /users HTTP/1.1\r\n' + body)
+            client.shutdown(socket.SHUT_WR)
+
+            connection = HTTPConnection(server, idle_timeout=1.0)
+            with self.assertRaises(HTTPConnectionError):
+                connection.read_request()
+
+            connection.close()
+            client.close()
+
+        # -- invalid framing headers are rejected before a streamed body is handed over, not once it is read.
+        server, client = socket.socketpair()
+        client.sendall(b'POST /users HTTP/1.1\r\nTransfer-Encoding: gzip\r\n\r\n')
+
+        connection = HTTPConnection(server, idle_timeout=1.0, stream_body=lambda headers: True)
+        with self.assertRaises(HTTPConnectionError):
+            connection.read_request()
+
+        connection.close()
+        client.close()
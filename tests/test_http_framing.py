@@ -0,0 +1,101 @@
+import unittest
+
+from clacks_web.core.http_framing import HTTPFramer, HTTPConnectionError, BadRequestError, NEED_DATA, is_chunked
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestHTTPFramer(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def frame(data, chunk_size=65536):
+        # -- feeds the data a single byte at a time, the worst case for finding terminators split across reads.
+        framer = HTTPFramer()
+        data = bytearray(data)
+        messages = list()
+
+        def pull(fn, *args):
+            result = fn(*args)
+            while result is NEED_DATA and data:
+                framer.receive_data(bytes(data[:1]))
+                del data[:1]
+                result = fn(*args)
+            return result
+
+        while True:
+            head = pull(framer.next_head)
+            if head is NEED_DATA:
+                return messages, framer
+
+            framer.start_body(head[2])
+            body = list()
+            while True:
+                piece = pull(framer.next_body_data, chunk_size)
+                if piece is None:
+                    break
+                if piece is NEED_DATA:
+                    return messages, framer
+                body.append(piece)
+
+            messages.append((head[1], b''.join(body)))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_pipelined_messages(self):
+        messages, framer = self.frame(
+            b'POST /users HTTP/1.1\r\nContent-Length: 13\r\n\r\n{"name": "a"}'
+            b'GET /users/1 HTTP/1.1\r\n\r\n'
+            b'POST /users HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n4;ext=1\r\nabcd\r\n2\r\nef\r\n0\r\nX: y\r\n\r\n'
+            b'GET /next'
+        )
+
+        assert messages == [
+            ('POST /users HTTP/1.1', b'{"name": "a"}'),
+            ('GET /users/1 HTTP/1.1', b''),
+            ('POST /users HTTP/1.1', b'abcdef'),
+        ]
+        assert framer.buffer == b'GET /next'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_max_size(self):
+        framer = HTTPFramer()
+        framer.receive_data(b'POST / HTTP/1.1\r\nContent-Length: 10\r\n\r\n0123456789')
+
+        framer.start_body(framer.next_head()[2])
+        assert [framer.next_body_data(4) for _ in range(4)] == [b'0123', b'4567', b'89', None]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_header_size(self):
+        framer = HTTPFramer(max_header_size=64)
+        framer.receive_data(b'GET / HTTP/1.1\r\n' + b'X-Long: ' + b'x' * 64)
+
+        with self.assertRaises(HTTPConnectionError):
+            framer.next_head()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_invalid_framing(self):
+        for head, body in (
+                (b'Content-Length: -1', b''),
+                (b'Content-Length: 0x10', b''),
+                (b'Transfer-Encoding: chunked', b'+4\r\nabcd\r\n0\r\n\r\n'),
+                (b'Transfer-Encoding: chunked', b'4\r\nabcdef\r\n0\r\n\r\n'),
+        ):
+            with self.assertRaises(HTTPConnectionError):
+                self.frame(b'POST / HTTP/1.1\r\n' + head + b'\r\n\r\n' + body)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_transfer_encoding(self):
+        for value in ('chunked', 'Chunked', 'gzip, chunked', 'gzip,chunked ', ', chunked'):
+            assert is_chunked({'Transfer-Encoding': value}), value
+        assert not is_chunked(dict())
+
+        # -- chunked has to be the last coding, or the end of the body can't be found.
+        for value in ('', 'gzip', 'xchunked', 'chunked, gzip', 'chunked, chunked', 'chunked;q=1'):
+            with self.assertRaises(BadRequestError):
+                is_chunked({'Transfer-Encoding': value})
+
+        # -- a proxy may go by either one, so sending both is never safe.
+        with self.assertRaises(BadRequestError):
+            is_chunked({'Transfer-Encoding': 'chunked', 'Content-Length': '4'})
+
+        with self.assertRaises(BadRequestError):
+            self.frame(b'POST / HTTP/1.1\r\nContent-Length: 4\r\nTransfer-Encoding: chunked\r\n\r\n0\r\n\r\n')
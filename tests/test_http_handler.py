@@ -1,9 +1,64 @@
+import os
+import time
+import shutil
+import socket
 import clacks
+import tempfile
 import requests
 import unittest
 import clacks_web
 
 
+# ----------------------------------------------------------------------------------------------------------------------
+class HandlerTestInterface(clacks.ServerInterface):
+
+    calls = dict()
+    revision = 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        return self.calls[name]
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def _asset_version(self, id, **_):
+        return '%s-%s' % (id, self.revision)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @clacks_web.get('/assets/{id:int}', version=_asset_version)
+    def get_asset(self, id, **_):
+        self._count('get_asset')
+        return {'id': id}
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @clacks_web.get('/report', etag='strong')
+    def report(self, **_):
+        self._count('report')
+        return 'report'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @clacks_web.get('/counter', cache=dict(name='handler_test', ttl=60))
+    def counter(self, **_):
+        return self._count('counter')
+
+
+clacks.register_server_interface_type('handler_test', HandlerTestInterface)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class StaticTestInterface(clacks_web.ClacksStaticFilesInterface):
+
+    root = None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def __init__(self):
+        # -- files over 1KB are sent from disk rather than from memory.
+        super(StaticTestInterface, self).__init__(root=self.root, max_file_size=1024)
+
+
+clacks.register_server_interface_type('handler_static_test', StaticTestInterface)
+
+
 # ----------------------------------------------------------------------------------------------------------------------
 class TestHTTPHandler(unittest.TestCase):
 
@@ -64,6 +119,20 @@ class TestHTTPHandler(unittest.TestCase):
         server.start()
         client = self.create_proxy(server)
 
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_content_type_default(self):
+        handler = self.create_handler()
+
+        # -- Accept-Encoding is left to the content codings the client actually accepts, in both directions.
+        header_data = handler._build_question_header('GET /users HTTP/1.1', {'Accept-Encoding': 'gzip'})
+        assert header_data['Accept-Encoding'] == 'gzip'
+        assert handler._build_question_header('GET /users HTTP/1.1', dict())['_content_type'] == 'text/json'
+        assert 'Accept-Encoding' not in handler._build_question_header('GET /users HTTP/1.1', dict())
+
+        response = clacks.core.package.Response({'response': None})
+        response.content_length = 0
+        assert 'Accept-Encoding' not in handler._get_header_data('id', response, dict())
+
     # ------------------------------------------------------------------------------------------------------------------
     def test_requests(self):
         server = self.create_server()
@@ -78,3 +147,125 @@ class TestHTTPHandler(unittest.TestCase):
         _ = response.json()
 
         response.raise_for_status()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestHTTPHandlerResponses(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def setUpClass(cls):
+        cls.root = tempfile.mkdtemp()
+        for name, data in (('small.txt', b'0123456789'), ('large.bin', bytes(range(256)) * 16)):
+            with open(os.path.join(cls.root, name), 'wb') as fp:
+                fp.write(data)
+        StaticTestInterface.root = cls.root
+
+        cls.port = clacks.get_new_port('localhost')
+        cls.server = clacks_web.simple_rest_api(identifier='testing', host='localhost', port=cls.port)
+        cls.server.register_interface_by_key(interface_type='handler_test')
+        cls.server.register_interface_by_key(interface_type='handler_static_test')
+        cls.server.register_adapter('conditional', clacks_web.ConditionalGetAdapter())
+        cls.server.start(blocking=False)
+
+        time.sleep(1)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.end()
+        shutil.rmtree(cls.root, ignore_errors=True)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def get(self, path, **headers):
+        return requests.get('http://localhost:%s%s' % (self.port, path), headers=headers)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_not_modified(self):
+        response = self.get('/assets/1')
+        response.raise_for_status()
+
+        assert response.headers['ETag'] == '"1-1"'
+        assert response.json()['response'] == {'id': 1}
+        assert HandlerTestInterface.calls['get_asset'] == 1
+
+        # -- the version tells the client is up to date, so the resource isn't called and no body is sent.
+        response = self.get('/assets/1', **{'If-None-Match': '"1-1"'})
+
+        assert response.status_code == 304
+        assert response.headers['ETag'] == '"1-1"'
+        assert 'Content-Length' not in response.headers
+        assert response.content == b''
+        assert HandlerTestInterface.calls['get_asset'] == 1
+
+        assert self.get('/assets/2', **{'If-None-Match': '"1-1"'}).status_code == 200
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_not_modified_hashed(self):
+        etag = self.get('/report').headers['ETag']
+
+        # -- without a version the resource is called to hash its body, which is still not sent.
+        response = self.get('/report', **{'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert response.content == b''
+        assert HandlerTestInterface.calls['report'] == 2
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_response_cache(self):
+        first = self.get('/counter')
+        second = self.get('/counter')
+
+        # -- the second response is sent as it was marshalled the first time, without calling the resource.
+        assert first.json()['response'] == second.json()['response'] == 1
+        assert first.content == second.content
+        assert HandlerTestInterface.calls['counter'] == 1
+
+        assert clacks_web.get_response_cache('handler_test').invalidate('/counter') == 1
+        assert self.get('/counter').json()['response'] == 2
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_range(self):
+        # -- small files are sent from memory, large ones with sendfile, both honour the range.
+        response = self.get('/static/small.txt', Range='bytes=2-4')
+
+        assert response.status_code == 206
+        assert response.headers['Content-Range'] == 'bytes 2-4/10'
+        assert response.content == b'234'
+
+        response = self.get('/static/large.bin', Range='bytes=-3')
+
+        assert response.status_code == 206
+        assert response.headers['Content-Range'] == 'bytes 4093-4095/4096'
+        assert response.content == b'\xfd\xfe\xff'
+
+        response = self.get('/static/small.txt', Range='bytes=20-')
+
+        assert response.status_code == 416
+        assert response.headers['Content-Range'] == 'bytes */10'
+        assert response.content == b''
+
+        response = self.get('/static/small.txt')
+
+        assert response.status_code == 200
+        assert response.content == b'0123456789'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_ambiguous_framing(self):
+        # -- a proxy in front of us might go by the Content-Length, so the request is rejected rather than guessed at.
+        client = socket.create_connection(('localhost', self.port))
+        client.sendall(
+            b'POST /counter HTTP/1.1\r\nHost: localhost\r\nTransfer-Encoding: chunked\r\nContent-Length: 4\r\n\r\n'
+            b'0\r\n\r\n'
+        )
+
+        response = b''
+        data = client.recv(4096)
+        while data:
+            response += data
+            data = client.recv(4096)
+        client.close()
+
+        assert response.split(b'\r\n', 1)[0].endswith(b' 400 Bad Request')
+        assert b'Connection: close' in response
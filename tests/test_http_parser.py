@@ -0,0 +1,101 @@
+import unittest
+
+from clacks_web.core.http_parser import HeaderMap, parse_header_block, split_request_line, parse_query_string
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestHTTPParser(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_parse_crlf(self):
+        start_line, headers = parse_header_block(
+            b'GET /users?id=1 HTTP/1.1\r\nHost: localhost\r\nContent-Type: text/json\r\n\r\n'
+        )
+
+        assert start_line == 'GET /users?id=1 HTTP/1.1'
+        assert headers == {'Host': 'localhost', 'Content-Type': 'text/json'}
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_parse_bare_lf_and_body(self):
+        _, headers = parse_header_block(b'GET / HTTP/1.1\nHost: localhost\n\nNot-A-Header: body')
+
+        assert headers == {'Host': 'localhost'}
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_case_insensitive(self):
+        _, headers = parse_header_block(b'GET / HTTP/1.1\r\ncontent-type:text/json\r\n\r\n')
+
+        assert headers['Content-Type'] == 'text/json'
+        assert headers['CONTENT-TYPE'] == 'text/json'
+        assert 'content-type' in headers
+        assert headers.get('Accept') is None
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_multi_value(self):
+        _, headers = parse_header_block(b'GET / HTTP/1.1\r\nAccept: text/html\r\naccept: text/json\r\n\r\n')
+
+        assert headers['Accept'] == 'text/html, text/json'
+        assert headers.getall('ACCEPT') == ['text/html', 'text/json']
+
+        headers['Accept'] = '*/*'
+        assert headers.getall('Accept') == ['*/*']
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_header_map_is_dict(self):
+        headers = HeaderMap({'Content-Type': 'text/json'})
+        headers['kwargs'] = dict()
+
+        del headers['kwargs']
+        assert headers.pop('content-type') == 'text/json'
+        assert not headers
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_only_crlf_ends_lines(self):
+        # -- characters python's str.splitlines breaks on, none of which may start a header of their own.
+        for separator in (b'\x85', b'\x1c', b'\x1e', b'\x0b', b'\x0c'):
+            _, headers = parse_header_block(b'GET / HTTP/1.1\r\nX-Name: a' + separator + b'Admin: true\r\n\r\n')
+
+            assert 'Admin' not in headers
+            assert headers['X-Name'] == ('a' + separator.decode('latin-1') + 'Admin: true')
+
+        # -- a bare CR is not a line ending either.
+        _, headers = parse_header_block(b'GET / HTTP/1.1\r\nX-Name: a\rAdmin: true\r\n\r\n')
+        assert headers == {'X-Name': 'a Admin: true'}
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_slow_path_matches_fast_path(self):
+        fast = parse_header_block(b'GET / HTTP/1.1\r\nHost: localhost \t\r\nAccept:  */*\r\n\r\n')
+        slow = parse_header_block(b'GET / HTTP/1.1\nHost: localhost \t\nAccept:  */*\n\n')
+        assert fast == slow == ('GET / HTTP/1.1', {'Host': 'localhost', 'Accept': '*/*'})
+
+        # -- whitespace before the colon, folded lines.
+        _, headers = parse_header_block(b'GET / HTTP/1.1\r\nHost : evil\r\nX-Long: a\r\n  b\r\nHost: localhost\r\n\r\n')
+        assert headers == {'X-Long': 'a b', 'Host': 'localhost'}
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_case_insensitive_writes(self):
+        _, headers = parse_header_block(b'GET / HTTP/1.1\r\nContent-Type: text/json\r\n\r\n')
+
+        headers['content-type'] = 'text/html'
+        assert headers == {'Content-Type': 'text/html'}
+
+        assert headers.setdefault('CONTENT-TYPE', 'text/plain') == 'text/html'
+        headers.update({'content-TYPE': 'text/plain'}, accept='*/*')
+        assert headers == {'Content-Type': 'text/plain', 'accept': '*/*'}
+
+        # -- names set in another casing are found under any casing too.
+        headers['ACCEPT'] = 'text/json'
+        assert headers['Accept'] == headers['accept'] == 'text/json'
+        assert headers.pop('Accept') == 'text/json'
+        assert 'accept' not in headers
+
+        headers = HeaderMap({'x-request-id': '1'})
+        assert headers['X-Request-Id'] == '1'
+        assert headers.copy()['X-REQUEST-ID'] == '1'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_request_line(self):
+        assert split_request_line('GET /users?id=1&name=foo HTTP/1.1') == ('GET', '/users', 'id=1&name=foo', 'HTTP/1.1')
+        assert split_request_line('POST /users HTTP/1.1') == ('POST', '/users', '', 'HTTP/1.1')
+        assert parse_query_string('id=1&name=foo') == {'id': '1', 'name': 'foo'}
+        assert parse_query_string('') == dict()
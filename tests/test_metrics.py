@@ -0,0 +1,86 @@
+import threading
+import unittest
+
+from clacks_web.core.metrics import MetricsRegistry, UNMATCHED_ROUTE, OTHER_METHOD
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestMetricsRegistry(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def record(self, registry, method, route, status, duration):
+        started = registry.start(method)
+        registry.finish(method, route, status, started - duration)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_counts(self):
+        registry = MetricsRegistry(buckets=(0.01, 0.1))
+
+        self.record(registry, 'GET', '/users/{id:int}', 200, 0.005)
+        self.record(registry, 'GET', '/users/{id:int}', 200, 0.05)
+        self.record(registry, 'GET', '/users/{id:int}', 404, 5.0)
+        self.record(registry, 'GET', None, 404, 0.001)
+
+        started = registry.start('POST')
+
+        stats = registry.as_dict()
+        assert stats['routes']['GET /users/{id:int}']['requests'] == 3
+        assert stats['routes']['GET /users/{id:int}']['statuses'] == {'200': 2, '404': 1}
+        assert stats['routes']['GET %s' % UNMATCHED_ROUTE]['requests'] == 1
+        assert stats['in_flight'] == {'GET': 0, 'POST': 1}
+
+        registry.finish('POST', '/users', 201, started)
+        assert registry.as_dict()['in_flight']['POST'] == 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_unknown_methods(self):
+        registry = MetricsRegistry()
+
+        # -- made up methods would otherwise each add a series of their own.
+        for index in range(10):
+            self.record(registry, 'FOO%d' % index, None, 405, 0.001)
+
+        stats = registry.as_dict()
+        assert list(stats['routes']) == ['%s %s' % (OTHER_METHOD, UNMATCHED_ROUTE)]
+        assert stats['routes']['%s %s' % (OTHER_METHOD, UNMATCHED_ROUTE)]['requests'] == 10
+        assert stats['in_flight'] == {OTHER_METHOD: 0}
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_render(self):
+        registry = MetricsRegistry(buckets=(0.01, 0.1))
+        self.record(registry, 'GET', '/users/{id:int}', 200, 0.005)
+        self.record(registry, 'GET', '/users/{id:int}', 200, 0.05)
+        self.record(registry, 'GET', '/users/{id:int}', 500, 5.0)
+        self.record(registry, 'GET', '/say/"hi"', 200, 0.001)
+
+        lines = registry.render().splitlines()
+        labels = 'method="GET",route="/users/{id:int}"'
+
+        assert 'clacks_web_requests_total{%s,status="200"} 2' % labels in lines
+        assert 'clacks_web_requests_total{%s,status="500"} 1' % labels in lines
+        assert 'clacks_web_request_duration_seconds_bucket{%s,le="0.01"} 1' % labels in lines
+        assert 'clacks_web_request_duration_seconds_bucket{%s,le="0.1"} 2' % labels in lines
+        assert 'clacks_web_request_duration_seconds_bucket{%s,le="+Inf"} 3' % labels in lines
+        assert 'clacks_web_request_duration_seconds_count{%s} 3' % labels in lines
+        assert 'clacks_web_requests_in_flight{method="GET"} 0' in lines
+        assert 'clacks_web_requests_total{method="GET",route="/say/\\"hi\\"",status="200"} 1' in lines
+        assert '# TYPE clacks_web_request_duration_seconds histogram' in lines
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_threads(self):
+        registry = MetricsRegistry()
+
+        def serve():
+            for _ in range(1000):
+                self.record(registry, 'GET', '/ping', 200, 0.0001)
+
+        # -- a thread per connection, like the threaded handler, shards of finished threads are folded together.
+        for _ in range(5):
+            threads = [threading.Thread(target=serve) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert registry.as_dict()['routes']['GET /ping']['requests'] == 20000
+        assert len(registry._shards) <= 1
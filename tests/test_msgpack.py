@@ -0,0 +1,53 @@
+import json
+import unittest
+
+from clacks_web.core.msgpack_codec import pack, unpack, unpackb, packb, MessagePackError
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestMessagePackCodec(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_known_encodings(self):
+        assert pack({'a': 1}) == b'\x81\xa1a\x01'
+        assert pack([None, True, False]) == b'\x93\xc0\xc3\xc2'
+        assert pack(-1) == b'\xff'
+        assert pack(-33) == b'\xd0\xdf'
+        assert pack(255) == b'\xcc\xff'
+        assert pack(65536) == b'\xce\x00\x01\x00\x00'
+        assert pack(1.5) == b'\xcb\x3f\xf8\x00\x00\x00\x00\x00\x00'
+        assert pack(b'\x00\x01') == b'\xc4\x02\x00\x01'
+        assert pack('x' * 40)[:2] == b'\xd9\x28'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_round_trip(self):
+        values = [
+            0, 127, 128, -32, -129, 2 ** 16, 2 ** 32, 2 ** 63, -2 ** 63, 0.25, -1e300,
+            '', 'J\xfcrgen', 'x' * 300, 'y' * 70000, b'', b'\xff' * 300,
+            [], list(range(20)), dict(), dict(('key%d' % i, i) for i in range(20)),
+            {'nested': {'list': [1, 'two', None, [3.0]], 'flag': True}},
+        ]
+
+        for value in values:
+            assert unpack(pack(value)) == value, value
+            assert unpackb(packb(value)) == value, value
+
+        assert unpack(pack((1, 2))) == [1, 2]
+        assert unpack(b'\xca\x3f\xc0\x00\x00') == 1.5
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_malformed(self):
+        for data in (b'', b'\x92\x01', b'\xa5abc', b'\xc1', b'\x01\x02', b'\xa2\xff\xfe', b'\x81\x80\x01'):
+            with self.assertRaises(MessagePackError):
+                unpack(data)
+
+        with self.assertRaises(MessagePackError):
+            unpack(b'\x91' * 100000)
+
+        with self.assertRaises(TypeError):
+            pack(object())
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_smaller_than_json(self):
+        rows = [{'id': i, 'name': 'asset_%d' % i, 'visible': i % 2 == 0, 'scale': i / 7.0} for i in range(100)]
+        assert len(pack({'response': rows})) < len(json.dumps({'response': rows}).encode('utf-8'))
@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from clacks_web.core.multipart import (
+    MultipartParser,
+    MultipartError,
+    MultipartLimitError,
+    get_boundary,
+    sanitize_filename,
+)
+
+
+BODY = (
+    b'--XyZ\r\n'
+    b'Content-Disposition: form-data; name="command"\r\n'
+    b'\r\n'
+    b'upload\r\n'
+    b'--XyZ\r\n'
+    b'content-disposition: form-data; name="image"; filename="../../textures/albedo.png"\r\n'
+    b'Content-Type: image/png\r\n'
+    b'\r\n'
+    b'\x89PNG\r\n--Xy not quite a boundary\r\n'
+    b'--XyZ--\r\n'
+)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestMultipartParser(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.spool_dir)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def parse(self, chunk_size, **kwargs):
+        parser = MultipartParser('XyZ', self.spool_dir, **kwargs)
+        for i in range(0, len(BODY), chunk_size):
+            parser.feed(BODY[i:i + chunk_size])
+        return parser.close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_get_boundary(self):
+        assert get_boundary('multipart/form-data; boundary=XyZ') == 'XyZ'
+        assert get_boundary('multipart/form-data; charset=utf-8; boundary="XyZ"') == 'XyZ'
+        assert get_boundary('multipart/form-data') == ''
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_parse(self):
+        # -- the result must not depend on how the body is split up as it comes off the socket.
+        for chunk_size in (1, 7, 64, len(BODY)):
+            fields = self.parse(chunk_size)
+
+            assert fields['command'] == 'upload'
+
+            # -- client-provided directories are never used.
+            assert fields['image'] == os.path.join(self.spool_dir, 'albedo.png')
+
+            with open(fields['image'], 'rb') as fp:
+                assert fp.read() == b'\x89PNG\r\n--Xy not quite a boundary'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_limits(self):
+        with self.assertRaises(MultipartLimitError):
+            self.parse(16, max_part_size=8)
+
+        # -- the partially written upload is cleaned up.
+        assert not os.listdir(self.spool_dir)
+
+        with self.assertRaises(MultipartLimitError):
+            self.parse(16, max_total_size=64)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_sanitize_filename(self):
+        assert sanitize_filename('../../textures/albedo.png') == 'albedo.png'
+        assert sanitize_filename('C:\\textures\\albedo.png') == 'albedo.png'
+
+        # -- names that don't name a file fall back to the default, which can't escape the directory either.
+        for filename in ('', '.', '..', 'textures/..', 'textures/'):
+            assert sanitize_filename(filename, 'image') == 'image'
+        assert sanitize_filename('..', '../..') == 'upload'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_repeated(self):
+        body = (
+            b'--XyZ\r\nContent-Disposition: form-data; name="tag"\r\n\r\na\r\n'
+            b'--XyZ\r\nContent-Disposition: form-data; name="tag"\r\n\r\nb\r\n'
+            b'--XyZ\r\nContent-Disposition: form-data; name="image"; filename="a.png"\r\n\r\n1\r\n'
+            b'--XyZ\r\nContent-Disposition: form-data; name="image"; filename="..\\a.png"\r\n\r\n2\r\n'
+            b'--XyZ--\r\n'
+        )
+
+        parser = MultipartParser('XyZ', self.spool_dir)
+        parser.feed(body)
+        fields = parser.close()
+
+        # -- repeated names hold all their values, uploads with the same file name don't overwrite each other.
+        assert fields['tag'] == ['a', 'b']
+        assert fields['image'] == [os.path.join(self.spool_dir, 'a.png'), os.path.join(self.spool_dir, 'a-2.png')]
+
+        for path, data in zip(fields['image'], (b'1', b'2')):
+            with open(path, 'rb') as fp:
+                assert fp.read() == data
+
+        parser = MultipartParser('XyZ', self.spool_dir, max_parts=3)
+        with self.assertRaises(MultipartLimitError):
+            parser.feed(body)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_invalid_encoding(self):
+        parser = MultipartParser('XyZ', self.spool_dir)
+
+        # -- the client gets a 400 for this, rather than the connection being dropped.
+        with self.assertRaises(MultipartError):
+            parser.feed(b'--XyZ\r\nContent-Disposition: form-data; name="tag"\r\n\r\n\xff\xfe\r\n--XyZ--\r\n')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_truncated(self):
+        parser = MultipartParser('XyZ', self.spool_dir)
+        parser.feed(BODY[:-10])
+
+        with self.assertRaises(MultipartError):
+            parser.close()
@@ -0,0 +1,106 @@
+import os
+import time
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import unittest
+
+from clacks_web.core.prefork import PreforkServer, aggregate_stats
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class PidHandler(object):
+    """
+    Minimal handler answering every connection with the pid of the worker serving it.
+    """
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def handle_connection(self, connection, address):
+        connection.sendall(str(os.getpid()).encode())
+        connection.close()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+@unittest.skipUnless(hasattr(os, 'fork'), 'Pre-fork mode requires os.fork')
+class TestPrefork(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.stats_dir = tempfile.mkdtemp()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.stats_dir, ignore_errors=True)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def request(self, port):
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as client:
+            return int(client.recv(64))
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def wait_for(self, condition, timeout=10.0):
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() > deadline:
+                self.fail('Timed out')
+            time.sleep(0.05)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_restart_and_drain(self):
+        server = PreforkServer(
+            PidHandler,
+            '127.0.0.1',
+            0,
+            workers=2,
+            drain_timeout=2.0,
+            restart_delay=0.1,
+            stats_dir=self.stats_dir,
+        )
+        server.start()
+        thread = threading.Thread(target=server.serve_forever, kwargs=dict(poll_interval=0.05))
+        thread.start()
+
+        try:
+            assert len(server.pids) == 2
+            assert self.request(server.port) in server.pids
+
+            # -- a crashed worker is replaced, and the port keeps being served.
+            crashed = next(iter(server.pids))
+            os.kill(crashed, signal.SIGKILL)
+            self.wait_for(lambda: server.restarts == 1 and len(server.pids) == 2)
+            assert crashed not in server.pids
+            assert self.request(server.port) in server.pids
+
+        finally:
+            pids = list(server.pids)
+            server.stop()
+            thread.join(10)
+
+        # -- every worker exited by itself, after writing its final stats.
+        assert not thread.is_alive()
+        assert not server.pids
+        for pid in pids:
+            with self.assertRaises(ProcessLookupError):
+                os.kill(pid, 0)
+
+        assert sorted(server.stats()['workers']) == ['0', '1']
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_aggregate_stats(self):
+        for index, (opened, requests) in enumerate([(2, 6), (1, 2)]):
+            with open(os.path.join(self.stats_dir, '%s.json' % index), 'w') as fp:
+                fp.write('{"connection_stats": {"connections_opened": %s, "requests": %s}}' % (opened, requests))
+
+        # -- half-written and foreign files are ignored.
+        with open(os.path.join(self.stats_dir, '2.json'), 'w') as fp:
+            fp.write('{"connection_st')
+        with open(os.path.join(self.stats_dir, '0.json.1234.tmp'), 'w') as fp:
+            fp.write('{}')
+
+        stats = aggregate_stats(self.stats_dir)
+        assert stats['connections_opened'] == 3
+        assert stats['requests'] == 8
+        assert stats['requests_per_connection'] == 8 / 3.0
+        assert sorted(stats['workers']) == ['0', '1']
@@ -0,0 +1,72 @@
+import unittest
+
+from clacks_web.core.response_cache import ResponseCache, MarshalledBody, get_response_cache, make_response_cache
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestResponseCache(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_key(self):
+        cache = ResponseCache(kwargs=['fields'], headers=['Accept'])
+
+        key = cache.make_key('/assets/1', {'fields': 'name', 'page': 2}, {'Accept': 'text/json', 'User-Agent': 'x'})
+        other = cache.make_key('/assets/1', {'fields': 'name', 'page': 3}, {'Accept': 'text/json', 'User-Agent': 'y'})
+
+        # -- only the selected kwargs and headers make up the key.
+        assert key == other
+        assert key != cache.make_key('/assets/1', {'fields': 'id'}, {'Accept': 'text/json'})
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_get_put(self):
+        cache = ResponseCache(ttl=10, max_entries=2)
+
+        assert cache.get('a', now=0) is None
+        cache.put(('/a', (), ()), b'a', now=0)
+
+        body = cache.get(('/a', (), ()), now=5)
+        assert body == b'a'
+        assert isinstance(body, MarshalledBody)
+
+        # -- expired.
+        assert cache.get(('/a', (), ()), now=11) is None
+
+        cache.put(('/a', (), ()), b'a', now=0)
+        cache.put(('/b', (), ()), b'b', now=0)
+        cache.get(('/a', (), ()), now=0)
+        cache.put(('/c', (), ()), b'c', now=0)
+
+        # -- /b was the least recently used.
+        assert cache.get(('/b', (), ()), now=0) is None
+        assert len(cache) == 2
+
+        stats = cache.as_dict()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 3
+        assert stats['expired'] == 1
+        assert stats['evictions'] == 1
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_invalidate(self):
+        cache = make_response_cache(dict(name='assets', kwargs=['fields']))
+        assert get_response_cache('assets') is cache
+
+        cache.put(('/assets/1', ('name',), ()), b'1')
+        cache.put(('/assets/1', ('id',), ()), b'1')
+        cache.put(('/assets/2', ('name',), ()), b'2')
+
+        assert cache.invalidate('/assets/1') == 2
+        assert cache.invalidate('/assets/1') == 0
+        assert len(cache) == 1
+
+        assert cache.invalidate() == 1
+        assert len(cache) == 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_make_response_cache(self):
+        assert make_response_cache(None) is None
+        assert make_response_cache(30).ttl == 30
+        assert make_response_cache(True).ttl == ResponseCache.DEFAULT_TTL
+
+        cache = ResponseCache()
+        assert make_response_cache(cache) is cache
@@ -0,0 +1,83 @@
+import uuid
+import unittest
+
+from clacks_web.core.router import ResourceRouter
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestResourceRouter(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    @classmethod
+    def create_router(cls):
+        router = ResourceRouter()
+        router.add('/users', 'list_users')
+        router.add('/users/{id:int}', 'get_user')
+        router.add('/users/me', 'get_me')
+        router.add('/users/{name}', 'get_user_by_name')
+        router.add('/users/{id:int}/posts/{post:uuid}', 'get_post')
+        router.add('/files/{file_path:path}', 'get_file')
+        return router
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_typed_parameters(self):
+        router = self.create_router()
+
+        assert router.match('/users/42') == ('get_user', {'id': 42})
+        assert router.match('/users/alice') == ('get_user_by_name', {'name': 'alice'})
+
+        post = uuid.uuid4()
+        assert router.match('/users/42/posts/%s' % post) == ('get_post', {'id': 42, 'post': post})
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_float_parameter(self):
+        router = ResourceRouter()
+        router.add('/scale/{factor:float}', 'scale')
+
+        for segment, factor in (('1.5', 1.5), ('-2', -2.0), ('3.', 3.0), ('.25', 0.25)):
+            assert router.match('/scale/%s' % segment) == ('scale', {'factor': factor})
+
+        for segment in ('nan', 'inf', '-Infinity', '1_0', '1e999', '+1', ' 1', '1.2.3', '-', '.'):
+            assert router.match('/scale/%s' % segment) == (None, None), segment
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_static_segments_take_precedence(self):
+        router = self.create_router()
+
+        assert router.match('/users/me') == ('get_me', dict())
+        assert router.match('/users') == ('list_users', dict())
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_path_parameter(self):
+        router = self.create_router()
+
+        assert router.match('/files/textures/wood/albedo.png') == (
+            'get_file', {'file_path': 'textures/wood/albedo.png'}
+        )
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_no_match(self):
+        router = self.create_router()
+
+        assert router.match('/users/42/posts/not-a-uuid') == (None, None)
+        assert router.match('/groups/1') == (None, None)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_invalid_templates(self):
+        router = ResourceRouter()
+
+        with self.assertRaises(ValueError):
+            router.add('/users/{id:bogus}', None)
+
+        with self.assertRaises(ValueError):
+            router.add('/files/{file_path:path}/meta', None)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_paths(self):
+        router = self.create_router()
+        router.add('/users/{id:int}', 'get_user_again')
+
+        assert router.paths == [
+            '/users', '/users/{id:int}', '/users/me', '/users/{name}', '/users/{id:int}/posts/{post:uuid}',
+            '/files/{file_path:path}',
+        ]
@@ -31,3 +31,26 @@ class TestSimpleRestAPI(unittest.TestCase):
     # ------------------------------------------------------------------------------------------------------------------
     def test_simple_rest_api(self):
         _ = clacks_web.simple_rest_api(identifier='testing', host='localhost', port=6001)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_batch(self):
+        api = clacks_web.simple_rest_api(identifier='testing', host='localhost', port=6002)
+        api.start(blocking=False)
+
+        time.sleep(1)
+
+        operations = [
+            {'method': 'GET', 'path': '/'},
+            {'method': 'GET', 'path': '/does_not_exist'},
+            {'method': 'POST', 'path': '/_batch', 'kwargs': {'operations': []}},
+        ]
+
+        response = requests.post('http://localhost:6002/_batch', json={'operations': operations, 'parallel': True})
+        response.raise_for_status()
+
+        results = response.json()['response']
+
+        api.end()
+
+        assert [result['status'] for result in results] == [200, 404, 400]
+        assert 'POST' in results[0]['response']
@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import unittest
+
+from clacks_web.core.streaming import is_stream, is_async_stream
+from clacks_web.core.sse import EventSource, Event, GeneratorEventStream, encode_event, event_stream, HEARTBEAT
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestSSE(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_encode_event(self):
+        assert encode_event('hello') == b'data: hello\n\n'
+        assert encode_event('a\nb', event='update', id=3) == b'event: update\nid: 3\ndata: a\ndata: b\n\n'
+        assert encode_event({'x': 1}, retry=500) == b'retry: 500\ndata: {"x": 1}\n\n'
+
+        # -- every line ending the client splits on is a line ending here, so data can't inject fields.
+        assert encode_event('a\r\nb\rid: 9\n') == b'data: a\ndata: b\ndata: id: 9\ndata: \n\n'
+        assert encode_event('a\x85b') == 'data: a\x85b\n\n'.encode('utf-8')
+
+        for kwargs in ({'event': 'update\ndata: x'}, {'id': '3\r'}):
+            with self.assertRaises(ValueError):
+                encode_event('hello', **kwargs)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_fan_out(self):
+        source = EventSource(heartbeat=5.0)
+        subscriptions = [source.subscribe() for _ in range(20)]
+        assert all(is_stream(subscription) and is_async_stream(subscription) for subscription in subscriptions)
+
+        received = [list() for _ in subscriptions]
+
+        def read(subscription, into):
+            for frame in subscription:
+                into.append(frame)
+
+        threads = [threading.Thread(target=read, args=args) for args in zip(subscriptions, received)]
+        for thread in threads:
+            thread.start()
+
+        events = [source.publish({'n': n}, event='tick') for n in range(5)]
+        source.close()
+
+        for thread in threads:
+            thread.join(5.0)
+            assert not thread.is_alive()
+
+        # -- every client gets the same, once encoded bytes, possibly coalesced into fewer writes.
+        expected = b''.join(event.encoded for event in events)
+        assert all(b''.join(frames) == expected for frames in received)
+        assert source.as_dict()['published'] == 5
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_resume_and_heartbeat(self):
+        source = EventSource(replay_size=3, heartbeat=0.05, retry=1000)
+        for n in range(5):
+            source.publish(n)
+
+        subscription = source.subscribe()
+        subscription.resume('3')
+        assert next(subscription) == b'retry: 1000\n\n' + b'id: 4\ndata: 3\n\nid: 5\ndata: 4\n\n'
+        assert next(subscription) == HEARTBEAT
+
+        # -- events that fell out of the ring can't be replayed, the client gets what is left.
+        subscription = source.subscribe()
+        subscription.resume('1')
+        assert next(subscription).count(b'data:') == 3
+
+        subscription = source.subscribe()
+        subscription.resume('not an id')
+        assert next(subscription) == b'retry: 1000\n\n' + HEARTBEAT
+
+        subscription.close()
+        assert subscription not in source.subscriptions
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_async(self):
+        source = EventSource(heartbeat=1.0)
+
+        async def main():
+            subscription = source.subscribe()
+            loop = asyncio.get_running_loop()
+
+            # -- published from another thread, while the subscriber waits on the loop.
+            loop.call_later(0.05, lambda: threading.Thread(target=source.publish, args=('hi',)).start())
+            frame = await subscription.__anext__()
+
+            source.close()
+            frames = [item async for item in subscription]
+            return frame, frames
+
+        frame, frames = asyncio.run(main())
+        assert frame == b'id: 1\ndata: hi\n\n'
+        assert frames == []
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_event_stream(self):
+        @event_stream
+        def resource(count):
+            for n in range(count):
+                yield None if n == 1 else n
+            yield Event('done', event='end')
+
+        stream = resource(3)
+        assert isinstance(stream, GeneratorEventStream)
+        assert list(stream) == [b'data: 0\n\n', HEARTBEAT, b'data: 2\n\n', b'event: end\ndata: done\n\n']
+        assert stream.headers['Content-Type'] == 'text/event-stream'
@@ -0,0 +1,114 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from clacks_web.core.conditional import format_http_date
+from clacks_web.core.static_files import StaticFiles, parse_range, RangeNotSatisfiable
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestStaticFiles(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'css'))
+
+        self.write('css/site.css', b'body { color: red; }')
+        self.write('index.html', b'<html></html>')
+        self.write('large.bin', os.urandom(4096))
+
+        self.static_files = StaticFiles(self.root, max_file_size=1024)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def write(self, path, data):
+        with open(os.path.join(self.root, path), 'wb') as fp:
+            fp.write(data)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_parse_range(self):
+        assert parse_range('bytes=0-99', 1000) == (0, 99)
+        assert parse_range('bytes=900-', 1000) == (900, 999)
+        assert parse_range('bytes=-100', 1000) == (900, 999)
+        assert parse_range('bytes=990-2000', 1000) == (990, 999)
+
+        # -- malformed, multiple and non-byte ranges are ignored.
+        assert parse_range('bytes=5-3', 1000) is None
+        assert parse_range('bytes=a-b', 1000) is None
+        assert parse_range('bytes=0-1,5-6', 1000) is None
+        assert parse_range('lines=0-1', 1000) is None
+
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=1000-', 1000)
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=-0', 1000)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_open(self):
+        small = self.static_files.open('css/site.css')
+        assert bytes(small.data) == b'body { color: red; }'
+        assert small.headers['Content-Type'] == 'text/css'
+        assert small.headers['ETag'] == small.etag
+
+        # -- large files are sent from disk, only their headers are cached.
+        assert self.static_files.open('large.bin').data is None
+
+        assert self.static_files.open('/css/site.css') is small
+        assert self.static_files.open('').path.endswith('index.html')
+
+        stats = self.static_files.as_dict()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 3
+        assert stats['bytes'] == len(small.data) + len(b'<html></html>')
+
+        # -- changed files are picked up straight away.
+        self.write('css/site.css', b'body { color: blue; }')
+        changed = self.static_files.open('css/site.css')
+        assert bytes(changed.data) == b'body { color: blue; }'
+        assert changed.etag != small.etag
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_truncated(self):
+        small = self.static_files.open('css/site.css')
+
+        # -- a file truncated in place while it is cached, or being sent, can still be read from the cache.
+        with open(os.path.join(self.root, 'css/site.css'), 'r+b') as fp:
+            fp.truncate(0)
+
+        assert small.data == b'body { color: red; }'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_resolve(self):
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside)
+        os.symlink(outside, os.path.join(self.root, 'link'))
+
+        for path in ('../etc/passwd', 'css/../../etc/passwd', 'link/secret', 'missing.txt', '%2e%2e/etc/passwd',
+                     'css%2f%2E%2E%2F..%2fetc/passwd', 'index.html%00.css'):
+            with self.assertRaises(FileNotFoundError):
+                self.static_files.open(path)
+
+        # -- requested paths are percent-encoded.
+        self.write('my file \u00e9.css', b'body {}')
+        assert self.static_files.open('my%20file%20%C3%A9.css').path == os.path.join(self.root, 'my file \u00e9.css')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_evaluate(self):
+        static_file = self.static_files.open('large.bin')
+
+        assert static_file.evaluate(dict()) == (200, 0, 4096)
+        assert static_file.evaluate({'Range': 'bytes=100-199'}) == (206, 100, 100)
+        assert static_file.evaluate({'Range': 'bytes=5000-'}) == (416, 0, 0)
+
+        assert static_file.evaluate({'If-None-Match': static_file.etag}) == (304, 0, 0)
+        assert static_file.evaluate({'If-Modified-Since': format_http_date(time.time() + 60)}) == (304, 0, 0)
+
+        # -- ranges only apply to the version of the file the client already has part of.
+        assert static_file.evaluate({'Range': 'bytes=0-9', 'If-Range': static_file.etag}) == (206, 0, 10)
+        assert static_file.evaluate({'Range': 'bytes=0-9', 'If-Range': '"stale"'}) == (200, 0, 4096)
@@ -0,0 +1,44 @@
+import socket
+import unittest
+
+from clacks_web.core.streaming import ChunkedWriter, is_stream, encode_stream_item
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestStreaming(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_is_stream(self):
+        assert is_stream(i for i in range(3))
+        assert is_stream(iter([1, 2, 3]))
+        assert not is_stream([1, 2, 3])
+        assert not is_stream('foo')
+        assert not is_stream({'foo': 'bar'})
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_encode_stream_item(self):
+        assert encode_stream_item(b'raw') == b'raw'
+        assert encode_stream_item('text') == b'text'
+        assert encode_stream_item({'id': 1}) == b'{"id": 1}\n'
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_chunked_writer(self):
+        server, client = socket.socketpair()
+
+        writer = ChunkedWriter(server, chunk_size=4)
+        writer.write(b'ab')
+        writer.write(b'cdef')
+        writer.write(b'g')
+        writer.close()
+        server.close()
+
+        data = b''
+        while True:
+            received = client.recv(1024)
+            if not received:
+                break
+            data += received
+        client.close()
+
+        # -- the first two writes are coalesced into a single chunk, the last one is flushed on close.
+        assert data == b'6\r\nabcdef\r\n1\r\ng\r\n0\r\n\r\n'
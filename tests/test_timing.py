@@ -0,0 +1,93 @@
+import os
+import time
+import shutil
+import pstats
+import tempfile
+import unittest
+
+from clacks_web.core.timing import RequestTimer, NULL_TIMER, ProfileRing, SlowRequestProfiler
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestRequestTimer(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_header_value(self):
+        timer = RequestTimer()
+        timer.mark('parse')
+        time.sleep(0.01)
+        timer.mark('resource')
+        timer.mark('parse')
+
+        stages = [part.split(';dur=') for part in timer.header_value().split(', ')]
+        assert [name for name, _ in stages] == ['parse', 'resource', 'total']
+
+        durations = dict((name, float(value)) for name, value in stages)
+        assert durations['resource'] >= 10.0
+        assert durations['total'] >= durations['parse'] + durations['resource']
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_null_timer(self):
+        NULL_TIMER.mark('parse')
+        assert not NULL_TIMER
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestSlowRequestProfiler(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_ring(self):
+        ring = ProfileRing(self.directory, max_files=3)
+        for index in range(5):
+            with open(ring.path('GET /users/{id:int} %d' % index, '.txt'), 'w') as fh:
+                fh.write('')
+
+        names = sorted(os.listdir(self.directory))
+        assert names == ['000003_GET_users_id_int_2.txt', '000004_GET_users_id_int_3.txt',
+                         '000005_GET_users_id_int_4.txt']
+
+        # -- a new ring picks up where the last one left off.
+        ring = ProfileRing(self.directory, max_files=3)
+        ring.path('GET /', '.txt')
+        assert '000003_GET_users_id_int_2.txt' not in os.listdir(self.directory)
+        assert ring.path('GET /', '.txt').endswith('000007_GET.txt')
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_slow_requests(self):
+        profiler = SlowRequestProfiler(self.directory, threshold=0.05, sample_interval=0.001)
+
+        profile = profiler.begin(dict())
+        time.sleep(0.001)
+        assert profiler.end(profile, 'GET /fast', 0.001) is None
+
+        profile = profiler.begin(dict())
+        deadline = time.time() + 0.1
+        while time.time() < deadline:
+            pass
+        path = profiler.end(profile, 'GET /slow', 0.1)
+
+        assert os.listdir(self.directory) == [os.path.basename(path)]
+        with open(path) as fh:
+            assert 'test_slow_requests' in fh.read()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_debug_header(self):
+        profiler = SlowRequestProfiler(self.directory, threshold=None, debug_header='X-Profile', debug_token='secret')
+
+        assert profiler.begin(dict()) is None
+        assert profiler.begin({'X-Profile': 'guess'}) is None
+
+        profile = profiler.begin({'X-Profile': 'secret'})
+        sum(range(1000))
+        path = profiler.end(profile, 'GET /debug', 0.001)
+
+        assert path.endswith('.prof')
+        assert pstats.Stats(path).total_calls > 0
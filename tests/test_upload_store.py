@@ -0,0 +1,123 @@
+import os
+import stat
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from clacks_web.core.upload_store import UploadStore, UploadStoreLockedError, _remove_orphaned_roots
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+class TestUploadStore(unittest.TestCase):
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def upload(self, store, transaction_id, filename, data):
+        upload = store.open_upload(transaction_id, filename)
+        upload.write(data)
+        return upload.commit()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_dedup(self):
+        store = UploadStore(self.root)
+
+        first = self.upload(store, 'a', '../albedo.png', b'0123456789')
+        second = self.upload(store, 'b', 'copy.png', b'0123456789')
+
+        assert first == os.path.join(store.transaction_dir('a'), 'albedo.png')
+        assert second == os.path.join(store.transaction_dir('b'), 'copy.png')
+
+        with open(second, 'rb') as fp:
+            assert fp.read() == b'0123456789'
+
+        # -- identical content is only stored once, changing it through one transaction would change it for the other.
+        assert os.path.samefile(first, second)
+        assert not os.stat(second).st_mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+        assert store.total_size == 10
+        assert store.stats['deduplicated'] == 1
+        assert not os.listdir(store.incoming_dir)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_release(self):
+        store = UploadStore(self.root)
+        path = self.upload(store, 'a', 'albedo.png', b'0123456789')
+
+        assert store.release('a')
+        assert not store.release('a')
+        assert not os.path.exists(path)
+
+        store.reap()
+        assert not os.listdir(store.trash_dir)
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_reap(self):
+        store = UploadStore(self.root, ttl=60, quota=25)
+
+        self.upload(store, 'a', 'a.bin', b'a' * 10)
+        path = self.upload(store, 'b', 'b.bin', b'b' * 10)
+        self.upload(store, 'c', 'c.bin', b'c' * 10)
+
+        # -- the least recently uploaded object is evicted to get back under the quota, the transaction still has it.
+        assert store.total_size == 20
+        assert store.stats['evicted'] == 1
+        assert os.path.exists(os.path.join(store.transaction_dir('a'), 'a.bin'))
+
+        store.reap(now=os.path.getmtime(path) + 120)
+
+        assert store.total_size == 0
+        assert not os.listdir(store.transactions_dir)
+        assert store.stats['expired'] == 3
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_copy_quota(self):
+        store = UploadStore(self.root, quota=25)
+
+        # -- without hard links every transaction gets a copy, which takes up space until the transaction is released.
+        with unittest.mock.patch('os.link', side_effect=OSError):
+            path = self.upload(store, 'a', 'a.bin', b'a' * 10)
+            self.upload(store, 'b', 'b.bin', b'a' * 10)
+
+        with open(path, 'rb') as fp:
+            assert fp.read() == b'a' * 10
+
+        # -- the object and two copies of it exceed the quota, the object is evicted, the copies can't be.
+        assert store.stats['copied_bytes'] == 20
+        assert store.stats['evicted'] == 1
+        assert store.total_size == 20
+
+        assert store.release('a')
+        assert store.release('b')
+        assert store.total_size == 0
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_lock(self):
+        store = UploadStore(self.root)
+
+        # -- another store would clean up the uploads this one is still writing.
+        upload = store.open_upload('a', 'a.bin')
+        with self.assertRaises(UploadStoreLockedError):
+            UploadStore(self.root)
+        upload.write(b'a')
+        assert os.path.exists(upload.commit())
+
+        store.close()
+        UploadStore(self.root).close()
+
+    # ------------------------------------------------------------------------------------------------------------------
+    def test_remove_orphaned_roots(self):
+        store = UploadStore(os.path.join(self.root, 'alive'))
+        os.makedirs(os.path.join(self.root, 'dead', 'incoming'))
+
+        _remove_orphaned_roots(self.root)
+
+        # -- only roots nobody holds the lock of are removed.
+        assert os.listdir(self.root) == ['alive']
+        store.close()